@@ -0,0 +1,86 @@
+"""
+Gunicorn settings for serving the API with pre-forked worker processes.
+
+The master process imports the app and loads the mouth detector and the
+lip-reading model once (`preload_app`); workers are forked from it and share
+the weights copy-on-write. Before forking, the master's objects are moved to
+the garbage collector's permanent generation (`gc.freeze`), so collections
+in the workers do not write to the pages holding them and copy them.
+
+Each worker serves `SERVER_THREADS` requests at a time and gets an equal
+share of the cores for PyTorch and OpenCV. The master replaces workers that
+stop responding for `SERVER_TIMEOUT` seconds; `/health` and `/ready` report
+the pid of the worker that answered.
+
+A SIGHUP to the master reloads the loaded models from their checkpoints and
+replaces the workers gracefully: new workers are forked with the new weights
+while the old ones finish their requests (for up to `SERVER_GRACEFUL_TIMEOUT`
+seconds). Workers forward `POST /models/<name>/reload` to the master this way.
+
+Usage:
+    gunicorn -c api/gunicorn_config.py api.lipreading_api_server:app
+"""
+import gc
+import logging
+import os
+
+import cv2
+import torch
+
+from config.project_config import Config
+
+bind = Config.SERVER_BIND
+workers = Config.SERVER_WORKERS or os.cpu_count() or 1
+worker_class = 'gthread'
+threads = Config.SERVER_THREADS
+timeout = Config.SERVER_TIMEOUT
+graceful_timeout = Config.SERVER_GRACEFUL_TIMEOUT
+preload_app = True
+
+
+def _freeze():
+    gc.collect()
+    gc.freeze()
+    logging.info("Froze %d objects before forking workers", gc.get_freeze_count())
+
+
+def when_ready(server):
+    """
+    Loads the models in the master before the first workers are forked.
+    """
+    if not server.cfg.preload_app:
+        return
+    from api import lipreading_api_server
+
+    if not lipreading_api_server.prepare_fork():
+        logging.error("Not every model loaded in the master; workers load the rest themselves")
+    _freeze()
+
+
+def on_reload(server):
+    """
+    Reloads the models in the master on SIGHUP, before the replacement workers are forked.
+    """
+    if not server.cfg.preload_app:
+        return
+    from api import lipreading_api_server
+
+    gc.unfreeze()
+    try:
+        lipreading_api_server.reload_models()
+    except Exception:
+        logging.exception("Reloading the models failed; new workers keep the current ones")
+    _freeze()
+
+
+def post_fork(server, worker):
+    """
+    Sets the thread counts of a new worker and prepares its per-process state.
+    """
+    num_threads = Config.SERVER_INTRA_OP_THREADS or max(1, (os.cpu_count() or 1) // server.cfg.workers)
+    torch.set_num_threads(num_threads)
+    cv2.setNumThreads(num_threads)
+    from api import lipreading_api_server
+
+    lipreading_api_server.init_worker()
+    logging.info("Worker %d started with %d intra-op threads", worker.pid, num_threads)
@@ -0,0 +1,280 @@
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+import uuid
+
+JOB_STAGES = ('decoded', 'detected', 'predicted', 'rendered')
+"""Pipeline stages reported as progress events, in order."""
+
+TERMINAL_STATUSES = ('succeeded', 'failed')
+
+_ID_PATTERN = re.compile(r'[0-9a-f]{32}')
+
+
+class Job:
+    """
+    A unit of work processed by the `JobManager`.
+
+    Attributes:
+        id (str): Unique job ID.
+        status (str): One of 'queued', 'running', 'succeeded' or 'failed'.
+        events (list): Progress events, each a dict with 'event' and 'time' keys.
+        result: Return value of the job function once it succeeded.
+        error (str): Error message if the job failed.
+        finished_at (float): Time the job finished, or None.
+    """
+
+    def __init__(self, fn, args, kwargs):
+        self.id = uuid.uuid4().hex
+        self.status = 'queued'
+        self.events = []
+        self.result = None
+        self.error = None
+        self.finished_at = None
+        self.coalesce_key = None
+        self._fn, self._args, self._kwargs = fn, args, kwargs
+
+    def to_dict(self):
+        """
+        Returns a JSON-serializable view of the job.
+        """
+        data = {
+            'job_id': self.id,
+            'status': self.status,
+            'stage': self.events[-1]['event'] if self.events else None,
+            'events': list(self.events),
+        }
+        if self.status == 'succeeded':
+            data['result'] = self.result
+        elif self.status == 'failed':
+            data['error'] = self.error
+        return data
+
+
+class JobManager:
+    """
+    Runs submitted jobs on a pool of worker threads and tracks their progress.
+
+    Job functions are called as fn(progress, *args, **kwargs), where
+    `progress(stage)` records a progress event. Jobs submitted with the same
+    `coalesce_key` while one is still queued or running share that job.
+    Finished jobs stay retrievable for `result_ttl` seconds.
+
+    The worker threads are started by the first submit in each process, so a
+    process forked from this one (a pre-fork server worker) gets its own.
+    With `share_state`, every change of a job is also written to a folder as
+    a JSON snapshot, so other processes can report on it with `snapshot`.
+
+    Attributes:
+        result_ttl (float): Seconds finished jobs are kept.
+    """
+
+    def __init__(self, num_workers, result_ttl, max_queue_size=0):
+        """
+        Initializes the manager without starting its worker threads.
+
+        Args:
+            num_workers (int): Number of worker threads.
+            result_ttl (float): Seconds finished jobs are kept.
+            max_queue_size (int): Maximum number of queued jobs, 0 for unbounded.
+        """
+        self.result_ttl = result_ttl
+        self._num_workers = num_workers
+        self._queue = queue.Queue(max_queue_size)
+        self._jobs = {}
+        self._in_flight = {}
+        self._condition = threading.Condition()
+        self._workers = []
+        self._pid = None
+        self._state_folder = None
+
+    def share_state(self, folder):
+        """
+        Writes a snapshot of every job to `folder` from now on.
+
+        Args:
+            folder (str): Directory shared by the processes serving the jobs.
+        """
+        os.makedirs(folder, exist_ok=True)
+        self._state_folder = folder
+
+    def submit(self, fn, *args, coalesce_key=None, **kwargs):
+        """
+        Queues a job.
+
+        Args:
+            fn (callable): Function called as fn(progress, *args, **kwargs).
+            *args, **kwargs: Arguments passed to the function.
+            coalesce_key (str): Optional key; if an unfinished job with the same key
+                exists, it is returned instead of queuing a new one.
+
+        Returns:
+            Job: The queued (or coalesced) job.
+
+        Raises:
+            queue.Full: If the job queue is full.
+        """
+        self._start_workers()
+        job = Job(fn, args, kwargs)
+        with self._condition:
+            self._purge_expired()
+            if coalesce_key is not None:
+                in_flight = self._in_flight.get(coalesce_key)
+                if in_flight is not None:
+                    logging.info("Coalescing job with in-flight job %s", in_flight.id)
+                    return in_flight
+                self._in_flight[coalesce_key] = job
+            job.coalesce_key = coalesce_key
+            self._jobs[job.id] = job
+            self._record(job, 'queued')
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._condition:
+                del self._jobs[job.id]
+                self._in_flight.pop(coalesce_key, None)
+            raise
+        return job
+
+    def add_finished(self, result):
+        """
+        Registers a job that already succeeded, e.g. for a cached result.
+
+        Args:
+            result: The job's result.
+
+        Returns:
+            Job: The finished job.
+        """
+        job = Job(None, (), {})
+        with self._condition:
+            self._purge_expired()
+            job.result, job.status = result, 'succeeded'
+            job.finished_at = time.monotonic()
+            self._jobs[job.id] = job
+            self._record(job, 'succeeded')
+        return job
+
+    def get(self, job_id):
+        """
+        Returns a job by ID, or None if unknown or expired.
+        """
+        with self._condition:
+            self._purge_expired()
+            return self._jobs.get(job_id)
+
+    def snapshot(self, job_id):
+        """
+        Returns the latest snapshot of a job written by any process sharing
+        the state folder, or None if there is none or it expired.
+
+        Returns:
+            dict: The job as returned by `Job.to_dict`.
+        """
+        if self._state_folder is None or not _ID_PATTERN.fullmatch(job_id):
+            return None
+        path = os.path.join(self._state_folder, f"{job_id}.json")
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            age = time.time() - os.path.getmtime(path)
+        except (OSError, ValueError):
+            return None
+        if data['status'] in TERMINAL_STATUSES and age > self.result_ttl:
+            return None
+        return data
+
+    def wait_for_events(self, job, since, timeout):
+        """
+        Waits until the job has more than `since` events or the timeout passes.
+
+        Args:
+            job (Job): The job to watch.
+            since (int): Number of events the caller has already seen.
+            timeout (float): Maximum time to wait in seconds.
+
+        Returns:
+            list: The new events, possibly empty.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: len(job.events) > since, timeout)
+            return job.events[since:]
+
+    def queue_depth(self):
+        """
+        Returns the number of jobs waiting for a worker.
+        """
+        return self._queue.qsize()
+
+    def _start_workers(self):
+        with self._condition:
+            if self._pid == os.getpid():
+                return
+            if self._pid is not None:
+                # Forked from a process with running workers, whose threads (and any
+                # waiters on the old queue) do not exist here.
+                self._queue = queue.Queue(self._queue.maxsize)
+            self._pid = os.getpid()
+            self._workers = [
+                threading.Thread(target=self._work, name=f'job-worker-{i}', daemon=True)
+                for i in range(self._num_workers)
+            ]
+            for worker in self._workers:
+                worker.start()
+
+    def _record(self, job, event):
+        job.events.append({'event': event, 'time': time.time()})
+        self._condition.notify_all()
+        if self._state_folder is not None:
+            self._write_snapshot(job)
+
+    def _write_snapshot(self, job):
+        path = os.path.join(self._state_folder, f"{job.id}.json")
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, 'w') as f:
+                json.dump(job.to_dict(), f)
+            os.replace(temp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            logging.warning("Could not write the snapshot of job %s: %s", job.id, e)
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            with self._condition:
+                job.status = 'running'
+                self._record(job, 'started')
+
+            def progress(stage, job=job):
+                with self._condition:
+                    self._record(job, stage)
+
+            try:
+                result = job._fn(progress, *job._args, **job._kwargs)
+                status, error = 'succeeded', None
+            except Exception as e:
+                logging.error("Job %s failed: %s", job.id, e)
+                result, status, error = None, 'failed', str(e)
+
+            with self._condition:
+                job.result, job.error, job.status = result, error, status
+                job.finished_at = time.monotonic()
+                if job.coalesce_key is not None:
+                    self._in_flight.pop(job.coalesce_key, None)
+                self._record(job, status)
+
+    def _purge_expired(self):
+        expiry = time.monotonic() - self.result_ttl
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished_at is not None and job.finished_at < expiry]
+        for job_id in expired:
+            del self._jobs[job_id]
+            if self._state_folder is not None:
+                try:
+                    os.remove(os.path.join(self._state_folder, f"{job_id}.json"))
+                except FileNotFoundError:
+                    pass
@@ -1,28 +1,193 @@
 import os
+import hmac
+import json
+import atexit
+import queue
+import signal
 import logging
-import cv2
-import matplotlib.pyplot as plt
-import numpy as np
-import imageio
-from flask import send_from_directory, Flask, request, jsonify
+import threading
+import time
+from flask import send_from_directory, Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS, cross_origin
 from werkzeug.utils import secure_filename
 from processing.logging_config import configure_logging
 
 from config.project_config import Config
-from processing.data_processing_utils import allowed_file, create_index_to_word_dict
-from processing.mouth_frame_extractor import VideoProcessor
-from backbone.model_loader import LipReadingModel
+from processing.data_processing_utils import allowed_file, content_digest
+from processing.artifact_policy import should_save_artifact
+from processing.instrumentation import QUEUE_DEPTH, REGISTRY, REQUESTS_IN_FLIGHT, track_request
+from processing.saliency_rendering import generate_saliency_outputs
+from api.request_store import RequestStore
+from api.job_manager import JobManager, TERMINAL_STATUSES
+from api.result_cache import RequestCoalescer, ResultCache, cache_key
+from api.storage_retention import RetentionManager
+from api.resource_loader import ResourceLoader
+from api.stream_session import StreamSession
+from backbone.model_registry import ModelRegistry, load_model
+
+try:
+    from flask_sock import Sock
+except ImportError:
+    # flask-sock is optional; without it the /stream endpoint is not available.
+    Sock = None
 
 app = Flask(__name__)
-CORS(app)
+# Cross-origin requests are allowed everywhere except on the model administration endpoints.
+CORS(app, resources={r'^(?!/models/[^/]+/(reload|unload)$).*': {}})
 app.config['UPLOAD_FOLDER'] = Config.UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = Config.MAX_CONTENT_LENGTH
 
-classes_root = 'data/dataset/val_20'
-index_to_word = create_index_to_word_dict(classes_root)
-video_processor = VideoProcessor()
-lip_reading_model = LipReadingModel(index_to_word)
+
+def load_video_processor():
+    """
+    Create the video processor with its YOLO mouth detector.
+    """
+    from processing.mouth_frame_extractor import VideoProcessor
+
+    video_processor = VideoProcessor()
+    if Config.WARMUP_ON_LOAD:
+        video_processor.warm_up()
+    return video_processor
+
+
+def load_lip_reading_model(spec):
+    """
+    Load a lip-reading model of the registry with the label map stored in its artifact.
+    """
+    lip_reading_model = load_model(spec)
+    if Config.WARMUP_ON_LOAD:
+        lip_reading_model.warm_up()
+    return lip_reading_model
+
+
+model_registry = ModelRegistry(loader=load_lip_reading_model)
+
+
+def load_default_model():
+    """
+    Load the default model into the registry for the readiness check.
+
+    Nothing is returned, so the resource loader holds no reference to the
+    model and unloading or reloading it frees its memory.
+    """
+    model_registry.get()
+
+
+batchers = {}
+batchers_lock = threading.Lock()
+
+
+def inference_model(lip_reading_model):
+    """
+    Return the dynamic batcher of a lip-reading model if batching is enabled.
+
+    Each loaded model gets its own batcher, which is shut down when the
+    model is unloaded. Models that were already unloaded are used directly.
+    """
+    if not Config.INFERENCE_BATCHING:
+        return lip_reading_model
+
+    from backbone.inference_scheduler import DynamicBatcher
+
+    with batchers_lock:
+        batcher = batchers.get(id(lip_reading_model))
+        if batcher is None:
+            if not model_registry.is_loaded(lip_reading_model):
+                return lip_reading_model
+            batcher = batchers[id(lip_reading_model)] = DynamicBatcher(lip_reading_model)
+        return batcher
+
+
+def shutdown_batcher(name, lip_reading_model):
+    """
+    Stop the batcher of an unloaded model once its queued requests are done.
+    """
+    with batchers_lock:
+        batcher = batchers.pop(id(lip_reading_model), None)
+    if batcher is not None:
+        threading.Thread(target=batcher.shutdown, name=f"batcher-shutdown-{name}",
+                         daemon=True).start()
+
+
+def shutdown_batchers():
+    """
+    Stop every batcher once its queued requests are done.
+
+    Runs at exit, so that no batcher thread is still inside PyTorch while the
+    interpreter shuts down.
+    """
+    with batchers_lock:
+        stopping = list(batchers.values())
+        batchers.clear()
+    for batcher in stopping:
+        batcher.shutdown()
+
+
+model_registry.on_unload(shutdown_batcher)
+atexit.register(shutdown_batchers)
+QUEUE_DEPTH.labels('inference').set_function(
+    lambda: sum(batcher.queue_depth() for batcher in list(batchers.values())))
+
+resources = ResourceLoader()
+resources.register('video_processor', load_video_processor)
+resources.register('lip_reading_model', load_default_model)
+if Config.PRELOAD_MODELS:
+    resources.load_in_background()
+
+request_store = RequestStore(Config.REQUEST_STORE_SIZE, Config.REQUEST_STORE_TTL)
+job_manager = JobManager(Config.JOB_WORKERS, Config.JOB_RESULT_TTL, Config.JOB_QUEUE_SIZE)
+QUEUE_DEPTH.labels('jobs').set_function(job_manager.queue_depth)
+result_cache = ResultCache(
+    Config.RESULT_CACHE_FOLDER, Config.RESULT_CACHE_MEMORY_BYTES,
+    Config.RESULT_CACHE_DISK_BYTES) if Config.RESULT_CACHE_ENABLED else None
+request_coalescer = RequestCoalescer()
+retention_manager = RetentionManager(Config.RETENTION_POLICY, Config.RETENTION_INTERVAL)
+retention_manager.start()
+stream_slots = threading.BoundedSemaphore(Config.STREAM_MAX_SESSIONS)
+# Pid of the pre-fork master this worker was forked from, set by init_worker.
+prefork_master = None
+
+
+def prepare_fork():
+    """
+    Load every resource in this process before server workers are forked from it.
+
+    Called by the pre-fork server (api/gunicorn_config.py) in its master
+    process, so that the workers share the loaded weights copy-on-write.
+
+    Returns:
+        bool: Whether every resource loaded.
+    """
+    resources.load_in_background()
+    return resources.wait_until_ready()
+
+
+def reload_models():
+    """
+    Reload every loaded model from its checkpoint, e.g. after the file was replaced.
+    """
+    for name in model_registry.loaded():
+        model_registry.reload(name)
+
+
+def init_worker():
+    """
+    Prepare a process forked from the pre-fork master for serving requests.
+
+    Threads do not survive a fork: batchers are recreated on first use and
+    ONNX Runtime sessions, whose thread pools stayed in the master, are
+    rebuilt. Jobs and stored request inputs are shared through folders, since
+    a client's follow-up request may reach another worker.
+    """
+    global prefork_master
+    prefork_master = os.getppid()
+    with batchers_lock:
+        batchers.clear()
+    for name in model_registry.loaded():
+        if model_registry.get(name).backend != 'torch':
+            model_registry.reload(name)
+    job_manager.share_state(Config.JOB_STATE_FOLDER)
+    request_store.share_state(Config.REQUEST_STATE_FOLDER)
 
 
 @app.route('/images/<path:filename>')
@@ -37,130 +202,738 @@ def serve_image(filename):
     return send_from_directory(full_path, filename, mimetype='image/gif')
 
 
-@app.route('/demo', methods=['POST'])
-@cross_origin()
-def upload_file():
+def save_uploaded_file():
     """
-    Handle file upload, process the video, and generate predictions and saliency maps.
+    Validate the uploaded file of the current request and save it.
+
+    The file is stored under the SHA-256 hash of its content, so repeated
+    uploads of the same clip are written once and different clips with the
+    same name do not overwrite each other.
+
+    Returns:
+        tuple: (filename, file_path, None) on success, or (None, None, error_response)
+            where error_response is a (response, status) pair.
     """
-    logging.info("Received a POST request to /demo.")
     file = request.files.get('file')
 
     if not file or file.filename == '':
         logging.warning("No file selected.")
-        return jsonify({'message': 'No selected file'}), 400
+        return None, None, (jsonify({'message': 'No selected file'}), 400)
 
     if not allowed_file(file.filename):
         logging.warning("Invalid file type.")
-        return jsonify({'message': 'Invalid file type'}), 400
+        return None, None, (jsonify({'message': 'Invalid file type'}), 400)
 
-    filename = secure_filename(file.filename)  # type: ignore
+    data = file.read()
+    extension = secure_filename(file.filename).rsplit('.', 1)[1].lower()  # type: ignore
+    filename = f"{content_digest(data)}.{extension}"
     file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-    file.save(file_path)
-    logging.info(f"File saved at {file_path}")
+    if os.path.exists(file_path):
+        # Refresh the modification time so retention keeps recently used uploads.
+        os.utime(file_path)
+    else:
+        with open(file_path, 'wb') as f:
+            f.write(data)
+        logging.info(f"File saved at {file_path}")
+    return filename, file_path, None
+
 
+def result_key(filename, model_name=None):
+    """
+    Build the result cache key of a saved upload for the current version of a model.
+
+    The version is read without loading the model, so looking up the cache
+    and submitting a job do not wait for a model load.
+    """
+    return cache_key(os.path.splitext(filename)[0], model_registry.version(model_name))
+
+
+def request_model():
+    """
+    Read the model named by the current request.
+
+    Returns:
+        tuple: (model name, None), or (None, error_response) for an unknown model.
+    """
     try:
-        mouth_frames_folder = video_processor.process_video(file_path)
-        if not mouth_frames_folder:
-            logging.warning("No mouth detected in the video.")
-            return jsonify({'message': 'No mouth detected in video'}), 404
+        return model_registry.resolve(request.values.get('model')), None
+    except KeyError as e:
+        return None, (jsonify({'message': e.args[0]}), 400)
 
-        frames_tensor = video_processor.load_and_transform_frames(
-            mouth_frames_folder)
-        predictions, saliency_maps = video_processor.get_saliency_maps(
-            frames_tensor, lip_reading_model)
 
-        saliency_folder, gif_output_path = generate_saliency_outputs(
-            filename, mouth_frames_folder, saliency_maps
-        )
+def saliency_frames_requested():
+    """
+    Decide whether the current request writes one PNG per saliency overlay.
 
-        result_data = {
-            'message': 'File uploaded and processed successfully',
-            'predictions': predictions,
+    `Config.ARTIFACT_POLICY` is an upper bound: the `saliency_frames` value
+    of a request can turn the frames off, but not on.
+    """
+    return should_save_artifact('saliency_frames') and request_flag('saliency_frames', True)
+
+
+def request_flag(name, default):
+    """
+    Read a boolean form or query value of the current request.
+    """
+    value = request.values.get(name)
+    if value is None:
+        return default
+    return value.lower() in ('1', 'true', 'yes')
+
+
+def run_pipeline(filename, file_path, saliency=True, write_frames=False, progress=None,
+                 model_name=None):
+    """
+    Process a saved video into predictions and, optionally, saliency outputs.
+
+    Results are looked up in and stored to the result cache, and identical
+    requests that arrive while one is being processed wait for its result.
+
+    Args:
+        filename (str): Name of the saved upload.
+        file_path (str): Path the upload was saved to.
+        saliency (bool): Whether to compute saliency maps and render the GIF.
+        write_frames (bool): Whether to also write one PNG per saliency overlay.
+        progress (callable): Optional callback receiving completed stage names.
+        model_name (str): Name of the model in the registry; defaults to the default model.
+
+    Returns:
+        dict: The response data, or None if no mouth was detected.
+    """
+    model_name = model_registry.resolve(model_name)
+    key = result_key(filename, model_name)
+    with track_request('pipeline'):
+        return request_coalescer.run(
+            f"{key}:{saliency}:{write_frames}", _run_pipeline,
+            key, filename, file_path, saliency, write_frames, progress, model_name)
+
+
+def _run_pipeline(key, filename, file_path, saliency, write_frames, progress, model_name):
+    lip_reading_model = model_registry.get(model_name)
+    entry = result_cache.get(key) if result_cache else None
+    cached = entry is not None and entry.get('frames_tensor') is not None
+    if cached:
+        logging.info("Using cached result for %s", key)
+        if progress:
+            progress('decoded')
+            progress('detected')
+    else:
+        frames_tensor, mouth_frames = resources.get('video_processor').process_video_in_memory(
+            file_path, progress=progress)
+        if frames_tensor is None:
+            logging.warning("No mouth detected in the video.")
+            return None
+        entry = {'frames_tensor': frames_tensor, 'mouth_frames': mouth_frames}
+
+    frames_tensor, mouth_frames = entry['frames_tensor'], entry['mouth_frames']
+    request_id = request_store.put(
+        filename=filename, frames_tensor=frames_tensor, mouth_frames=mouth_frames,
+        model=model_name)
+    result_data = {
+        'message': 'File uploaded and processed successfully',
+        'request_id': request_id,
+        'model': model_name,
+        'model_version': lip_reading_model.version,
+        'cached': cached,
+    }
+
+    changed = not cached
+    if saliency and (write_frames or not entry.get('saliency_gif')):
+        predictions, saliency_maps = resources.get('video_processor').get_saliency_maps(
+            frames_tensor, inference_model(lip_reading_model))
+        if progress:
+            progress('predicted')
+        saliency_folder = saliency_output_folder(filename, model_name, lip_reading_model.version)
+        gif_output_path, entry['saliency_gif'] = generate_saliency_outputs(
+            saliency_folder, mouth_frames, saliency_maps, write_frames
+        )
+        changed = True
+    elif saliency:
+        predictions = entry['predictions']
+        if progress:
+            progress('predicted')
+        saliency_folder, gif_output_path = restore_saliency_gif(
+            filename, model_name, lip_reading_model.version, entry['saliency_gif'])
+    else:
+        predictions = entry.get('predictions')
+        if predictions is None:
+            predictions = inference_model(lip_reading_model).predict(frames_tensor)
+            changed = True
+        if progress:
+            progress('predicted')
+
+    result_data['predictions'] = predictions
+    if saliency:
+        if progress:
+            progress('rendered')
+        result_data.update({
             'saliency_folder': saliency_folder,
             'saliency_maps_gif': gif_output_path,
-        }
-        return jsonify(result_data), 200
+        })
+
+    entry['predictions'] = predictions
+    if result_cache and changed:
+        result_cache.put(key, entry)
+    return result_data
+
+
+def cached_result(filename, file_path, saliency, write_frames, model_name=None):
+    """
+    Return the response data for a fully cached request without queuing it, or None.
+    """
+    if not result_cache or write_frames:
+        return None
+    entry = result_cache.get(result_key(filename, model_name))
+    if not entry or entry.get('predictions') is None or entry.get('frames_tensor') is None:
+        return None
+    if saliency and not entry.get('saliency_gif'):
+        return None
+    return run_pipeline(filename, file_path, saliency, write_frames, model_name=model_name)
+
+
+@app.route('/demo', methods=['POST'])
+@cross_origin()
+def upload_file():
+    """
+    Handle file upload, process the video, and generate predictions and saliency maps.
+
+    Saliency can be skipped by sending `saliency=false`; it can then be computed
+    later through `/saliency/<request_id>`. A `model` value selects one of the
+    models listed by `/models`.
+    """
+    logging.info("Received a POST request to /demo.")
+    return process_upload(saliency=request_flag('saliency', True))
+
 
+@app.route('/predict', methods=['POST'])
+@cross_origin()
+def predict_only():
+    """
+    Handle file upload and return only the top-5 predictions, without saliency.
+    """
+    logging.info("Received a POST request to /predict.")
+    return process_upload(saliency=False)
+
+
+@app.route('/timeline', methods=['POST'])
+@cross_origin()
+def timeline():
+    """
+    Handle file upload of a long video and return per-window predictions.
+
+    An optional `stride` form value sets the number of frames between windows
+    and `model` selects the model.
+    """
+    logging.info("Received a POST request to /timeline.")
+    model_name, error_response = request_model()
+    if error_response:
+        return error_response
+    filename, file_path, error_response = save_uploaded_file()
+    if error_response:
+        return error_response
+
+    try:
+        stride = int(request.values.get('stride', Config.TIMELINE_STRIDE))
+        if stride < 1:
+            raise ValueError
+    except ValueError:
+        return jsonify({'message': 'stride must be a positive integer'}), 400
+
+    try:
+        return jsonify(run_timeline(file_path, stride, model_name)), 200
+    except LookupError as e:
+        return jsonify({'message': str(e)}), 404
     except Exception as e:
         logging.error(f"Error processing video: {str(e)}")
         return jsonify({'message': 'Error processing video', 'error': str(e)}), 500
 
 
-def generate_saliency_outputs(filename, mouth_frames_folder, saliency_maps):
+def run_timeline(file_path, stride, model_name=None):
     """
-    Generate saliency map outputs and save them as images and GIFs.
+    Run sliding-window recognition over every frame of a saved video.
 
     Args:
-        filename (str): Original file name.
-        mouth_frames_folder (str): Folder containing mouth frames.
-        saliency_maps (list): List of saliency maps.
+        file_path (str): Path the upload was saved to.
+        stride (int): Number of frames between consecutive windows.
+        model_name (str): Name of the model in the registry; defaults to the default model.
 
     Returns:
-        tuple: Path to the saliency folder and the generated GIF file.
+        dict: The response data.
+
+    Raises:
+        LookupError: If no mouth was detected or the video is shorter than a window.
     """
-    saliency_folder = os.path.join(app.config['UPLOAD_FOLDER'], f"{os.path.splitext(filename)[0]}_saliency_maps")
-    os.makedirs(saliency_folder, exist_ok=True)
+    with track_request('timeline'):
+        frames_tensor, _, fps, missing = resources.get(
+            'video_processor').process_video_sequence(file_path)
+        if frames_tensor is None:
+            raise LookupError('No mouth detected in video')
+
+        window = Config.TIMELINE_WINDOW
+        starts, predictions = model_registry.get(model_name).predict_timeline(
+            frames_tensor, window, stride)
+    if not starts:
+        raise LookupError(f'Video is shorter than {window} frames')
+
+    return {
+        'message': 'File uploaded and processed successfully',
+        'model': model_registry.resolve(model_name),
+        'frames': frames_tensor.size(1),
+        'fps': fps,
+        'frames_without_mouth': missing,
+        'window': window,
+        'stride': stride,
+        'timeline': [{
+            'start_frame': start,
+            'end_frame': start + window - 1,
+            'start_time': round(start / fps, 3),
+            'end_time': round((start + window) / fps, 3),
+            'predictions': window_predictions,
+        } for start, window_predictions in zip(starts, predictions)],
+    }
+
+
+def process_upload(saliency):
+    """
+    Save the uploaded file and run the pipeline inside the current request.
+    """
+    model_name, error_response = request_model()
+    if error_response:
+        return error_response
+    filename, file_path, error_response = save_uploaded_file()
+    if error_response:
+        return error_response
 
-    gif_images = []
-    for frame_index, saliency_map in enumerate(saliency_maps):
-        saliency_map = process_saliency_map(saliency_map)
+    try:
+        result_data = run_pipeline(
+            filename, file_path, saliency,
+            saliency_frames_requested(),
+            model_name=model_name)
+        if result_data is None:
+            return jsonify({'message': 'No mouth detected in video'}), 404
+        return jsonify(result_data), 200
 
-        original_frame = cv2.imread(os.path.join(
-            mouth_frames_folder, f"{frame_index}.jpg"))
-        heatmap = cv2.applyColorMap(saliency_map, cv2.COLORMAP_HOT)
-        superimposed_img = cv2.addWeighted(
-            original_frame, 0.8, heatmap, 0.3, 0)
+    except Exception as e:
+        logging.error(f"Error processing video: {str(e)}")
+        return jsonify({'message': 'Error processing video', 'error': str(e)}), 500
 
-        output_path = save_saliency_image(
-            superimposed_img, saliency_folder, frame_index)
-        gif_images.append(imageio.imread(output_path))
 
-    gif_output_path = os.path.join(saliency_folder, "saliency_maps.gif")
-    logging.info(f"Generated GIF: {gif_output_path}")
-    imageio.mimsave(gif_output_path, gif_images, duration=0.1, loop=0)
+def run_video_job(progress, filename, file_path, saliency, write_frames, model_name=None):
+    """
+    Job function running the pipeline on a worker thread.
+    """
+    result_data = run_pipeline(filename, file_path, saliency, write_frames, progress, model_name)
+    if result_data is None:
+        raise ValueError('No mouth detected in video')
+    return result_data
 
-    return saliency_folder, gif_output_path
 
+@app.route('/jobs', methods=['POST'])
+@cross_origin()
+def submit_job():
+    """
+    Handle file upload and queue the video for asynchronous processing.
 
-def process_saliency_map(saliency_map):
+    Returns the job ID immediately; progress and results are available from
+    `/jobs/<job_id>` and `/jobs/<job_id>/events`.
     """
-    Process a single saliency map by applying thresholding and normalization.
+    logging.info("Received a POST request to /jobs.")
+    model_name, error_response = request_model()
+    if error_response:
+        return error_response
+    filename, file_path, error_response = save_uploaded_file()
+    if error_response:
+        return error_response
+
+    saliency = request_flag('saliency', True)
+    write_frames = saliency_frames_requested()
+    try:
+        result_data = cached_result(filename, file_path, saliency, write_frames, model_name)
+        if result_data is not None:
+            job = job_manager.add_finished(result_data)
+        else:
+            job = job_manager.submit(
+                run_video_job, filename, file_path, saliency, write_frames, model_name,
+                coalesce_key=f"{result_key(filename, model_name)}:{saliency}:{write_frames}")
+    except queue.Full:
+        logging.warning("Job queue is full.")
+        return jsonify({'message': 'Server is busy, try again later'}), 503
+
+    return jsonify({
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': f"/jobs/{job.id}",
+        'events_url': f"/jobs/{job.id}/events",
+    }), 202
+
+
+def stream_frames(ws):
+    """
+    Run live lip-reading over a WebSocket.
+
+    The client sends one encoded image per binary message and may send the
+    JSON text messages {"type": "reset"} to empty the frame buffer or
+    {"type": "end"} to close the stream. The server answers with a 'ready'
+    message, then a 'prediction' message (with per-stage latencies) every
+    `emit_every` frames once a full window is buffered, and 'error' messages
+    for frames it cannot decode. `emit_every` and `model` can be set in the
+    query string.
+    """
+    if not stream_slots.acquire(blocking=False):
+        logging.warning("Refusing stream: %d streams already open.", Config.STREAM_MAX_SESSIONS)
+        ws.send(json.dumps({'type': 'error', 'message': 'Server is busy, try again later'}))
+        ws.close(reason=1013)
+        return
+
+    session = None
+    in_flight = REQUESTS_IN_FLIGHT.labels('stream')
+    in_flight.inc()
+    try:
+        emit_every = request.args.get('emit_every', Config.STREAM_EMIT_EVERY, type=int)
+        if emit_every is None or emit_every < 1:
+            ws.send(json.dumps({'type': 'error', 'message': 'emit_every must be a positive integer'}))
+            ws.close(reason=1008)
+            return
+        try:
+            model_name = model_registry.resolve(request.args.get('model'))
+        except KeyError as e:
+            ws.send(json.dumps({'type': 'error', 'message': e.args[0]}))
+            ws.close(reason=1008)
+            return
+
+        session = StreamSession(
+            resources.get('video_processor'), model_registry.get(model_name),
+            Config.STREAM_WINDOW, emit_every)
+        logging.info("Stream opened (window %d, emit every %d frames).",
+                     session.recognizer.window, emit_every)
+        ws.send(json.dumps({'type': 'ready', 'window': session.recognizer.window,
+                            'emit_every': emit_every, 'model': model_name}))
+        while True:
+            data = ws.receive(timeout=Config.STREAM_IDLE_TIMEOUT)
+            if data is None:
+                logging.info("Closing idle stream.")
+                break
+            if isinstance(data, str):
+                try:
+                    control = json.loads(data).get('type')
+                except (ValueError, AttributeError):
+                    control = None
+                if control == 'end':
+                    break
+                if control == 'reset':
+                    session.reset()
+                else:
+                    ws.send(json.dumps({'type': 'error', 'message': 'Unknown control message'}))
+                continue
+
+            message = session.handle_frame(data)
+            if message is not None:
+                ws.send(json.dumps(message))
+        ws.close()
+    finally:
+        in_flight.dec()
+        stream_slots.release()
+        if session is not None:
+            logging.info("Stream closed after %d frames (%d without a mouth).",
+                         session.frames_received, session.frames_without_mouth)
+
+
+if Sock is not None:
+    app.config['SOCK_SERVER_OPTIONS'] = {'max_message_size': Config.STREAM_MAX_FRAME_BYTES}
+    Sock(app).route('/stream')(stream_frames)
+else:
+    logging.info("flask-sock is not installed; the /stream endpoint is disabled.")
+
+
+@app.route('/health', methods=['GET'])
+def health():
+    """
+    Liveness check: the server process is up and handling requests.
+    """
+    return jsonify({'status': 'ok', 'pid': os.getpid()}), 200
 
-    Args:
-        saliency_map (numpy.ndarray): The raw saliency map.
+
+@app.route('/ready', methods=['GET'])
+def ready():
+    """
+    Readiness check: 200 once every model has loaded, 503 (with the load status
+    of each model) before that or if loading failed.
+    """
+    return jsonify({'ready': resources.ready, 'resources': resources.status(),
+                    'pid': os.getpid()}), 200 if resources.ready else 503
+
+
+@app.route('/models', methods=['GET'])
+@cross_origin()
+def list_models():
+    """
+    Return the available models with their class counts, input sizes and
+    load status, and the model memory budget.
+    """
+    return jsonify({
+        'default': model_registry.default,
+        'memory_budget': model_registry.memory_budget,
+        'models': model_registry.status(),
+    }), 200
+
+
+def admin_error():
+    """
+    Check that a model administration request carries `Config.MODEL_ADMIN_TOKEN`.
 
     Returns:
-        numpy.ndarray: The processed saliency map.
+        tuple: An error response, or None if the request is authorized.
     """
-    thresh_value = np.percentile(saliency_map, 75)
-    _, saliency_map = cv2.threshold(
-        saliency_map, thresh_value, 255, cv2.THRESH_TOZERO)
-    saliency_map = cv2.normalize(
-        saliency_map, None, alpha=0, beta=255, norm_type=cv2.NORM_MINMAX, dtype=cv2.CV_8U)  # type: ignore
-    return saliency_map
+    token = Config.MODEL_ADMIN_TOKEN
+    if not token:
+        return jsonify({'message': 'Model administration is disabled'}), 403
+    scheme, _, credentials = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not hmac.compare_digest(credentials.encode(), token.encode()):
+        return jsonify({'message': 'Invalid or missing admin token'}), 401
+    return None
 
 
-def save_saliency_image(image, saliency_folder, frame_index):
+def allowed_checkpoint(path):
+    """
+    Whether a reload may load `path`: a file in the trained models folder or
+    a checkpoint listed in `Config.MODELS`.
     """
-    Save a single saliency map image.
+    path = os.path.realpath(path)
+    folder = os.path.realpath(os.path.dirname(Config.MODEL_PATH))
+    listed = {os.path.realpath(spec[key]) for spec in Config.MODELS.values()
+              for key in ('path', 'onnx_path') if spec.get(key)}
+    return path in listed or os.path.commonpath([path, folder]) == folder
 
-    Args:
-        image (numpy.ndarray): The image to save.
-        saliency_folder (str): Path to the saliency folder.
-        frame_index (int): The index of the frame.
+
+@app.route('/models/<name>/reload', methods=['POST'])
+def reload_model(name):
+    """
+    Reload a model without a restart, optionally from a new checkpoint.
+
+    The JSON body may set a new 'path', 'backend', 'onnx_path' or
+    'labels_root'; checkpoints must be in the trained models folder or
+    listed in `Config.MODELS`. The current model keeps serving until the new
+    one has loaded; requests already using it finish with it. Requires
+    `Config.MODEL_ADMIN_TOKEN` as a bearer token.
+
+    Under the pre-fork server a reload is forwarded to the master as a
+    SIGHUP, which reloads every loaded model from its checkpoint and replaces
+    all workers (202). New settings cannot be forwarded that way and are
+    rejected (409); change `Config.MODELS` and send the SIGHUP instead.
+    """
+    error = admin_error()
+    if error:
+        return error
+    changes = request.get_json(silent=True) or {}
+    unknown = set(changes) - {'path', 'backend', 'onnx_path', 'labels_root'}
+    if unknown:
+        return jsonify({'message': f"Unknown model settings: {sorted(unknown)}"}), 400
+    for key in ('path', 'onnx_path'):
+        if key in changes and not allowed_checkpoint(changes[key]):
+            return jsonify({'message': f"Checkpoint not allowed: {changes[key]}"}), 403
+    if 'path' in changes and not os.path.isfile(changes['path']):
+        return jsonify({'message': f"No checkpoint at {changes['path']}"}), 400
+    try:
+        name = model_registry.resolve(name)
+    except KeyError as e:
+        return jsonify({'message': e.args[0]}), 404
+    if prefork_master is not None:
+        if changes:
+            return jsonify({'message': 'Workers cannot reload with new settings; update '
+                                       'Config.MODELS and send SIGHUP to the master'}), 409
+        if os.getppid() != prefork_master:
+            return jsonify({'message': 'The pre-fork master is gone'}), 503
+        os.kill(prefork_master, signal.SIGHUP)
+        logging.info("Forwarded the reload of model %s to master %d", name, prefork_master)
+        return jsonify({'model': name, 'reloading': True}), 202
+    try:
+        lip_reading_model = model_registry.reload(name, **changes)
+    except KeyError as e:
+        return jsonify({'message': e.args[0]}), 404
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        logging.error(f"Error reloading model {name}: {str(e)}")
+        return jsonify({'message': 'Error reloading model', 'error': str(e)}), 500
+    return jsonify({'model': name, 'version': lip_reading_model.version}), 200
+
+
+@app.route('/models/<name>/unload', methods=['POST'])
+def unload_model(name):
+    """
+    Unload a model to free its memory; it is loaded again on its next use.
+    Requires `Config.MODEL_ADMIN_TOKEN` as a bearer token. Under the pre-fork
+    server only the worker handling the request unloads the model.
+    """
+    error = admin_error()
+    if error:
+        return error
+    try:
+        unloaded = model_registry.unload(name)
+    except KeyError as e:
+        return jsonify({'message': e.args[0]}), 404
+    return jsonify({'model': name, 'unloaded': unloaded}), 200
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Export per-stage latencies, frame counts, request and queue gauges and
+    memory usage in the Prometheus text format.
+    """
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/storage', methods=['GET'])
+@cross_origin()
+def storage_usage():
+    """
+    Return the disk usage and limits of the managed data directories.
+    """
+    data = {'folders': retention_manager.usage()}
+    if result_cache:
+        data['result_cache'] = result_cache.stats()
+    return jsonify(data), 200
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+@cross_origin()
+def job_status(job_id):
+    """
+    Return the status, progress events and (when finished) result of a job.
+    """
+    job = job_manager.get(job_id)
+    # Jobs queued by another server worker are known from their snapshot.
+    data = job.to_dict() if job is not None else job_manager.snapshot(job_id)
+    if data is None:
+        return jsonify({'message': 'Unknown or expired job ID'}), 404
+    return jsonify(data), 200
+
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+@cross_origin()
+def job_events(job_id):
+    """
+    Stream the progress events of a job as server-sent events.
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        if job_manager.snapshot(job_id) is None:
+            return jsonify({'message': 'Unknown or expired job ID'}), 404
+        return Response(stream_with_context(stream_snapshots(job_id)),
+                        mimetype='text/event-stream')
+
+    def stream():
+        seen = 0
+        while True:
+            events = job_manager.wait_for_events(job, seen, timeout=15)
+            if not events:
+                yield ": keep-alive\n\n"
+                continue
+            for event in events:
+                seen += 1
+                yield f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+            if job.status in TERMINAL_STATUSES:
+                yield f"event: result\ndata: {json.dumps(job.to_dict())}\n\n"
+                return
+
+    return Response(stream_with_context(stream()), mimetype='text/event-stream')
+
+
+def stream_snapshots(job_id, poll_interval=0.5, keep_alive=15):
+    """
+    Stream the progress events of a job run by another server worker, from
+    its snapshots, as server-sent events.
+    """
+    seen, idle = 0, 0.0
+    while True:
+        data = job_manager.snapshot(job_id)
+        if data is None:
+            return
+        for event in data['events'][seen:]:
+            seen += 1
+            idle = 0.0
+            yield f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+        if data['status'] in TERMINAL_STATUSES:
+            yield f"event: result\ndata: {json.dumps(data)}\n\n"
+            return
+        if idle >= keep_alive:
+            yield ": keep-alive\n\n"
+            idle = 0.0
+        time.sleep(poll_interval)
+        idle += poll_interval
+
+
+@app.route('/saliency/<request_id>', methods=['GET', 'POST'])
+@cross_origin()
+def saliency_for_request(request_id):
+    """
+    Compute saliency maps on demand for an earlier prediction request.
+    """
+    stored = request_store.get(request_id)
+    if stored is None:
+        return jsonify({'message': 'Unknown or expired request ID'}), 404
+
+    try:
+        model_name = model_registry.resolve(stored.get('model'))
+        lip_reading_model = model_registry.get(model_name)
+        with track_request('saliency'):
+            predictions, saliency_maps = resources.get('video_processor').get_saliency_maps(
+                stored['frames_tensor'], inference_model(lip_reading_model))
+            saliency_folder = saliency_output_folder(
+                stored['filename'], model_name, lip_reading_model.version)
+            gif_output_path, gif_bytes = generate_saliency_outputs(
+                saliency_folder, stored['mouth_frames'], saliency_maps,
+                saliency_frames_requested()
+            )
+        if result_cache:
+            key = result_key(stored['filename'], model_name)
+            entry = result_cache.get(key) or {
+                'frames_tensor': stored['frames_tensor'],
+                'mouth_frames': stored['mouth_frames'],
+            }
+            entry.update(predictions=predictions, saliency_gif=gif_bytes)
+            result_cache.put(key, entry)
+        return jsonify({
+            'request_id': request_id,
+            'model': model_name,
+            'predictions': predictions,
+            'saliency_folder': saliency_folder,
+            'saliency_maps_gif': gif_output_path,
+        }), 200
+
+    except Exception as e:
+        logging.error(f"Error generating saliency maps: {str(e)}")
+        return jsonify({'message': 'Error generating saliency maps', 'error': str(e)}), 500
+
+
+def saliency_output_folder(filename, model_name, model_version):
+    """
+    Return (and create) the folder holding the saliency outputs of an upload
+    for one version of a model.
+    """
+    saliency_folder = os.path.join(
+        app.config['UPLOAD_FOLDER'],
+        f"{os.path.splitext(filename)[0]}_{model_name}_{model_version}_saliency_maps")
+    os.makedirs(saliency_folder, exist_ok=True)
+    return saliency_folder
+
+
+def restore_saliency_gif(filename, model_name, model_version, gif_bytes):
+    """
+    Make sure a cached saliency GIF is available to `/images`.
 
     Returns:
-        str: Path to the saved image.
-    """
-    output_path = os.path.join(
-        saliency_folder, f"saliency_map_{frame_index}.png")
-    plt.figure()
-    plt.imshow(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
-    plt.axis('off')
-    plt.savefig(output_path, bbox_inches='tight', pad_inches=0)
-    plt.close()
-    return output_path
+        tuple: Path to the saliency folder and the GIF file.
+    """
+    saliency_folder = saliency_output_folder(filename, model_name, model_version)
+    gif_output_path = os.path.join(saliency_folder, "saliency_maps.gif")
+    if os.path.exists(gif_output_path):
+        os.utime(gif_output_path)
+    else:
+        with open(gif_output_path, 'wb') as gif_file:
+            gif_file.write(gif_bytes)
+    return saliency_folder, gif_output_path
 
 
 if __name__ == '__main__':
@@ -0,0 +1,160 @@
+import collections
+import logging
+import os
+import pickle
+import re
+import threading
+import time
+import uuid
+
+import numpy as np
+
+_ID_PATTERN = re.compile(r'[0-9a-f]{32}')
+
+
+class RequestStore:
+    """
+    Thread-safe, bounded store of per-request inputs kept for later explanation.
+
+    Prediction requests store their preprocessed input tensor and mouth crops
+    here so saliency can be computed on demand afterwards without reprocessing
+    the video. Entries expire `ttl_seconds` after they were last used, and the
+    least recently used entry is evicted once `max_entries` is exceeded.
+
+    With `share_state`, entries are also written to a folder, so that a
+    request stored by one server process can be explained by another. They
+    are saved with `torch.save` and loaded with `weights_only=True`, which
+    restores tensors, strings and numbers but never runs code from the file;
+    lists of arrays (the mouth crops) are stacked into one tensor.
+
+    Attributes:
+        max_entries (int): Maximum number of stored requests.
+        ttl_seconds (float): Idle time after which an entry expires.
+    """
+
+    def __init__(self, max_entries, ttl_seconds):
+        """
+        Initializes an empty store.
+
+        Args:
+            max_entries (int): Maximum number of stored requests.
+            ttl_seconds (float): Idle time after which an entry expires.
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._state_folder = None
+
+    def share_state(self, folder):
+        """
+        Writes every new entry to `folder` from now on and looks up unknown
+        request IDs there.
+
+        Args:
+            folder (str): Directory shared by the server processes.
+        """
+        os.makedirs(folder, exist_ok=True)
+        self._state_folder = folder
+
+    def put(self, **data):
+        """
+        Stores the data of a new request.
+
+        Args:
+            **data: Values to keep for the request (e.g. frames_tensor, mouth_frames).
+
+        Returns:
+            str: The generated request ID.
+        """
+        request_id = uuid.uuid4().hex
+        with self._lock:
+            self._entries[request_id] = (time.monotonic(), data)
+            self._evict()
+        if self._state_folder is not None:
+            path = self._shared_path(request_id)
+            try:
+                self._write_shared(path, data)
+                os.replace(f"{path}.tmp", path)
+            except OSError as e:
+                logging.warning("Could not share request %s: %s", request_id, e)
+        return request_id
+
+    def get(self, request_id):
+        """
+        Returns the data stored for a request.
+
+        Args:
+            request_id (str): ID returned by `put`.
+
+        Returns:
+            dict: The stored data, or None if unknown or expired.
+        """
+        with self._lock:
+            self._evict()
+            entry = self._entries.pop(request_id, None)
+            if entry is not None:
+                self._entries[request_id] = (time.monotonic(), entry[1])
+                return entry[1]
+        return self._get_shared(request_id)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def _evict(self):
+        expiry = time.monotonic() - self.ttl_seconds
+        while self._entries:
+            request_id, (last_used, _) = next(iter(self._entries.items()))
+            if len(self._entries) <= self.max_entries and last_used >= expiry:
+                break
+            del self._entries[request_id]
+            if self._state_folder is not None:
+                self._remove_shared(request_id)
+
+    def _shared_path(self, request_id):
+        return os.path.join(self._state_folder, f"{request_id}.pt")
+
+    @staticmethod
+    def _write_shared(path, data):
+        # torch is imported on first use so that importing the server stays fast.
+        import torch
+
+        stacked = [name for name, value in data.items() if isinstance(value, list) and value
+                   and all(isinstance(item, np.ndarray) for item in value)]
+        values = {name: torch.from_numpy(np.stack(value)) if name in stacked else value
+                  for name, value in data.items()}
+        torch.save({'values': values, 'stacked': stacked}, f"{path}.tmp")
+
+    def _get_shared(self, request_id):
+        """
+        Loads an entry stored by another process; its file's modification
+        time serves as its last use.
+        """
+        import torch
+
+        if self._state_folder is None or not _ID_PATTERN.fullmatch(request_id):
+            return None
+        path = self._shared_path(request_id)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl_seconds:
+                self._remove_shared(request_id)
+                return None
+            os.utime(path)
+            saved = torch.load(path, weights_only=True)
+        except (OSError, EOFError, RuntimeError):
+            return None
+        except pickle.UnpicklingError as e:
+            # weights_only refuses anything but tensors and plain values.
+            logging.warning("Refusing to load shared request %s: %s", request_id, e)
+            return None
+        data = saved['values']
+        for name in saved['stacked']:
+            data[name] = list(data[name].numpy())
+        return data
+
+    def _remove_shared(self, request_id):
+        try:
+            os.remove(self._shared_path(request_id))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,118 @@
+import logging
+import threading
+import time
+
+
+class ResourceLoader:
+    """
+    Loads named resources (models, processors) on first use or in the background.
+
+    Each resource is created once by its factory. `get` blocks while the
+    resource is being loaded by another thread. A failed load is recorded and
+    retried by the next `get`.
+
+    Attributes:
+        ready (bool): True once every registered resource has loaded.
+    """
+
+    def __init__(self):
+        self._factories = {}
+        self._resources = {}
+        self._status = {}
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def register(self, name, factory):
+        """
+        Registers a resource.
+
+        Args:
+            name (str): Name of the resource.
+            factory (callable): Zero-argument function creating the resource; it
+                may `get` other resources.
+        """
+        self._factories[name] = factory
+        self._status[name] = {'status': 'pending'}
+
+    def get(self, name):
+        """
+        Returns a resource, loading it first if necessary.
+
+        Args:
+            name (str): Name of the resource.
+
+        Returns:
+            The resource.
+        """
+        with self._condition:
+            while self._status[name]['status'] == 'loading':
+                self._condition.wait()
+            if self._status[name]['status'] == 'ready':
+                return self._resources[name]
+            self._status[name] = {'status': 'loading'}
+
+        start = time.perf_counter()
+        try:
+            resource = self._factories[name]()
+        except Exception as e:
+            logging.exception("Failed to load %s", name)
+            with self._condition:
+                self._status[name] = {'status': 'failed', 'error': str(e)}
+                self._condition.notify_all()
+            raise
+
+        elapsed = time.perf_counter() - start
+        logging.info("Loaded %s in %.2f s", name, elapsed)
+        with self._condition:
+            self._resources[name] = resource
+            self._status[name] = {'status': 'ready', 'load_seconds': round(elapsed, 3)}
+            self._condition.notify_all()
+        return resource
+
+    def load_in_background(self):
+        """
+        Starts loading every registered resource, in registration order, in a daemon thread.
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._load_all, name='resource-loader', daemon=True)
+            self._thread.start()
+
+    def wait_until_ready(self, timeout=None):
+        """
+        Blocks until every resource has loaded or one failed.
+
+        Args:
+            timeout (float): Maximum seconds to wait, or None to wait indefinitely.
+
+        Returns:
+            bool: True if every resource is ready.
+        """
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self.ready or any(
+                    status['status'] == 'failed' for status in self._status.values()),
+                timeout)
+            return self.ready
+
+    @property
+    def ready(self):
+        return all(status['status'] == 'ready' for status in self._status.values())
+
+    def status(self):
+        """
+        Returns the load status of every resource.
+
+        Returns:
+            dict: For each resource, a dict with its 'status' ('pending',
+                'loading', 'ready' or 'failed') and its 'load_seconds' or 'error'.
+        """
+        with self._condition:
+            return {name: dict(status) for name, status in self._status.items()}
+
+    def _load_all(self):
+        for name in self._factories:
+            try:
+                self.get(name)
+            except Exception:
+                pass
@@ -0,0 +1,303 @@
+import collections
+import json
+import logging
+import os
+import shutil
+import threading
+import uuid
+from concurrent.futures import Future
+
+import numpy as np
+
+
+def cache_key(content_hash, model_version):
+    """
+    Build the cache key of an upload processed by a given model.
+
+    Args:
+        content_hash (str): SHA-256 hex digest of the uploaded file.
+        model_version (str): Version of the model producing the results.
+
+    Returns:
+        str: The cache key.
+    """
+    return f"{content_hash}-{model_version}"
+
+
+def _entry_size(entry):
+    size = len(json.dumps(entry.get('predictions')))
+    if entry.get('frames_tensor') is not None:
+        size += entry['frames_tensor'].element_size() * entry['frames_tensor'].nelement()
+    size += sum(frame.nbytes for frame in entry.get('mouth_frames', []))
+    size += len(entry.get('saliency_gif') or b'')
+    return size
+
+
+class ResultCache:
+    """
+    Content-addressed cache of pipeline results with LRU eviction in memory and on disk.
+
+    An entry is a dict that may hold 'predictions', 'frames_tensor',
+    'mouth_frames' and 'saliency_gif' (the encoded GIF bytes). Entries are
+    kept in an in-memory LRU bounded by `memory_budget` bytes and persisted
+    under `cache_dir/<key>/`, where the least recently used entries are
+    removed once the folder exceeds `disk_budget` bytes.
+
+    The memory budget applies to each server process. The folder can be
+    shared by several processes (e.g. pre-fork workers): files are replaced
+    atomically, and the disk budget is checked against the folder itself, so
+    it holds for all of them together.
+
+    Attributes:
+        cache_dir (str): Directory holding the persisted entries.
+        memory_budget (int): Maximum bytes of entries kept in memory.
+        disk_budget (int): Maximum bytes of entries kept on disk.
+    """
+
+    def __init__(self, cache_dir, memory_budget, disk_budget):
+        """
+        Initializes the cache; entries already on disk are used as they are.
+
+        Args:
+            cache_dir (str): Directory holding the persisted entries.
+            memory_budget (int): Maximum bytes of entries kept in memory.
+            disk_budget (int): Maximum bytes of entries kept on disk.
+        """
+        self.cache_dir = cache_dir
+        self.memory_budget = memory_budget
+        self.disk_budget = disk_budget
+        self._memory = collections.OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def get(self, key):
+        """
+        Returns a copy of the cached entry for a key, or None.
+
+        Args:
+            key (str): Cache key from `cache_key`.
+
+        Returns:
+            dict: The entry, or None on a miss.
+        """
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self._touch_disk(key)
+                return dict(entry[1])
+
+            if not self._has_disk(key):
+                return None
+            try:
+                entry = self._read_disk(key)
+            except FileNotFoundError:
+                # Evicted by another process in the meantime.
+                return None
+            except Exception as e:
+                logging.warning("Dropping unreadable cache entry %s: %s", key, e)
+                self._remove_disk(key)
+                return None
+            self._touch_disk(key)
+            self._store_memory(key, entry)
+            return dict(entry)
+
+    def put(self, key, entry):
+        """
+        Stores or replaces the entry for a key in memory and on disk.
+
+        Args:
+            key (str): Cache key from `cache_key`.
+            entry (dict): The entry to store.
+        """
+        entry = dict(entry)
+        with self._lock:
+            self._store_memory(key, entry)
+            try:
+                self._write_disk(key, entry)
+            except OSError as e:
+                # E.g. the folder was evicted by another process during the write.
+                logging.warning("Could not persist cache entry %s: %s", key, e)
+
+    def stats(self):
+        """
+        Returns the number of entries and bytes used in memory and on disk.
+        """
+        disk = self._scan_disk()
+        with self._lock:
+            return {
+                'memory_entries': len(self._memory),
+                'memory_bytes': self._memory_bytes,
+                'disk_entries': len(disk),
+                'disk_bytes': sum(size for _, size in disk),
+            }
+
+    def _store_memory(self, key, entry):
+        if key in self._memory:
+            self._memory_bytes -= self._memory.pop(key)[0]
+        size = _entry_size(entry)
+        if size > self.memory_budget:
+            return
+        self._memory[key] = (size, entry)
+        self._memory_bytes += size
+        while self._memory_bytes > self.memory_budget:
+            _, (evicted_size, _) = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted_size
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def _scan_disk(self):
+        """
+        Lists the complete entries on disk, least recently used first.
+
+        Returns:
+            list: (key, size in bytes) pairs.
+        """
+        entries = []
+        for key in os.listdir(self.cache_dir):
+            entry_dir = self._entry_dir(key)
+            try:
+                if not os.path.isfile(os.path.join(entry_dir, 'result.json')):
+                    continue
+                size = sum(os.path.getsize(os.path.join(entry_dir, name))
+                           for name in os.listdir(entry_dir))
+                entries.append((os.path.getmtime(entry_dir), key, size))
+            except OSError:
+                # Removed by another process while scanning.
+                continue
+        return [(key, size) for _, key, size in sorted(entries)]
+
+    def _has_disk(self, key):
+        return os.path.isfile(os.path.join(self._entry_dir(key), 'result.json'))
+
+    def _touch_disk(self, key):
+        try:
+            os.utime(self._entry_dir(key))
+        except FileNotFoundError:
+            pass
+
+    def _read_disk(self, key):
+        # torch is imported on first use so that importing the server stays fast.
+        import torch
+
+        entry_dir = self._entry_dir(key)
+        entry = {}
+        with open(os.path.join(entry_dir, 'result.json')) as f:
+            entry['predictions'] = json.load(f)['predictions']
+        tensors_path = os.path.join(entry_dir, 'tensors.pt')
+        if os.path.exists(tensors_path):
+            tensors = torch.load(tensors_path, weights_only=True)
+            entry['frames_tensor'] = tensors['frames_tensor']
+            entry['mouth_frames'] = list(tensors['mouth_frames'].numpy())
+        gif_path = os.path.join(entry_dir, 'saliency_maps.gif')
+        if os.path.exists(gif_path):
+            with open(gif_path, 'rb') as f:
+                entry['saliency_gif'] = f.read()
+        return entry
+
+    @staticmethod
+    def _replace_file(path, write):
+        """
+        Writes a file through a temporary file in the same folder, so that
+        readers and other processes never see a partly written file.
+        """
+        tmp_path = os.path.join(os.path.dirname(path),
+                                f".{os.path.basename(path)}.{uuid.uuid4().hex}.tmp")
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _write_disk(self, key, entry):
+        import torch
+
+        entry_dir = self._entry_dir(key)
+        os.makedirs(entry_dir, exist_ok=True)
+        if entry.get('frames_tensor') is not None:
+            tensors = {
+                'frames_tensor': entry['frames_tensor'],
+                'mouth_frames': torch.from_numpy(np.stack(entry['mouth_frames'])),
+            }
+            self._replace_file(os.path.join(entry_dir, 'tensors.pt'),
+                               lambda path: torch.save(tensors, path))
+        if entry.get('saliency_gif'):
+            self._replace_file(os.path.join(entry_dir, 'saliency_maps.gif'),
+                               lambda path: _write_bytes(path, entry['saliency_gif']))
+        # result.json is written last: an entry is complete once it exists.
+        self._replace_file(os.path.join(entry_dir, 'result.json'), lambda path: _write_bytes(
+            path, json.dumps({'predictions': entry.get('predictions')}).encode()))
+        self._evict_disk(keep=key)
+
+    def _evict_disk(self, keep):
+        """
+        Removes the least recently used entries until the folder fits `disk_budget`.
+
+        Sizes are read from the folder, so the budget holds for all server
+        processes sharing it together.
+        """
+        entries = self._scan_disk()
+        total = sum(size for _, size in entries)
+        for key, size in entries:
+            if total <= self.disk_budget:
+                break
+            if key == keep:
+                continue
+            self._remove_disk(key)
+            total -= size
+
+    def _remove_disk(self, key):
+        shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+
+
+def _write_bytes(path, data):
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+class RequestCoalescer:
+    """
+    Makes concurrent calls with the same key share a single execution.
+
+    The first caller for a key runs the function; callers arriving while it is
+    still running wait for and receive the same result (or exception).
+    """
+
+    def __init__(self):
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def run(self, key, fn, *args, **kwargs):
+        """
+        Runs `fn(*args, **kwargs)` unless a call with the same key is in flight.
+
+        Args:
+            key (str): Identifies equivalent calls.
+            fn (callable): The function to run.
+
+        Returns:
+            The function's result.
+        """
+        with self._lock:
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = self._in_flight[key] = Future()
+
+        if not owner:
+            logging.info("Waiting on in-flight request %s", key)
+            return future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
@@ -0,0 +1,151 @@
+import logging
+import os
+import shutil
+import threading
+import time
+
+
+def _entry_usage(path):
+    """
+    Returns the total size and the newest modification time of a file or directory tree.
+    """
+    if not os.path.isdir(path):
+        stat = os.stat(path)
+        return stat.st_size, stat.st_mtime
+
+    size, newest = 0, os.stat(path).st_mtime
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                stat = os.stat(os.path.join(root, name))
+            except FileNotFoundError:
+                continue
+            size += stat.st_size
+            newest = max(newest, stat.st_mtime)
+    return size, newest
+
+
+def _remove_entry(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class RetentionManager:
+    """
+    Keeps data directories within age and total-size limits.
+
+    Each top-level entry of a managed folder (a file, or a directory such as
+    the frames of one video) is treated as a unit. A sweep first deletes the
+    entries not modified for longer than the folder's `max_age`, then the
+    least recently modified ones until the folder fits in `max_bytes`.
+
+    Attributes:
+        policies (dict): Mapping of folder path to a dict with optional
+            'max_age' (seconds) and 'max_bytes' limits.
+        interval (float): Seconds between background sweeps.
+    """
+
+    def __init__(self, policies, interval):
+        """
+        Initializes the manager without starting the background thread.
+
+        Args:
+            policies (dict): Limits per folder, see the class attributes.
+            interval (float): Seconds between background sweeps.
+        """
+        self.policies = policies
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._usage = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """
+        Starts sweeping in a daemon thread.
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name='storage-retention', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """
+        Stops the background thread after its current sweep.
+        """
+        self._stop.set()
+
+    def sweep(self):
+        """
+        Enforces the limits of every folder once.
+
+        Returns:
+            dict: Per-folder usage after the sweep, as returned by `usage`.
+        """
+        with self._lock:
+            for folder, policy in self.policies.items():
+                self._usage[folder] = self._sweep_folder(folder, policy)
+            return self.usage()
+
+    def usage(self):
+        """
+        Returns the disk usage recorded by the latest sweep.
+
+        Returns:
+            dict: For each folder, its 'bytes', 'entries', 'removed_entries',
+                'removed_bytes', 'max_bytes' and 'max_age'.
+        """
+        return {folder: dict(usage) for folder, usage in self._usage.items()}
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.sweep()
+            except Exception:
+                logging.exception("Storage retention sweep failed")
+            self._stop.wait(self.interval)
+
+    def _sweep_folder(self, folder, policy):
+        max_age = policy.get('max_age')
+        max_bytes = policy.get('max_bytes')
+        entries = []
+        if os.path.isdir(folder):
+            for name in os.listdir(folder):
+                path = os.path.join(folder, name)
+                try:
+                    size, mtime = _entry_usage(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((mtime, size, path))
+        entries.sort()
+
+        now = time.time()
+        total = sum(size for _, size, _ in entries)
+        removed_entries = removed_bytes = 0
+        kept = []
+        for mtime, size, path in entries:
+            expired = max_age is not None and now - mtime > max_age
+            if expired or (max_bytes is not None and total > max_bytes):
+                _remove_entry(path)
+                total -= size
+                removed_entries += 1
+                removed_bytes += size
+            else:
+                kept.append(path)
+
+        if removed_entries:
+            logging.info("Removed %d entries (%d bytes) from %s",
+                         removed_entries, removed_bytes, folder)
+        return {
+            'bytes': total,
+            'entries': len(kept),
+            'removed_entries': removed_entries,
+            'removed_bytes': removed_bytes,
+            'max_bytes': max_bytes,
+            'max_age': max_age,
+        }
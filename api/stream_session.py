@@ -0,0 +1,104 @@
+import time
+
+import cv2
+import numpy as np
+
+from processing.frame_preprocessing import preprocess_frames
+
+
+class StreamSession:
+    """
+    Per-connection state of a live lip-reading stream.
+
+    Each binary message holds one encoded image (JPEG, PNG or WebP) of the
+    webcam. The mouth is detected and cropped as soon as the frame arrives and
+    the normalized crop is pushed into the ring buffer of a
+    `StreamingRecognizer`. Frames without a detected mouth repeat the previous
+    crop so the buffer keeps the timing of the video. Once the buffer holds a
+    full window, a prediction is emitted every `emit_every` frames, carrying the
+    latency of each stage for the frame that triggered it.
+
+    Attributes:
+        emit_every (int): Number of frames between predictions.
+        frames_received (int): Number of frames received so far.
+        frames_without_mouth (int): Number of frames in which no mouth was detected.
+    """
+
+    def __init__(self, video_processor, lip_reading_model, window=None, emit_every=5):
+        """
+        Initializes the session.
+
+        Args:
+            video_processor (VideoProcessor): Detector used to crop the mouth.
+            lip_reading_model (LipReadingModel): Model producing the predictions.
+            window (int): Frames per prediction; defaults to `Config.STREAM_WINDOW`.
+            emit_every (int): Number of frames between predictions.
+        """
+        self.video_processor = video_processor
+        self.lip_reading_model = lip_reading_model
+        self.recognizer = lip_reading_model.create_stream(window)
+        self.emit_every = emit_every
+        self.frames_received = 0
+        self.frames_without_mouth = 0
+        self._last_crop = None
+        self._last_emit = None
+
+    def reset(self):
+        """
+        Drops the buffered frames, e.g. when the speaker starts a new word.
+        """
+        self.recognizer.reset()
+        self._last_crop = None
+        self._last_emit = None
+
+    def handle_frame(self, data):
+        """
+        Processes one encoded frame.
+
+        Args:
+            data (bytes): The encoded image.
+
+        Returns:
+            dict: A 'prediction' or 'error' message for the client, or None when
+                nothing is due yet.
+        """
+        received = time.perf_counter()
+        frame_index = self.frames_received
+        self.frames_received += 1
+        latency = {}
+
+        frame = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        decoded = time.perf_counter()
+        latency['decode_ms'] = (decoded - received) * 1000
+        if frame is None:
+            return {'type': 'error', 'frame': frame_index, 'message': 'Could not decode frame'}
+
+        crop = self.video_processor.extract_mouth_crop(frame)
+        detected = time.perf_counter()
+        latency['detect_ms'] = (detected - decoded) * 1000
+        if crop is None:
+            self.frames_without_mouth += 1
+            if self._last_crop is None:
+                return None
+            crop = self._last_crop
+        self._last_crop = crop
+
+        self.recognizer.push(preprocess_frames([crop])[0, 0])
+        latency['preprocess_ms'] = (time.perf_counter() - detected) * 1000
+
+        frames_buffered = self.recognizer.frames_seen
+        if not self.recognizer.ready or (
+                self._last_emit is not None and frames_buffered - self._last_emit < self.emit_every):
+            return None
+        self._last_emit = frames_buffered
+
+        predictions = self.lip_reading_model.predict_stream(self.recognizer, latency)
+        latency['total_ms'] = (time.perf_counter() - received) * 1000
+        return {
+            'type': 'prediction',
+            'frame': frame_index,
+            'window': self.recognizer.window,
+            'predictions': predictions,
+            'frames_without_mouth': self.frames_without_mouth,
+            'latency_ms': {stage: round(ms, 2) for stage, ms in latency.items()},
+        }
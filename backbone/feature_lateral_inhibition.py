@@ -45,10 +45,50 @@ class LateralInhibition(nn.Module):
         """
         x = x.to(self.device)
 
-        w_zero_diag = self.w - torch.diag(torch.diag(self.w))
+        # Equivalent to (x @ diag(theta)) @ (w - diag(diag(w))), written with a
+        # mask and an elementwise product so it also exports to ONNX.
+        eye = torch.eye(self.num_features, dtype=self.w.dtype, device=self.w.device)
+        w_zero_diag = self.w * (1 - eye)
 
-        theta = torch.sigmoid(self.k * (torch.diag(self.w) + self.b))
-        diag_part = torch.diag(theta)
+        theta = torch.sigmoid(self.k * (torch.diagonal(self.w) + self.b))
 
-        inhibited = (x @ diag_part) @ w_zero_diag
+        inhibited = (x * theta) @ w_zero_diag
         return inhibited
+
+
+class PrecomputedLateralInhibition(nn.Module):
+    """
+    Inference-only Lateral Inhibition with the sigmoid gate folded into the weights.
+
+    Since (x @ diag(theta)) @ W equals x @ (diag(theta) @ W), the gate and the
+    zeroed-diagonal weight matrix are combined once into a single matrix.
+
+    Attributes:
+        weight (torch.Tensor): Precomputed (num_features, num_features) matrix.
+    """
+
+    def __init__(self, lateral_inhibition):
+        """
+        Precomputes the weight matrix of a trained Lateral Inhibition layer.
+
+        Args:
+            lateral_inhibition (LateralInhibition): The layer to freeze.
+        """
+        super(PrecomputedLateralInhibition, self).__init__()
+        with torch.no_grad():
+            w = lateral_inhibition.w
+            eye = torch.eye(w.size(0), dtype=w.dtype, device=w.device)
+            theta = torch.sigmoid(
+                lateral_inhibition.k * (torch.diagonal(w) + lateral_inhibition.b))
+            weight = theta.unsqueeze(1) * (w * (1 - eye))
+        self.register_buffer('weight', weight)
+
+    def forward(self, x):
+        """
+        Args:
+            x (torch.Tensor): Input tensor whose last dimension holds the features.
+
+        Returns:
+            torch.Tensor: Output tensor after applying lateral inhibition.
+        """
+        return x @ self.weight
@@ -0,0 +1,227 @@
+import collections
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import torch
+
+from config import project_config
+from processing.instrumentation import log_sampled
+
+_SHUTDOWN = object()
+
+
+class _InferenceRequest:
+    """
+    A single queued prediction request.
+
+    A 4D input is a single sample in the model's (channels, depth, height,
+    width) layout, as in `LipReadingModel.predict_batch`; it is stored in the
+    5D layout so that it can be concatenated with other requests.
+
+    Attributes:
+        frames_tensor (torch.Tensor): Input of shape (batch_size, depth, channels, height, width).
+        return_grad (bool): Whether input gradients were requested.
+        future (concurrent.futures.Future): Receives the request's result.
+        key (tuple): Requests with equal keys can share a forward pass.
+    """
+
+    def __init__(self, frames_tensor, return_grad):
+        if frames_tensor.dim() == 4:
+            frames_tensor = frames_tensor.transpose(0, 1).unsqueeze(0)
+        self.frames_tensor = frames_tensor
+        self.return_grad = return_grad
+        self.future = Future()
+        self.key = (tuple(frames_tensor.shape[1:]), frames_tensor.dtype, return_grad)
+
+
+class DynamicBatcher:
+    """
+    Collects concurrent prediction requests and runs them as one forward pass.
+
+    Requests are gathered for up to `max_wait_ms` after the first one arrives,
+    or until `max_batch_size` samples are queued, and are then predicted with
+    `LipReadingModel.predict_batch`. Each caller receives only its own result.
+    Requests whose input shapes differ are batched separately.
+
+    Attributes:
+        lip_reading_model (LipReadingModel): The wrapped model.
+        max_batch_size (int): Maximum number of samples per forward pass.
+        max_wait_ms (float): How long to wait for more requests once one has arrived.
+    """
+
+    def __init__(self, lip_reading_model, max_batch_size=None, max_wait_ms=None):
+        """
+        Initializes the batcher and starts its worker thread.
+
+        Args:
+            lip_reading_model (LipReadingModel): The model wrapper to run batches with.
+            max_batch_size (int): Maximum samples per batch; defaults to `Config.INFERENCE_MAX_BATCH_SIZE`.
+            max_wait_ms (float): Batching window; defaults to `Config.INFERENCE_BATCH_WINDOW_MS`.
+        """
+        self.lip_reading_model = lip_reading_model
+        self.max_batch_size = max_batch_size or project_config.Config.INFERENCE_MAX_BATCH_SIZE
+        self.max_wait_ms = (project_config.Config.INFERENCE_BATCH_WINDOW_MS
+                            if max_wait_ms is None else max_wait_ms)
+        self._queue = queue.Queue()
+        self._pending = collections.deque()
+        self._stopping = False
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(
+            target=self._run, name='inference-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, frames_tensor, return_grad=False):
+        """
+        Queues a prediction request.
+
+        Args:
+            frames_tensor (torch.Tensor): Input shaped as for `LipReadingModel.predict`.
+            return_grad (bool): Whether to also compute input gradients.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the list of per-sample predictions,
+                or to (predictions, gradients) if `return_grad=True`.
+
+        Raises:
+            RuntimeError: If the batcher has been shut down.
+        """
+        request = _InferenceRequest(frames_tensor, return_grad)
+        with self._lock:
+            if self._stopping:
+                raise RuntimeError("DynamicBatcher has been shut down")
+            self._queue.put(request)
+        return request.future
+
+    def predict(self, frames_tensor, return_grad=False):
+        """
+        Drop-in replacement for `LipReadingModel.predict` that goes through the batcher.
+
+        Args:
+            frames_tensor (torch.Tensor): A tensor of frames to predict from.
+            return_grad (bool): If True, returns the gradient of the input tensor.
+
+        Returns:
+            list of tuple: Top-k words with their probabilities for the first sample.
+            torch.Tensor (optional): Gradients of the input tensor if `return_grad=True`.
+        """
+        result = self.submit(frames_tensor, return_grad).result()
+        if return_grad:
+            predictions, gradients = result
+            return predictions[0], gradients
+        return result[0]
+
+    def queue_depth(self):
+        """
+        Returns the number of requests waiting for a batch.
+        """
+        return self._queue.qsize() + len(self._pending)
+
+    def shutdown(self):
+        """
+        Stops the worker thread after the queued requests are processed.
+        """
+        with self._lock:
+            self._stopping = True
+            self._queue.put(_SHUTDOWN)
+        self._thread.join()
+
+    def _run(self):
+        try:
+            self._serve()
+        finally:
+            self._fail_remaining()
+
+    def _serve(self):
+        while True:
+            if self._pending:
+                first = self._pending.popleft()
+            else:
+                if self._stopping and self._queue.empty():
+                    return
+                first = self._queue.get()
+                if first is _SHUTDOWN:
+                    self._stopping = True
+                    continue
+            self._run_batch(self._collect_batch(first))
+
+    def _fail_remaining(self):
+        """
+        Rejects new requests and fails those still queued once the worker thread stops.
+        """
+        with self._lock:
+            self._stopping = True
+        remaining = list(self._pending)
+        self._pending.clear()
+        while True:
+            try:
+                remaining.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        for request in remaining:
+            if request is not _SHUTDOWN and not request.future.done():
+                request.future.set_exception(RuntimeError("DynamicBatcher has been shut down"))
+
+    def _collect_batch(self, first):
+        """
+        Gathers requests compatible with `first` until the batch is full or the window ends.
+        """
+        batch = [first]
+        batch_size = len(first.frames_tensor)
+        for request in list(self._pending):
+            if batch_size >= self.max_batch_size:
+                return batch
+            if request.key == first.key:
+                self._pending.remove(request)
+                batch.append(request)
+                batch_size += len(request.frames_tensor)
+
+        deadline = time.monotonic() + self.max_wait_ms / 1000
+        while batch_size < self.max_batch_size and not self._stopping:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is _SHUTDOWN:
+                self._stopping = True
+                break
+            if request.key == first.key:
+                batch.append(request)
+                batch_size += len(request.frames_tensor)
+            else:
+                self._pending.append(request)
+        return batch
+
+    def _run_batch(self, batch):
+        """
+        Runs one forward pass for a batch of compatible requests and resolves their futures.
+        """
+        return_grad = batch[0].return_grad
+        try:
+            frames_tensor = torch.cat([request.frames_tensor for request in batch])
+            result = self.lip_reading_model.predict_batch(
+                frames_tensor, return_grad=return_grad)
+        except Exception as e:
+            logging.error("Batched inference failed: %s", e)
+            for request in batch:
+                request.future.set_exception(e)
+            return
+
+        predictions, gradients = result if return_grad else (result, None)
+        offset = 0
+        for request in batch:
+            size = len(request.frames_tensor)
+            request_predictions = predictions[offset:offset + size]
+            if return_grad:
+                request.future.set_result(
+                    (request_predictions, gradients[offset:offset + size]))
+            else:
+                request.future.set_result(request_predictions)
+            offset += size
+        log_sampled('batched-inference', project_config.Config.LOG_SAMPLE_INTERVAL, logging.INFO,
+                    "Ran batched inference for %d requests (%d samples)", len(batch), offset)
@@ -0,0 +1,133 @@
+"""
+Self-describing model artifacts: the state dict together with the label map
+and the architecture metadata needed to rebuild the model offline.
+
+Plain state dicts (the original checkpoint format) are still accepted
+everywhere; they carry no labels and are assumed to use `DEFAULT_ARCHITECTURE`
+with the number of classes read from the weights.
+
+Usage:
+    python -m backbone.model_artifacts --model trained_models/lipreading_model_v1.pt
+        --labels-dir data/dataset/val_20 --output trained_models/lipreading_model_v1.pt
+"""
+import argparse
+import logging
+
+import torch
+
+from backbone.temporal_multiscale_model import LipReadModel
+from processing.data_processing_utils import create_index_to_word_dict
+from processing.logging_config import configure_logging
+
+ARTIFACT_FORMAT = 'lipreading-model'
+"""Value of the 'format' key identifying a model artifact."""
+
+DEFAULT_ARCHITECTURE = {'num_classes': 19, 'frames': 29, 'input_size': 64}
+"""Architecture assumed for plain state dicts."""
+
+
+def save_model_artifact(state_dict, output_path, labels, architecture=None):
+    """
+    Saves a state dict with its label map and architecture metadata.
+
+    Args:
+        state_dict (dict): Weights of a LipReadModel.
+        output_path (str): Destination of the artifact.
+        labels (list): Class names in class-index order.
+        architecture (dict): Keys 'num_classes', 'frames' and 'input_size';
+            missing keys take their `DEFAULT_ARCHITECTURE` values.
+    """
+    architecture = {**DEFAULT_ARCHITECTURE, **(architecture or {})}
+    if len(labels) != architecture['num_classes']:
+        raise ValueError(
+            f"Got {len(labels)} labels for {architecture['num_classes']} classes")
+    torch.save({
+        'format': ARTIFACT_FORMAT,
+        'architecture': architecture,
+        'labels': list(labels),
+        'state_dict': state_dict,
+    }, output_path)
+    logging.info("Saved model artifact with %d labels to %s", len(labels), output_path)
+
+
+def read_checkpoint(checkpoint):
+    """
+    Splits a loaded checkpoint into its state dict and metadata.
+
+    Args:
+        checkpoint (dict): Object returned by `torch.load`, either a model
+            artifact or a plain state dict.
+
+    Returns:
+        dict: The state dict.
+        dict: Metadata with 'architecture' and 'labels' (None for plain state dicts).
+    """
+    if isinstance(checkpoint, dict) and checkpoint.get('format') == ARTIFACT_FORMAT:
+        return checkpoint['state_dict'], {
+            'architecture': {**DEFAULT_ARCHITECTURE, **checkpoint['architecture']},
+            'labels': checkpoint.get('labels'),
+        }
+    architecture = dict(DEFAULT_ARCHITECTURE)
+    if 'bnorm2.weight' in checkpoint:
+        # The last batch norm has one feature per class.
+        architecture['num_classes'] = len(checkpoint['bnorm2.weight'])
+    return checkpoint, {'architecture': architecture, 'labels': None}
+
+
+def load_checkpoint(model_path, map_location='cpu'):
+    """
+    Loads a model artifact or plain state dict from disk.
+
+    Args:
+        model_path (str): Path to the checkpoint.
+        map_location: Passed to `torch.load`.
+
+    Returns:
+        dict: The state dict.
+        dict: Metadata, as returned by `read_checkpoint`.
+    """
+    return read_checkpoint(torch.load(model_path, map_location=map_location))
+
+
+def build_model(state_dict, architecture):
+    """
+    Builds a LipReadModel in eval mode from trained weights, without downloading
+    the ImageNet backbone.
+
+    Args:
+        state_dict (dict): Trained weights.
+        architecture (dict): Architecture metadata.
+
+    Returns:
+        LipReadModel: The model on the CPU.
+    """
+    model = LipReadModel(num_classes=architecture['num_classes'], pretrained_backbone=False)
+    model.load_state_dict(state_dict)
+    return model.eval()
+
+
+def labels_to_index_to_word(labels):
+    """
+    Converts a list of labels into the index-to-word mapping used for predictions.
+    """
+    return {index: label for index, label in enumerate(labels)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model', required=True, help='State dict or artifact to convert.')
+    parser.add_argument('--labels-dir', required=True,
+                        help='Directory with one folder per class, as used for training.')
+    parser.add_argument('--output', required=True)
+    args = parser.parse_args()
+
+    configure_logging()
+    state_dict, metadata = load_checkpoint(args.model)
+    index_to_word = create_index_to_word_dict(args.labels_dir)
+    labels = [index_to_word[index] for index in range(len(index_to_word))]
+    architecture = dict(metadata['architecture'], num_classes=len(labels))
+    save_model_artifact(state_dict, args.output, labels, architecture)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+import copy
+
+import torch
+import torch.nn as nn
+from torch.nn.utils.fusion import fuse_conv_bn_eval
+
+from backbone.feature_lateral_inhibition import PrecomputedLateralInhibition
+
+
+class ChannelsLast(nn.Module):
+    """
+    Runs a module in a channels-last memory layout.
+
+    The module's parameters are converted once and every input is converted
+    before the call, so the convolutions pick their channels-last kernels.
+
+    Args:
+        module (nn.Module): Module to wrap.
+        memory_format (torch.memory_format): `torch.channels_last` for 2D
+            modules or `torch.channels_last_3d` for 3D modules.
+    """
+
+    def __init__(self, module, memory_format=torch.channels_last):
+        super(ChannelsLast, self).__init__()
+        self.module = module.to(memory_format=memory_format)
+        self.memory_format = memory_format
+
+    def forward(self, x):
+        return self.module(x.contiguous(memory_format=self.memory_format))
+
+
+def _fold(parent, conv_name, bn_name):
+    """
+    Folds a BatchNorm into the preceding convolution and replaces it with an identity.
+    """
+    setattr(parent, conv_name, fuse_conv_bn_eval(
+        getattr(parent, conv_name), getattr(parent, bn_name)))
+    setattr(parent, bn_name, nn.Identity())
+
+
+def _fold_resnet(resnet):
+    _fold(resnet, 'conv1', 'bn1')
+    for layer in (resnet.layer1, resnet.layer2, resnet.layer3, resnet.layer4):
+        for block in layer:
+            _fold(block, 'conv1', 'bn1')
+            _fold(block, 'conv2', 'bn2')
+            if block.downsample is not None:
+                _fold(block.downsample, '0', '1')
+
+
+def freeze_model(model, channels_last=True):
+    """
+    Returns an inference-only copy of a LipReadModel.
+
+    The frozen model computes the same outputs as the model in eval mode
+    (up to floating-point rounding) with fewer operations:
+        - every BatchNorm is folded into the convolution before it,
+        - the lateral inhibition gate and weights are precomputed into one matrix,
+        - DropBlock and Dropout, which are no-ops in eval mode, are removed,
+        - optionally, the Conv3d front end and the per-frame ResNet run in the
+          channels-last layouts, which the output of the Conv3d keeps through
+          the ReLU and the max pooling.
+
+    The frozen model must not be trained. Input gradients still work, so it
+    can be used for saliency maps.
+
+    Args:
+        model (LipReadModel): The trained model; it is not modified.
+        channels_last (bool): Whether to use the channels-last memory layouts.
+
+    Returns:
+        LipReadModel: The frozen copy, in eval mode.
+    """
+    frozen = copy.deepcopy(model).eval()
+
+    _fold(frozen, 'conv3d', 'bnorm3d')
+    _fold_resnet(frozen.resnet)
+    for block in frozen.ms_tcn.network:
+        _fold(block, 'conv', 'bnorm')
+    _fold(frozen, 'temporal_conv1', 'bnorm1')
+    _fold(frozen, 'temporal_conv2', 'bnorm2')
+
+    frozen.dropblock3d = nn.Identity()
+    frozen.dropout1 = nn.Identity()
+    frozen.dropout2 = nn.Identity()
+    frozen.lateral_inhibition = PrecomputedLateralInhibition(
+        frozen.lateral_inhibition)
+
+    if channels_last:
+        frozen.conv3d = ChannelsLast(frozen.conv3d, torch.channels_last_3d)
+        frozen.resnet = ChannelsLast(frozen.resnet, torch.channels_last)
+    return frozen.eval()
+
+
+def check_equivalence(model, frozen, batch_sizes=(1, 4), depth=29, size=64, seed=0):
+    """
+    Compares the outputs of a frozen model with the original model on random inputs.
+
+    Args:
+        model (LipReadModel): The original model in eval mode.
+        frozen (LipReadModel): The output of `freeze_model`.
+        batch_sizes (tuple): Batch sizes to check.
+        depth (int): Number of frames per clip.
+        size (int): Height and width of the frames.
+        seed (int): Seed of the random inputs.
+
+    Returns:
+        dict: For each batch size, the maximum absolute logit difference and
+            whether the top-1 predictions agree.
+    """
+    device = next(model.parameters()).device
+    generator = torch.Generator().manual_seed(seed)
+    report = {}
+    for batch_size in batch_sizes:
+        inputs = torch.randn(batch_size, 1, depth, size, size,
+                             generator=generator).to(device)
+        with torch.inference_mode():
+            expected, actual = model(inputs), frozen(inputs)
+        report[batch_size] = {
+            'max_abs_diff': (expected - actual).abs().max().item(),
+            'top1_agree': bool((expected.argmax(1) == actual.argmax(1)).all()),
+        }
+    return report
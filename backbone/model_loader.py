@@ -1,8 +1,21 @@
+import functools
+import logging
+import os
+import threading
+
 import torch
 
-from backbone.temporal_multiscale_model import LipReadModel
+from backbone.model_artifacts import (
+    build_model, labels_to_index_to_word, load_checkpoint, read_checkpoint)
+from backbone.quantization import is_reduced_precision_artifact, load_artifact
+from backbone.model_freezing import freeze_model
+from backbone.saliency import compute_saliency
+from backbone.sliding_window import sliding_window_logits
+from backbone.streaming_recognizer import StreamingRecognizer
 from torchvision import transforms
 from config import project_config
+from processing.data_processing_utils import create_index_to_word_dict, file_digest
+from processing.instrumentation import stage_timer
 
 
 device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
@@ -13,30 +26,146 @@ class LipReadingModel:
     Wrapper class for the Lip Reading Model to handle initialization,
     preprocessing, and predictions.
 
+    Predictions without gradients run on the backend selected by
+    `Config.INFERENCE_BACKEND`: 'torch' for the PyTorch model or 'onnxruntime'
+    for the exported graph at `Config.ONNX_MODEL_PATH`. With the 'torch'
+    backend, `Config.MODEL_PATH` may also point to a quantized or bf16
+    artifact written by `backbone.quantization`. Other checkpoints can be
+    served side by side by passing their paths (see
+    `backbone.model_registry`). Input gradients always need the fp32 PyTorch
+    model, which is loaded on first use when it is not the model serving
+    predictions. With `Config.FREEZE_MODEL` the fp32 model is replaced by its
+    inference-only form from `backbone.model_freezing`.
+
+    The label map is read from the model artifact (see
+    `backbone.model_artifacts`) unless one is passed in. Plain state dicts
+    carry no labels, in which case they are listed from `labels_root`.
+
     Attributes:
         model (LipReadModel): The Lip Reading Model.
         index_to_word (dict): Mapping from class indices to word labels.
+        backend (str): Name of the inference backend.
+        version (str): Short content hash of the loaded checkpoint.
+        model_path (str): Checkpoint (or ONNX graph) serving the predictions.
     """
 
-    def __init__(self, index_to_word):
+    def __init__(self, index_to_word=None, backend=None, model_path=None, onnx_model_path=None,
+                 labels_root=None):
         """
         Initializes the LipReadingModel with the specified index-to-word mapping.
 
         Args:
-            index_to_word (dict): A dictionary mapping class indices to word labels.
+            index_to_word (dict): A dictionary mapping class indices to word labels;
+                defaults to the labels stored in the model artifact.
+            backend (str): 'torch' or 'onnxruntime'; defaults to `Config.INFERENCE_BACKEND`.
+            model_path (str): PyTorch checkpoint or artifact; defaults to `Config.MODEL_PATH`.
+            onnx_model_path (str): ONNX graph used by the 'onnxruntime' backend;
+                defaults to `Config.ONNX_MODEL_PATH`.
+            labels_root (str): Directory listed for class names when the checkpoint
+                has no label map; defaults to `Config.LABELS_ROOT`.
         """
-        self.model = LipReadModel(num_classes=19)
-        self.model.load_state_dict(torch.load(
-            project_config.Config.MODEL_PATH, map_location=device))
-        self.model.to(device)
-        self.model.eval()
+        config = project_config.Config
+        self.backend = backend or config.INFERENCE_BACKEND
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._float_model_path = model_path or config.MODEL_PATH
+
+        if self.backend == 'torch':
+            model_path = self._float_model_path
+            checkpoint = torch.load(model_path, map_location='cpu')
+            if is_reduced_precision_artifact(checkpoint):
+                self._runtime = load_artifact(checkpoint)
+                self._float_model_path = checkpoint['source_model_path']
+                labels = checkpoint.get('labels')
+            else:
+                state_dict, metadata = read_checkpoint(checkpoint)
+                self._model = self._build_model(state_dict, metadata['architecture'])
+                self._runtime = self._model
+                labels = metadata['labels']
+        elif self.backend == 'onnxruntime':
+            from backbone.onnx_backend import OnnxRuntimeBackend
+
+            model_path = onnx_model_path or config.ONNX_MODEL_PATH
+            self._runtime = OnnxRuntimeBackend(model_path)
+            labels = self._runtime.labels
+        else:
+            raise ValueError(f"Unknown inference backend '{self.backend}'")
+        self.model_path = model_path
+        self.version = file_digest(model_path)[:16]
+
+        if index_to_word is None:
+            if labels is not None:
+                index_to_word = labels_to_index_to_word(labels)
+            else:
+                labels_root = labels_root or config.LABELS_ROOT
+                logging.warning("%s has no label map; listing classes from %s",
+                                model_path, labels_root)
+                index_to_word = create_index_to_word_dict(labels_root)
         self.index_to_word = index_to_word
 
+    @property
+    def model(self):
+        """
+        The fp32 PyTorch model, loaded on first access.
+        """
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    state_dict, metadata = load_checkpoint(self._float_model_path)
+                    self._model = self._build_model(state_dict, metadata['architecture'])
+        return self._model
+
+    def memory_bytes(self):
+        """
+        Estimates the memory held by the weights of the loaded model(s).
+
+        PyTorch models are measured by their parameters and buffers; other
+        runtimes (ONNX Runtime, quantized artifacts) by the size of their file.
+
+        Returns:
+            int: Estimated size in bytes.
+        """
+        total = 0
+        if self._model is not None:
+            tensors = {tensor.data_ptr(): tensor.numel() * tensor.element_size()
+                       for tensor in (*self._model.parameters(), *self._model.buffers())}
+            total += sum(tensors.values())
+        if self._runtime is not self._model:
+            total += os.path.getsize(self.model_path)
+        return total
+
+    @staticmethod
+    def _build_model(state_dict, architecture):
+        model = build_model(state_dict, architecture)
+        model.to(device)
+        if project_config.Config.FREEZE_MODEL:
+            model = freeze_model(model)
+        # The model is never trained here; saliency only needs input gradients.
+        return model.requires_grad_(False)
+
+    def warm_up(self, return_grad=False):
+        """
+        Runs one prediction on a blank clip so that the first real request does
+        not pay for lazy initialization in the backend.
+
+        Args:
+            return_grad (bool): Whether to also warm up the gradient path used
+                for saliency maps, loading the fp32 model if needed.
+        """
+        frames_tensor = torch.zeros(1, 29, 1, 64, 64)
+        self.predict_batch(frames_tensor)
+        if return_grad:
+            self.predict_batch(frames_tensor, return_grad=True)
+
     @staticmethod
+    @functools.lru_cache(maxsize=1)
     def transform():
         """
         Returns a transformation pipeline to preprocess image frames.
 
+        The pipeline is built once and shared. For batches of frames prefer
+        `processing.frame_preprocessing.preprocess_frames`, which is vectorized.
+
         Returns:
             torchvision.transforms.Compose: The transformation pipeline.
         """
@@ -54,36 +183,157 @@ class LipReadingModel:
 
         Args:
             frames_tensor (torch.Tensor): A tensor of frames to predict from.
-                - Expected shape: (batch_size, channels, depth, height, width) for 5D tensors.
+                - Expected shape: (batch_size, depth, channels, height, width) for 5D tensors.
                 - Expected shape: (channels, depth, height, width) for 4D tensors.
             return_grad (bool): If True, returns the gradient of the input tensor for saliency maps.
 
         Returns:
-            list of tuple: A list of top-k words with their corresponding probabilities.
+            list of tuple: A list of top-k words with their corresponding probabilities
+                for the first sample of the batch.
             torch.Tensor (optional): Gradients of the input tensor if `return_grad=True`.
         """
+        if return_grad:
+            predictions, grad_output = self.predict_batch(
+                frames_tensor, return_grad=True)
+            return predictions[0], grad_output
+        return self.predict_batch(frames_tensor)[0]
+
+    def predict_batch(self, frames_tensor, return_grad=False):
+        """
+        Predicts the top-k words for every sample of a batch in one forward pass.
+
+        Samples are independent in eval mode, so the input gradient of each
+        sample equals the gradient of a single-sample call. Without
+        `return_grad` the forward pass runs under `torch.inference_mode`.
+
+        Args:
+            frames_tensor (torch.Tensor): A tensor of frames, shaped as for `predict`.
+            return_grad (bool): If True, also returns the saliency maps of the top
+                prediction, computed with `Config.SALIENCY_METHOD` (by default
+                the per-sample input gradients).
+
+        Returns:
+            list of list of tuple: Top-k (word, probability) pairs for each sample.
+            torch.Tensor (optional): Saliency maps of shape (batch_size, channels, depth,
+                height, width) if `return_grad=True`.
+        """
         if frames_tensor.dim() == 5:
             frames_tensor = frames_tensor.permute(0, 2, 1, 3, 4)
         if frames_tensor.dim() == 4:
             frames_tensor = frames_tensor.unsqueeze(0)
+        frames_tensor = frames_tensor.to(device)
 
-        frames_tensor.requires_grad_(return_grad)
+        if return_grad:
+            logits, _, saliency_maps = compute_saliency(self.model, frames_tensor)
+            return self._top_predictions(torch.softmax(logits, dim=1)), saliency_maps[:, 0]
 
-        with torch.set_grad_enabled(return_grad):
-            outputs = self.model(frames_tensor)
-            probabilities = torch.softmax(outputs, dim=1)
+        num_frames = frames_tensor.shape[0] * frames_tensor.shape[2]
+        with torch.inference_mode(), stage_timer('forward', frames=num_frames):
+            probabilities = torch.softmax(self._runtime(frames_tensor), dim=1)
+        return self._top_predictions(probabilities)
 
-            if return_grad:
-                target_class = outputs.argmax(dim=1)
-                outputs[:, target_class].sum().backward()
+    def saliency(self, frames_tensor, top_k=1, targets=None, method=None, layer=None):
+        """
+        Computes saliency maps for several classes of every sample in one pass.
 
-        topk_probs, topk_indices = torch.topk(probabilities, 5)
-        topk_words = [self.index_to_word[int(index)]
-                      for index in topk_indices[0].cpu().numpy()]
-        topk_probs = [float(prob) for prob in topk_probs[0].tolist()]
+        Args:
+            frames_tensor (torch.Tensor): A tensor of frames, shaped as for `predict`.
+            top_k (int): Number of top predicted classes explained per sample.
+            targets (list): Words to explain instead of the top predictions,
+                the same for every sample.
+            method (str): 'gradient' or 'gradcam'; defaults to `Config.SALIENCY_METHOD`.
+            layer (str): Layer used by Grad-CAM; defaults to `Config.SALIENCY_GRADCAM_LAYER`.
 
-        if return_grad:
-            grad_output = frames_tensor.grad.detach()
-            return list(zip(topk_words, topk_probs)), grad_output
-        else:
-            return list(zip(topk_words, topk_probs))
+        Returns:
+            list of list of tuple: Top-k (word, probability) pairs for each sample.
+            list of list of str: The words explained for each sample.
+            torch.Tensor: Maps of shape (batch_size, num_targets, channels, depth,
+                height, width), in the order of the explained words.
+        """
+        if frames_tensor.dim() == 5:
+            frames_tensor = frames_tensor.permute(0, 2, 1, 3, 4)
+        if frames_tensor.dim() == 4:
+            frames_tensor = frames_tensor.unsqueeze(0)
+        if targets is not None:
+            word_to_index = {word: index for index, word in self.index_to_word.items()}
+            unknown = [word for word in targets if word not in word_to_index]
+            if unknown:
+                raise ValueError(f"Unknown words: {unknown}")
+            targets = torch.tensor([word_to_index[word] for word in targets]) \
+                .expand(frames_tensor.size(0), -1)
+
+        logits, target_classes, saliency_maps = compute_saliency(
+            self.model, frames_tensor.to(device), targets, top_k, method, layer)
+        words = [[self.index_to_word[int(index)] for index in sample]
+                 for sample in target_classes.tolist()]
+        return self._top_predictions(torch.softmax(logits, dim=1)), words, saliency_maps
+
+    def predict_timeline(self, frames_tensor, window=None, stride=None):
+        """
+        Predicts the top-k words for every window of a long sequence of frames.
+
+        Frame embeddings are computed once with the PyTorch model and shared by
+        the overlapping windows (see `backbone.sliding_window`).
+
+        Args:
+            frames_tensor (torch.Tensor): Frames of shape (1, num_frames, channels, height, width).
+            window (int): Frames per window; defaults to `Config.TIMELINE_WINDOW`.
+            stride (int): Frames between window starts; defaults to `Config.TIMELINE_STRIDE`.
+
+        Returns:
+            list of int: The first frame of each window.
+            list of list of tuple: Top-k (word, probability) pairs for each window.
+        """
+        config = project_config.Config
+        window = window or config.TIMELINE_WINDOW
+        stride = stride or config.TIMELINE_STRIDE
+        frames = frames_tensor.permute(0, 2, 1, 3, 4).to(device)
+        with torch.inference_mode(), stage_timer('forward', frames=frames.shape[2]):
+            starts, logits = sliding_window_logits(
+                self.model, frames, window, stride, config.TIMELINE_BATCH_SIZE,
+                config.TIMELINE_EXACT_BOUNDARIES)
+        if not starts:
+            return [], []
+        return starts, self._top_predictions(torch.softmax(logits, dim=1))
+
+    def create_stream(self, window=None):
+        """
+        Creates a recognizer for a live stream of frames backed by the PyTorch model.
+
+        Args:
+            window (int): Frames per prediction; defaults to `Config.STREAM_WINDOW`.
+
+        Returns:
+            StreamingRecognizer: An empty recognizer.
+        """
+        return StreamingRecognizer(self.model, window or project_config.Config.STREAM_WINDOW)
+
+    def predict_stream(self, recognizer, timings=None):
+        """
+        Predicts the top-k words for the frames buffered in a stream recognizer.
+
+        Args:
+            recognizer (StreamingRecognizer): Recognizer created by `create_stream`.
+            timings (dict): Optional dict receiving the model stage latencies.
+
+        Returns:
+            list of tuple: Top-k (word, probability) pairs, or None if the
+                recognizer does not hold a full window yet.
+        """
+        with torch.inference_mode(), stage_timer('forward'):
+            logits = recognizer.logits(timings)
+        if logits is None:
+            return None
+        return self._top_predictions(torch.softmax(logits, dim=1))[0]
+
+    def _top_predictions(self, probabilities, k=5):
+        """
+        Converts class probabilities into top-k (word, probability) lists, one per row.
+        """
+        topk_probs, topk_indices = torch.topk(probabilities, k)
+        predictions = []
+        for sample_probs, sample_indices in zip(topk_probs.tolist(), topk_indices.tolist()):
+            topk_words = [self.index_to_word[int(index)]
+                          for index in sample_indices]
+            predictions.append(list(zip(topk_words, sample_probs)))
+        return predictions
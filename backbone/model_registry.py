@@ -0,0 +1,361 @@
+import collections
+import logging
+import os
+import threading
+
+import torch
+
+from backbone.model_artifacts import DEFAULT_ARCHITECTURE, read_checkpoint
+from backbone.quantization import is_reduced_precision_artifact
+from config import project_config
+from processing.data_processing_utils import file_digest
+
+PIPELINE_INPUT = {'frames': 29, 'input_size': 64}
+"""Clip length and mouth crop size the processing pipeline feeds every model."""
+
+_digests = {}
+_digests_lock = threading.Lock()
+
+
+def describe_checkpoint(model_path):
+    """
+    Reads the class count, label map and input size of a checkpoint without
+    building the model.
+
+    Zip-format checkpoints are memory-mapped, so the weights are not read.
+
+    Args:
+        model_path (str): Model artifact, quantized artifact or plain state dict.
+
+    Returns:
+        dict: 'num_classes', 'frames', 'input_size' and 'labels' (None when
+            the checkpoint has no label map).
+    """
+    try:
+        checkpoint = torch.load(model_path, map_location='cpu', mmap=True)
+    except RuntimeError:
+        # Checkpoints in the legacy (non-zip) format cannot be memory-mapped.
+        checkpoint = torch.load(model_path, map_location='cpu')
+    if is_reduced_precision_artifact(checkpoint):
+        architecture = dict(DEFAULT_ARCHITECTURE, num_classes=checkpoint['num_classes'])
+        labels = checkpoint.get('labels')
+    else:
+        _, metadata = read_checkpoint(checkpoint)
+        architecture, labels = metadata['architecture'], metadata['labels']
+    return dict(architecture, labels=labels)
+
+
+def check_pipeline_input(description):
+    """
+    Checks that a checkpoint expects the clips the processing pipeline produces.
+
+    Args:
+        description (dict): Checkpoint description from `describe_checkpoint`.
+
+    Raises:
+        ValueError: If its 'frames' or 'input_size' differ from `PIPELINE_INPUT`.
+    """
+    mismatches = [f"{key} {description[key]} (pipeline: {expected})"
+                  for key, expected in PIPELINE_INPUT.items() if description[key] != expected]
+    if mismatches:
+        raise ValueError(f"Model expects {', '.join(mismatches)}")
+
+
+def spec_backend(spec):
+    """
+    Returns the inference backend a registry entry is served with.
+    """
+    # Only models with an exported graph can use a non-PyTorch backend.
+    return spec.get('backend') or (
+        project_config.Config.INFERENCE_BACKEND if spec.get('onnx_path') else 'torch')
+
+
+def spec_version(spec):
+    """
+    Returns the version a registry entry would have once loaded, without loading it.
+
+    The version is the short content hash of the file serving the predictions
+    (see `LipReadingModel.version`). Hashes are cached until the file's size
+    or modification time changes.
+
+    Args:
+        spec (dict): Entry of `Config.MODELS`.
+
+    Returns:
+        str: The model version.
+    """
+    config = project_config.Config
+    if spec_backend(spec) == 'onnxruntime':
+        path = spec.get('onnx_path') or config.ONNX_MODEL_PATH
+    else:
+        path = spec.get('path') or config.MODEL_PATH
+    stat = os.stat(path)
+    key = (os.path.realpath(path), stat.st_size, stat.st_mtime_ns)
+    with _digests_lock:
+        version = _digests.get(key)
+    if version is None:
+        version = file_digest(path)[:16]
+        with _digests_lock:
+            _digests[key] = version
+    return version
+
+
+def load_model(spec):
+    """
+    Loads the model described by a registry entry.
+
+    Args:
+        spec (dict): Entry of `Config.MODELS` with a 'path' and optionally a
+            'backend', an 'onnx_path' and a 'labels_root'.
+
+    Returns:
+        LipReadingModel: The loaded model.
+
+    Raises:
+        ValueError: If the checkpoint expects other clips than the pipeline produces.
+    """
+    from backbone.model_loader import LipReadingModel
+
+    check_pipeline_input(describe_checkpoint(spec.get('path') or project_config.Config.MODEL_PATH))
+
+    return LipReadingModel(backend=spec_backend(spec), model_path=spec.get('path'),
+                           onnx_model_path=spec.get('onnx_path'),
+                           labels_root=spec.get('labels_root'))
+
+
+class ModelRegistry:
+    """
+    The lip-reading models a server can serve side by side, loaded on first use.
+
+    Loaded models are kept in least-recently-used order. When the estimated
+    memory of their weights exceeds `memory_budget`, the least recently used
+    models are unloaded, but never the one just requested. A model can be
+    reloaded (optionally from a new checkpoint) while it keeps serving: the
+    replacement is built first and then swapped in atomically. Requests
+    holding an unloaded or replaced model finish with it, and its memory is
+    released when the last of them does. Models whose checkpoints expect
+    other clips than the pipeline produces (`PIPELINE_INPUT`) are rejected.
+
+    Attributes:
+        default (str): Name of the model used when a request names none.
+        memory_budget (int): Bytes of weights kept loaded; 0 for no limit.
+    """
+
+    def __init__(self, models=None, default=None, memory_budget=None, loader=load_model):
+        """
+        Initializes the registry without loading any model.
+
+        Args:
+            models (dict): Model specs by name; defaults to `Config.MODELS`.
+            default (str): Name of the default model; defaults to `Config.DEFAULT_MODEL`.
+            memory_budget (int): Bytes of weights kept loaded; defaults to
+                `Config.MODEL_MEMORY_BUDGET`.
+            loader (callable): Builds a model from a spec.
+        """
+        config = project_config.Config
+        self._specs = {name: dict(spec) for name, spec in (models or config.MODELS).items()}
+        self.default = default or config.DEFAULT_MODEL
+        self.memory_budget = config.MODEL_MEMORY_BUDGET if memory_budget is None else memory_budget
+        if self.default not in self._specs:
+            raise ValueError(f"Default model '{self.default}' is not one of {sorted(self._specs)}")
+        self._loader = loader
+        self._loaded = collections.OrderedDict()
+        self._loading = set()
+        self._condition = threading.Condition()
+        self._unload_callbacks = []
+
+    def names(self):
+        return list(self._specs)
+
+    def resolve(self, name=None):
+        """
+        Returns the name of the model a request asked for.
+
+        Args:
+            name (str): Requested model name, or None for the default.
+
+        Raises:
+            KeyError: If no model has that name.
+        """
+        if not name:
+            return self.default
+        if name not in self._specs:
+            raise KeyError(f"Unknown model '{name}', expected one of {sorted(self._specs)}")
+        return name
+
+    def get(self, name=None):
+        """
+        Returns a model, loading it on first use.
+
+        Concurrent requests for a model that is being loaded wait for it
+        instead of loading it again.
+
+        Args:
+            name (str): Model name; defaults to the default model.
+
+        Returns:
+            LipReadingModel: The loaded model.
+        """
+        name = self.resolve(name)
+        with self._condition:
+            while name in self._loading:
+                self._condition.wait()
+            if name in self._loaded:
+                self._loaded.move_to_end(name)
+                return self._loaded[name]
+            self._loading.add(name)
+            spec = self._specs[name]
+
+        try:
+            logging.info("Loading model '%s' from %s", name, spec.get('path'))
+            model = self._loader(spec)
+        finally:
+            with self._condition:
+                self._loading.discard(name)
+                self._condition.notify_all()
+        with self._condition:
+            # A reload that finished in the meantime wins.
+            model = self._loaded.setdefault(name, model)
+            self._loaded.move_to_end(name)
+            evicted = self._evict(keep=name)
+        self._notify_unloaded(evicted)
+        return model
+
+    def version(self, name=None):
+        """
+        Returns the version of a model without loading it.
+
+        Args:
+            name (str): Model name; defaults to the default model.
+
+        Returns:
+            str: The version of the loaded model, or of its checkpoint if it is not loaded.
+        """
+        name = self.resolve(name)
+        with self._condition:
+            model = self._loaded.get(name)
+            spec = self._specs[name]
+        return model.version if model is not None else spec_version(spec)
+
+    def reload(self, name=None, **changes):
+        """
+        Replaces a model without interrupting the requests it is serving.
+
+        Args:
+            name (str): Model name; defaults to the default model.
+            **changes: Spec keys to update, e.g. a new 'path'.
+
+        Returns:
+            LipReadingModel: The new model.
+        """
+        name = self.resolve(name)
+        with self._condition:
+            spec = dict(self._specs[name], **changes)
+        model = self._loader(spec)
+        with self._condition:
+            self._specs[name] = spec
+            previous = self._loaded.pop(name, None)
+            self._loaded[name] = model
+            evicted = self._evict(keep=name)
+        logging.info("Reloaded model '%s' from %s (version %s)", name, spec.get('path'),
+                     getattr(model, 'version', None))
+        self._notify_unloaded(([(name, previous)] if previous is not None else []) + evicted)
+        return model
+
+    def unload(self, name):
+        """
+        Drops a loaded model; it is loaded again on its next use.
+
+        Returns:
+            bool: Whether the model was loaded.
+        """
+        name = self.resolve(name)
+        with self._condition:
+            model = self._loaded.pop(name, None)
+        if model is None:
+            return False
+        self._notify_unloaded([(name, model)])
+        return True
+
+    def loaded(self):
+        """
+        Returns the names of the loaded models, least recently used first.
+        """
+        with self._condition:
+            return list(self._loaded)
+
+    def is_loaded(self, model):
+        """
+        Returns whether this model instance is currently held by the registry.
+        """
+        with self._condition:
+            return any(loaded is model for loaded in self._loaded.values())
+
+    def on_unload(self, callback):
+        """
+        Registers `callback(name, model)`, called when a model is unloaded or replaced.
+        """
+        self._unload_callbacks.append(callback)
+
+    def status(self):
+        """
+        Describes every model: its spec, class count, label count and input
+        size, and whether it is loaded with its estimated memory.
+
+        Returns:
+            list: One dict per model, in registration order.
+        """
+        with self._condition:
+            specs = dict(self._specs)
+            loaded = dict(self._loaded)
+        models = []
+        for name, spec in specs.items():
+            info = {'name': name, 'default': name == self.default, 'loaded': name in loaded,
+                    **spec}
+            try:
+                description = describe_checkpoint(spec['path'])
+                labels = description.pop('labels')
+                info.update(description, labels=len(labels) if labels is not None else None)
+                check_pipeline_input(description)
+            except (OSError, KeyError, RuntimeError, ValueError) as e:
+                info['error'] = str(e)
+            if name in loaded:
+                info.update(version=loaded[name].version,
+                            memory_bytes=loaded[name].memory_bytes())
+            models.append(info)
+        return models
+
+    def _evict(self, keep):
+        """
+        Unloads least recently used models until the loaded ones fit the budget.
+
+        Must be called with the lock held.
+
+        Returns:
+            list: The (name, model) pairs unloaded.
+        """
+        if not self.memory_budget:
+            return []
+        sizes = {name: model.memory_bytes() for name, model in self._loaded.items()}
+        total, evicted = sum(sizes.values()), []
+        for name in list(self._loaded):
+            if total <= self.memory_budget:
+                break
+            if name == keep:
+                continue
+            evicted.append((name, self._loaded.pop(name)))
+            total -= sizes[name]
+            logging.info("Unloaded model '%s' to stay within the %.0f MB model budget",
+                         name, self.memory_budget / (1024 * 1024))
+        if total > self.memory_budget:
+            logging.warning("Model '%s' alone needs %.0f MB, over the %.0f MB budget", keep,
+                            total / (1024 * 1024), self.memory_budget / (1024 * 1024))
+        return evicted
+
+    def _notify_unloaded(self, models):
+        for name, model in models:
+            for callback in self._unload_callbacks:
+                try:
+                    callback(name, model)
+                except Exception as e:
+                    logging.error("Unload callback for model '%s' failed: %s", name, e)
@@ -0,0 +1,63 @@
+import json
+import logging
+
+import numpy as np
+import torch
+
+from config import project_config
+
+
+class OnnxRuntimeBackend:
+    """
+    Runs an exported LipReadModel graph with ONNX Runtime on the CPU.
+
+    Instances are callable like the PyTorch model: they take a tensor of shape
+    (batch_size, channels, depth, height, width) and return the logits as a
+    tensor of shape (batch_size, num_classes). `onnxruntime` is imported only
+    when a backend is created, so it is an optional dependency.
+
+    Attributes:
+        onnx_path (str): Path to the exported graph.
+        session (onnxruntime.InferenceSession): The inference session.
+        labels (list): Class names stored in the graph metadata, or None.
+    """
+
+    def __init__(self, onnx_path, intra_op_threads=None):
+        """
+        Creates the inference session.
+
+        Args:
+            onnx_path (str): Path to the exported graph.
+            intra_op_threads (int): Threads used within an operator; defaults to
+                `Config.ONNX_INTRA_OP_THREADS` (0 lets ONNX Runtime decide).
+        """
+        import onnxruntime
+
+        if intra_op_threads is None:
+            intra_op_threads = project_config.Config.ONNX_INTRA_OP_THREADS
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = intra_op_threads
+        self.onnx_path = onnx_path
+        self.session = onnxruntime.InferenceSession(
+            onnx_path, options, providers=['CPUExecutionProvider'])
+        self._input_name = self.session.get_inputs()[0].name
+        labels = self.session.get_modelmeta().custom_metadata_map.get('labels')
+        self.labels = json.loads(labels) if labels else None
+        logging.info("Loaded ONNX Runtime session from %s", onnx_path)
+
+    def __call__(self, frames_tensor):
+        """
+        Runs the graph on a batch of clips.
+
+        Args:
+            frames_tensor (torch.Tensor): Input of shape (batch_size, channels, depth, height, width).
+
+        Returns:
+            torch.Tensor: Logits of shape (batch_size, num_classes).
+        """
+        inputs = np.ascontiguousarray(
+            frames_tensor.detach().cpu().numpy(), dtype=np.float32)
+        (logits,) = self.session.run(None, {self._input_name: inputs})
+        return torch.from_numpy(logits)
@@ -0,0 +1,133 @@
+"""
+Exports the LipReadModel to ONNX and checks the exported graph against PyTorch.
+
+Usage:
+    python -m backbone.onnx_export [--model trained_models/lipreading_model_v1.pt]
+        [--output trained_models/lipreading_model_v1.onnx] [--opset 17]
+"""
+import argparse
+import json
+import logging
+
+import numpy as np
+import torch
+
+from backbone.model_artifacts import build_model, load_checkpoint
+from config import project_config
+from processing.logging_config import configure_logging
+
+INPUT_NAME = 'frames'
+"""Name of the graph input, of shape (batch_size, channels, depth, height, width)."""
+
+OUTPUT_NAME = 'logits'
+"""Name of the graph output, of shape (batch_size, num_classes)."""
+
+
+def load_torch_model(model_path):
+    """
+    Loads a trained LipReadModel on the CPU in eval mode.
+
+    Args:
+        model_path (str): Path to a model artifact or state dict.
+
+    Returns:
+        LipReadModel: The loaded model.
+    """
+    state_dict, metadata = load_checkpoint(model_path)
+    return build_model(state_dict, metadata['architecture'])
+
+
+def export_onnx(model, output_path, depth=29, size=64, opset=17, labels=None):
+    """
+    Exports a model in eval mode to ONNX with a dynamic batch dimension.
+
+    Args:
+        model (LipReadModel): The model to export.
+        output_path (str): Destination of the .onnx file.
+        depth (int): Number of frames per clip.
+        size (int): Height and width of the frames.
+        opset (int): ONNX opset version.
+        labels (list): Optional class names, stored as JSON in the 'labels'
+            metadata property of the graph.
+
+    Returns:
+        str: The output path.
+    """
+    model.eval()
+    example = torch.randn(1, 1, depth, size, size)
+    with torch.no_grad():
+        torch.onnx.export(
+            model, (example,), output_path,
+            input_names=[INPUT_NAME], output_names=[OUTPUT_NAME],
+            dynamic_axes={INPUT_NAME: {0: 'batch_size'}, OUTPUT_NAME: {0: 'batch_size'}},
+            opset_version=opset, do_constant_folding=True, dynamo=False,
+        )
+    if labels is not None:
+        import onnx
+
+        onnx_model = onnx.load(output_path)
+        onnx.helper.set_model_props(onnx_model, {'labels': json.dumps(list(labels))})
+        onnx.save(onnx_model, output_path)
+    logging.info("Exported ONNX model to %s", output_path)
+    return output_path
+
+
+def check_parity(model, onnx_path, batch_sizes=(1, 2, 4, 8, 16), depth=29, size=64, seed=0):
+    """
+    Compares ONNX Runtime outputs with PyTorch outputs on random inputs.
+
+    Args:
+        model (LipReadModel): The reference model in eval mode.
+        onnx_path (str): Path to the exported graph.
+        batch_sizes (tuple): Batch sizes to check.
+        depth (int): Number of frames per clip.
+        size (int): Height and width of the frames.
+        seed (int): Seed of the random inputs.
+
+    Returns:
+        dict: For each batch size, the maximum absolute logit difference and
+            whether the top-1 predictions agree.
+    """
+    from backbone.onnx_backend import OnnxRuntimeBackend
+
+    backend = OnnxRuntimeBackend(onnx_path)
+    generator = torch.Generator().manual_seed(seed)
+    report = {}
+    for batch_size in batch_sizes:
+        inputs = torch.randn(batch_size, 1, depth, size, size, generator=generator)
+        with torch.inference_mode():
+            expected = model(inputs).numpy()
+        actual = backend(inputs).numpy()
+        report[batch_size] = {
+            'max_abs_diff': float(np.abs(expected - actual).max()),
+            'top1_agree': bool((expected.argmax(1) == actual.argmax(1)).all()),
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model', default=project_config.Config.MODEL_PATH)
+    parser.add_argument('--output', default=project_config.Config.ONNX_MODEL_PATH)
+    parser.add_argument('--opset', type=int, default=17)
+    parser.add_argument('--atol', type=float, default=1e-4,
+                        help='Maximum tolerated absolute logit difference.')
+    args = parser.parse_args()
+
+    configure_logging()
+    state_dict, metadata = load_checkpoint(args.model)
+    model = build_model(state_dict, metadata['architecture'])
+    export_onnx(model, args.output, opset=args.opset, labels=metadata['labels'])
+
+    failed = False
+    for batch_size, result in check_parity(model, args.output).items():
+        ok = result['max_abs_diff'] <= args.atol and result['top1_agree']
+        failed |= not ok
+        print(f"batch {batch_size:>2}: max |diff| {result['max_abs_diff']:.2e}  "
+              f"top-1 agree {result['top1_agree']}  {'ok' if ok else 'FAILED'}")
+    if failed:
+        raise SystemExit("ONNX outputs differ from PyTorch beyond the tolerance")
+
+
+if __name__ == '__main__':
+    main()
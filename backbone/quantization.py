@@ -0,0 +1,271 @@
+"""
+Post-training quantization and reduced-precision variants of the LipReadModel.
+
+Variants:
+    dynamic  int8 weights for the Linear layers, activations quantized on the fly.
+    static   int8 Conv2d (ResNet trunk) and Conv1d (MS-TCN) path, calibrated
+             on a directory of preprocessed clips.
+    bf16     fp32 weights run under bfloat16 autocast.
+
+The result is saved as an artifact that `LipReadingModel` loads through
+`Config.MODEL_PATH` like a regular checkpoint.
+
+Usage:
+    python -m backbone.quantization --mode static --calibration-dir data/preprocessed
+        --output trained_models/lipreading_model_v1_int8.pt
+"""
+import argparse
+import copy
+import glob
+import logging
+import os
+
+import torch
+import torch.nn as nn
+
+from backbone.model_artifacts import build_model, load_checkpoint
+from backbone.temporal_multiscale_model import LipReadModel
+from config import project_config
+from processing.logging_config import configure_logging
+
+QUANTIZATION_MODES = ('dynamic', 'static')
+"""Supported int8 quantization schemes."""
+
+PRECISIONS = ('fp32', 'bf16')
+"""Supported compute precisions of the float parts of a model."""
+
+STATIC_SUBMODULES = ('resnet', 'ms_tcn')
+"""Submodules of the LipReadModel holding the Conv2d/Conv1d path quantized statically."""
+
+ARTIFACT_FORMAT = 'lipreading-reduced-precision'
+"""Value of the 'format' key identifying a quantized or bf16 artifact."""
+
+
+def is_reduced_precision_artifact(checkpoint):
+    """
+    Checks whether a loaded checkpoint is an artifact written by `save_artifact`.
+
+    Args:
+        checkpoint: Object returned by `torch.load`.
+
+    Returns:
+        bool: True for an artifact, False for a plain state dict.
+    """
+    return isinstance(checkpoint, dict) and checkpoint.get('format') == ARTIFACT_FORMAT
+
+
+def _static_example_inputs(model):
+    """
+    Returns example inputs used to trace each of the `STATIC_SUBMODULES`.
+    """
+    resnet_channels = model.resnet.conv1.in_channels
+    tcn_channels = model.ms_tcn.network[0].conv.in_channels
+    return {
+        'resnet': torch.randn(1, resnet_channels, 16, 16),
+        'ms_tcn': torch.randn(1, tcn_channels, 29),
+    }
+
+
+def _prepare_static(model, engine):
+    """
+    Inserts observers into the ResNet trunk and the MS-TCN of a float model.
+    """
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import prepare_fx
+
+    torch.backends.quantized.engine = engine
+    qconfig_mapping = get_default_qconfig_mapping(engine)
+    for name, example in _static_example_inputs(model).items():
+        setattr(model, name, prepare_fx(
+            getattr(model, name), qconfig_mapping, (example,)))
+    return model
+
+
+def _convert_static(model):
+    from torch.ao.quantization.quantize_fx import convert_fx
+
+    for name in STATIC_SUBMODULES:
+        setattr(model, name, convert_fx(getattr(model, name)))
+    return model
+
+
+def iter_calibration_clips(calibration_dir, limit=None):
+    """
+    Yields model inputs from the `<clip>.pt` tensors written by `preprocess_directory`.
+
+    Args:
+        calibration_dir (str): Directory of preprocessed clips.
+        limit (int): Maximum number of clips, or None for all of them.
+
+    Yields:
+        torch.Tensor: Input of shape (1, channels, depth, height, width).
+    """
+    paths = sorted(glob.glob(os.path.join(calibration_dir, '*.pt')))
+    if not paths:
+        raise ValueError(f"No preprocessed clips found in {calibration_dir}")
+    for path in paths[:limit]:
+        yield torch.load(path, map_location='cpu').permute(0, 2, 1, 3, 4)
+
+
+def quantize_dynamic(model):
+    """
+    Quantizes the Linear layers of a float model to int8 with dynamic activations.
+
+    Args:
+        model (LipReadModel): Float model in eval mode; it is not modified.
+
+    Returns:
+        LipReadModel: The quantized copy.
+    """
+    from torch.ao.quantization import quantize_dynamic as ao_quantize_dynamic
+
+    return ao_quantize_dynamic(
+        copy.deepcopy(model).cpu().eval(), {nn.Linear}, dtype=torch.qint8)
+
+
+def quantize_static(model, calibration_clips, engine=None):
+    """
+    Statically quantizes the Conv2d/Conv1d path of a float model to int8.
+
+    The ResNet trunk and the MS-TCN are traced with FX, calibrated by running
+    the whole model on the given clips, and converted. The Conv3d front end,
+    the temporal head and the lateral inhibition stay in float.
+
+    Args:
+        model (LipReadModel): Float model in eval mode; it is not modified.
+        calibration_clips (iterable): Inputs of shape (batch_size, channels, depth, height, width).
+        engine (str): Quantized engine; defaults to the current `torch.backends.quantized.engine`.
+
+    Returns:
+        LipReadModel: The quantized copy.
+    """
+    engine = engine or torch.backends.quantized.engine
+    prepared = _prepare_static(copy.deepcopy(model).cpu().eval(), engine)
+    calibrated = 0
+    with torch.no_grad():
+        for clip in calibration_clips:
+            prepared(clip)
+            calibrated += clip.size(0)
+    logging.info("Calibrated static quantization on %d clips", calibrated)
+    return _convert_static(prepared)
+
+
+class ReducedPrecisionModel:
+    """
+    Runs a quantized or bf16 LipReadModel on the CPU.
+
+    Instances are callable like the float model and return fp32 logits.
+
+    Attributes:
+        model (LipReadModel): The underlying model.
+        quantization (str): 'dynamic', 'static' or None.
+        precision (str): 'fp32' or 'bf16'.
+    """
+
+    def __init__(self, model, quantization=None, precision='fp32'):
+        self.model = model
+        self.quantization = quantization
+        self.precision = precision
+
+    def __call__(self, frames_tensor):
+        """
+        Args:
+            frames_tensor (torch.Tensor): Input of shape (batch_size, channels, depth, height, width).
+
+        Returns:
+            torch.Tensor: Logits of shape (batch_size, num_classes).
+        """
+        frames_tensor = frames_tensor.cpu()
+        if self.precision == 'bf16':
+            with torch.autocast('cpu', dtype=torch.bfloat16):
+                return self.model(frames_tensor).float()
+        return self.model(frames_tensor)
+
+
+def save_artifact(model, output_path, quantization=None, precision='fp32', num_classes=19,
+                  source_model_path=None, labels=None):
+    """
+    Saves a (quantized) model together with what is needed to rebuild it.
+
+    Args:
+        model (LipReadModel): Model returned by `quantize_dynamic`, `quantize_static`
+            or a float model for bf16.
+        output_path (str): Destination of the artifact.
+        quantization (str): 'dynamic', 'static' or None.
+        precision (str): 'fp32' or 'bf16'.
+        num_classes (int): Number of output classes.
+        source_model_path (str): fp32 checkpoint the artifact was made from; used
+            when input gradients are needed.
+        labels (list): Class names in class-index order, if known.
+    """
+    if quantization not in QUANTIZATION_MODES + (None,):
+        raise ValueError(f"Unknown quantization '{quantization}'")
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision '{precision}'")
+    torch.save({
+        'format': ARTIFACT_FORMAT,
+        'quantization': quantization,
+        'precision': precision,
+        'engine': torch.backends.quantized.engine,
+        'num_classes': num_classes,
+        'source_model_path': source_model_path,
+        'labels': labels,
+        'state_dict': model.state_dict(),
+    }, output_path)
+    logging.info("Saved %s/%s model to %s", quantization or 'float', precision, output_path)
+
+
+def load_artifact(artifact):
+    """
+    Rebuilds the model stored in an artifact.
+
+    Args:
+        artifact (dict): Loaded artifact written by `save_artifact`.
+
+    Returns:
+        ReducedPrecisionModel: The model, ready for inference on the CPU.
+    """
+    model = LipReadModel(num_classes=artifact['num_classes'],
+                         pretrained_backbone=False).cpu().eval()
+    quantization = artifact['quantization']
+    if quantization == 'dynamic':
+        model = quantize_dynamic(model)
+    elif quantization == 'static':
+        model = _convert_static(_prepare_static(model, artifact['engine']))
+    model.load_state_dict(artifact['state_dict'])
+    return ReducedPrecisionModel(model.eval(), quantization, artifact['precision'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--mode', choices=QUANTIZATION_MODES + ('bf16',), required=True)
+    parser.add_argument('--model', default=project_config.Config.MODEL_PATH,
+                        help='fp32 checkpoint to quantize.')
+    parser.add_argument('--output', required=True)
+    parser.add_argument('--calibration-dir',
+                        help='Directory of <clip>.pt tensors from processing.frame_preprocessing.')
+    parser.add_argument('--calibration-clips', type=int, default=200)
+    args = parser.parse_args()
+
+    configure_logging()
+    state_dict, metadata = load_checkpoint(args.model)
+    model = build_model(state_dict, metadata['architecture'])
+    artifact_options = {
+        'num_classes': metadata['architecture']['num_classes'],
+        'source_model_path': args.model,
+        'labels': metadata['labels'],
+    }
+
+    if args.mode == 'dynamic':
+        save_artifact(quantize_dynamic(model), args.output, 'dynamic', **artifact_options)
+    elif args.mode == 'static':
+        if not args.calibration_dir:
+            parser.error('--calibration-dir is required for static quantization')
+        clips = iter_calibration_clips(args.calibration_dir, args.calibration_clips)
+        save_artifact(quantize_static(model, clips), args.output, 'static', **artifact_options)
+    else:
+        save_artifact(model, args.output, precision='bf16', **artifact_options)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+"""
+Saliency maps of the lip-reading model.
+
+Two methods are available:
+    - 'gradient': the gradient of a class score with respect to the input
+      frames. It is computed with `torch.autograd.grad` for the input only,
+      so no parameter gradients are computed or accumulated in `.grad`.
+    - 'gradcam': Grad-CAM on the activations of one layer, upsampled to the
+      frame size. The backward pass stops at that layer, so the layers before
+      it need no autograd graph at all.
+
+Several target classes per clip share one forward pass and its graph; only
+the backward pass is repeated per target.
+"""
+import torch
+import torch.nn.functional as F
+
+from config import project_config
+from processing.instrumentation import stage_timer
+
+METHODS = ('gradient', 'gradcam')
+"""Available saliency methods."""
+
+
+def resolve_targets(logits, targets=None, top_k=1):
+    """
+    Returns the target classes of each sample as a (batch_size, num_targets) tensor.
+
+    Args:
+        logits (torch.Tensor): Model outputs of shape (batch_size, num_classes).
+        targets: Class indices, as an int, a (batch_size,) or a (batch_size,
+            num_targets) tensor; None to use the `top_k` predicted classes.
+        top_k (int): Number of predicted classes used when `targets` is None.
+    """
+    if targets is None:
+        return logits.topk(top_k, dim=1).indices
+    targets = torch.as_tensor(targets, dtype=torch.long, device=logits.device)
+    if targets.dim() == 0:
+        targets = targets.expand(logits.size(0))
+    if targets.dim() == 1:
+        targets = targets.unsqueeze(1)
+    return targets
+
+
+def _class_score_gradients(logits, inputs, targets):
+    """
+    Differentiates the score of every target class with respect to `inputs`.
+
+    Returns:
+        torch.Tensor: Gradients of shape (batch_size, num_targets, *inputs.shape[1:]).
+    """
+    num_targets = targets.size(1)
+    grad_outputs = torch.zeros((num_targets,) + tuple(logits.shape), device=logits.device)
+    grad_outputs.scatter_(2, targets.t().unsqueeze(2), 1.0)
+    # One backward pass per target over the shared graph. Batching them with
+    # `is_grads_batched` is no faster on CPU and holds every target's
+    # intermediate gradients at once.
+    gradients = [torch.autograd.grad(logits, inputs, grad_output,
+                                     retain_graph=i < num_targets - 1)[0]
+                 for i, grad_output in enumerate(grad_outputs)]
+    return torch.stack(gradients, dim=1)
+
+
+def input_gradients(model, inputs, targets=None, top_k=1):
+    """
+    Computes the gradients of class scores with respect to the input only.
+
+    Args:
+        model (torch.nn.Module): The lip-reading model in eval mode.
+        inputs (torch.Tensor): Frames of shape (batch_size, channels, depth, height, width).
+        targets: Target classes, see `resolve_targets`; defaults to the `top_k` predictions.
+        top_k (int): Number of predicted classes explained when `targets` is None.
+
+    Returns:
+        torch.Tensor: Logits of shape (batch_size, num_classes).
+        torch.Tensor: Target classes of shape (batch_size, num_targets).
+        torch.Tensor: Gradients of shape (batch_size, num_targets, channels, depth, height, width).
+    """
+    inputs = inputs.detach().requires_grad_(True)
+    num_frames = inputs.size(0) * inputs.size(2)
+    with torch.enable_grad():
+        with stage_timer('forward', frames=num_frames):
+            logits = model(inputs)
+        targets = resolve_targets(logits.detach(), targets, top_k)
+        with stage_timer('backward', frames=num_frames * targets.size(1)):
+            gradients = _class_score_gradients(logits, inputs, targets)
+    return logits.detach(), targets, gradients
+
+
+def find_layer(model, name):
+    """
+    Returns the submodule `name` of a model, also when parts of the model are
+    wrapped (e.g. 'resnet.layer1' in a frozen model, where the ResNet is
+    wrapped as 'resnet.module').
+    """
+    for module_name, module in model.named_modules():
+        if module_name == name or module_name.replace('.module', '') == name:
+            return module
+    raise ValueError(f"Model has no layer '{name}'")
+
+
+def grad_cam(model, inputs, targets=None, top_k=1, layer=None):
+    """
+    Computes Grad-CAM maps on the activations of one layer.
+
+    Each channel of the layer's activations is weighted by the spatial mean
+    of its gradient; the weighted sum is passed through a ReLU and upsampled
+    to the frame size. Layers inside the ResNet see one frame per sample
+    and give one map per frame; 3D layers give one map per frame directly.
+
+    Args:
+        model (torch.nn.Module): The lip-reading model in eval mode.
+        inputs (torch.Tensor): Frames of shape (batch_size, channels, depth, height, width).
+        targets: Target classes, see `resolve_targets`; defaults to the `top_k` predictions.
+        top_k (int): Number of predicted classes explained when `targets` is None.
+        layer (str): Name of the layer; defaults to `Config.SALIENCY_GRADCAM_LAYER`.
+
+    Returns:
+        torch.Tensor: Logits of shape (batch_size, num_classes).
+        torch.Tensor: Target classes of shape (batch_size, num_targets).
+        torch.Tensor: Maps of shape (batch_size, num_targets, 1, depth, height, width).
+    """
+    batch_size, _, depth, height, width = inputs.shape
+    activations = []
+
+    def keep_activations(module, module_inputs, output):
+        # Nothing before the layer needs gradients, so the graph starts here.
+        # The clone keeps in-place ops that follow the layer (e.g. ReLU) off the leaf.
+        output = output.detach().requires_grad_(True)
+        activations.append(output)
+        return output.clone()
+
+    handle = find_layer(model, layer or project_config.Config.SALIENCY_GRADCAM_LAYER) \
+        .register_forward_hook(keep_activations)
+    num_frames = batch_size * depth
+    try:
+        with torch.enable_grad():
+            with stage_timer('forward', frames=num_frames):
+                logits = model(inputs.detach())
+            targets = resolve_targets(logits.detach(), targets, top_k)
+            with stage_timer('backward', frames=num_frames * targets.size(1)):
+                gradients = _class_score_gradients(logits, activations[0], targets)
+    finally:
+        handle.remove()
+
+    activation = activations[0].detach()
+    if activation.dim() == 4:
+        # 2D layers see (batch_size * depth) frames; bring depth next to the spatial axes.
+        activation = activation.reshape(batch_size, depth, *activation.shape[1:]).transpose(1, 2)
+        gradients = gradients.reshape(batch_size, depth, *gradients.shape[1:]) \
+            .permute(0, 2, 3, 1, 4, 5)
+    # activation: (batch, channels, depth, h, w); gradients: (batch, targets, channels, depth, h, w)
+    weights = gradients.mean(dim=(-2, -1), keepdim=True)
+    cams = F.relu((weights * activation.unsqueeze(1)).sum(dim=2))
+    cams = F.interpolate(cams.flatten(0, 1).unsqueeze(1), size=(depth, height, width),
+                         mode='trilinear', align_corners=False)
+    return logits.detach(), targets, cams.view(batch_size, -1, 1, depth, height, width)
+
+
+def compute_saliency(model, inputs, targets=None, top_k=1, method=None, layer=None):
+    """
+    Computes saliency maps with the given method.
+
+    Args:
+        model (torch.nn.Module): The lip-reading model in eval mode.
+        inputs (torch.Tensor): Frames of shape (batch_size, channels, depth, height, width).
+        targets: Target classes, see `resolve_targets`; defaults to the `top_k` predictions.
+        top_k (int): Number of predicted classes explained when `targets` is None.
+        method (str): One of `METHODS`; defaults to `Config.SALIENCY_METHOD`.
+        layer (str): Layer used by Grad-CAM.
+
+    Returns:
+        torch.Tensor: Logits of shape (batch_size, num_classes).
+        torch.Tensor: Target classes of shape (batch_size, num_targets).
+        torch.Tensor: Maps of shape (batch_size, num_targets, channels, depth, height, width).
+    """
+    method = method or project_config.Config.SALIENCY_METHOD
+    if method == 'gradient':
+        return input_gradients(model, inputs, targets, top_k)
+    if method == 'gradcam':
+        return grad_cam(model, inputs, targets, top_k, layer)
+    raise ValueError(f"Unknown saliency method '{method}', expected one of {METHODS}")
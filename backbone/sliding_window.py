@@ -0,0 +1,113 @@
+import torch
+
+
+def sequence_features(model, frames, chunk_size=256):
+    """
+    Computes the embedding of every frame of a long sequence once.
+
+    The sequence is processed in chunks that overlap by `model.frame_context`
+    frames, so the result equals running `extract_frame_features` on the whole
+    sequence at once while bounding the memory of the 3D front end.
+
+    Args:
+        model (LipReadModel): Model in eval mode.
+        frames (torch.Tensor): Input of shape (1, channels, num_frames, height, width).
+        chunk_size (int): Number of frames whose embeddings are computed per call.
+
+    Returns:
+        torch.Tensor: Frame embeddings of shape (1, num_frames, features).
+    """
+    num_frames = frames.size(2)
+    context = model.frame_context
+    chunks = []
+    for start in range(0, num_frames, chunk_size):
+        stop = min(start + chunk_size, num_frames)
+        low, high = max(start - context, 0), min(stop + context, num_frames)
+        chunks.append(model.extract_frame_features(
+            frames[:, :, low:high], slice(start - low, stop - low)))
+    return torch.cat(chunks, dim=1)
+
+
+def window_starts(num_frames, window, stride):
+    """
+    Returns the first frame of every window, with the last window aligned to
+    the end of the sequence so that no trailing frames are skipped.
+
+    Args:
+        num_frames (int): Length of the sequence.
+        window (int): Number of frames per window.
+        stride (int): Distance between the starts of consecutive windows.
+
+    Returns:
+        list: Window start indices; empty if the sequence is shorter than a window.
+    """
+    if num_frames < window:
+        return []
+    starts = list(range(0, num_frames - window + 1, stride))
+    if starts[-1] != num_frames - window:
+        starts.append(num_frames - window)
+    return starts
+
+
+def _edge_features(model, frames, starts, window, side):
+    """
+    Recomputes the embeddings of the first or last `frame_context` frames of
+    each window as they are when the window is zero-padded on its own.
+    """
+    context = model.frame_context
+    span = 2 * context
+    if side == 'left':
+        inputs = torch.cat([frames[:, :, start:start + span] for start in starts])
+        return model.extract_frame_features(inputs, slice(None, context))
+    inputs = torch.cat([frames[:, :, start + window - span:start + window] for start in starts])
+    return model.extract_frame_features(inputs, slice(-context, None))
+
+
+def sliding_window_logits(model, frames, window=29, stride=1, batch_size=16,
+                          exact_boundaries=True, chunk_size=256):
+    """
+    Classifies every window of a long sequence, computing frame embeddings once.
+
+    The 3D front end and the ResNet run once over the whole sequence; for each
+    window only the MS-TCN and the temporal head run on its slice of the
+    embeddings. A window's first and last `frame_context` frames see their
+    neighbours outside the window in the shared embeddings, whereas the model
+    run on the window alone sees zero padding there. With `exact_boundaries`
+    those few frames are recomputed per window so the logits match running the
+    model on each window separately.
+
+    Args:
+        model (LipReadModel): Model in eval mode.
+        frames (torch.Tensor): Input of shape (1, channels, num_frames, height, width).
+        window (int): Number of frames per window.
+        stride (int): Distance between the starts of consecutive windows.
+        batch_size (int): Number of windows classified per forward pass of the head.
+        exact_boundaries (bool): Whether to recompute the boundary frames of each window.
+        chunk_size (int): Frames per call when computing the shared embeddings.
+
+    Returns:
+        list: Window start indices.
+        torch.Tensor: Logits of shape (num_windows, num_classes).
+    """
+    num_frames = frames.size(2)
+    starts = window_starts(num_frames, window, stride)
+    if not starts:
+        return [], torch.empty(0, model.num_classes)
+
+    features = sequence_features(model, frames, chunk_size)[0]
+    context = model.frame_context
+    logits = []
+    for batch_start in range(0, len(starts), batch_size):
+        batch_starts = starts[batch_start:batch_start + batch_size]
+        windows = torch.stack([features[start:start + window] for start in batch_starts])
+        if exact_boundaries and context:
+            left = [i for i, start in enumerate(batch_starts) if start > 0]
+            right = [i for i, start in enumerate(batch_starts) if start + window < num_frames]
+            if left:
+                windows[left, :context] = _edge_features(
+                    model, frames, [batch_starts[i] for i in left], window, 'left')
+            if right:
+                windows[right, -context:] = _edge_features(
+                    model, frames, [batch_starts[i] for i in right], window, 'right')
+        logits.append(model.classify_features(windows))
+    return starts, torch.cat(logits)
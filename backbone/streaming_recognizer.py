@@ -0,0 +1,110 @@
+import collections
+import time
+
+import torch
+
+
+class StreamingRecognizer:
+    """
+    Classifies the most recent frames of a live stream, reusing work between predictions.
+
+    Frames are kept in a ring buffer of `window` preprocessed crops. Each frame's
+    embedding (3D front end + ResNet) is computed once, at the first prediction
+    where all its `frame_context` neighbours are in the buffer, and reused by
+    later predictions while the frame stays in the window; only the MS-TCN and
+    the head run on the whole window. The first and last `frame_context` frames
+    are recomputed with the window's own zero padding, so the logits equal
+    running the model on the buffered window as a clip (see
+    `backbone.sliding_window`). Instances are not thread-safe.
+
+    Attributes:
+        window (int): Number of frames classified per prediction.
+        frames_seen (int): Number of frames pushed since creation or the last reset.
+    """
+
+    def __init__(self, model, window=29):
+        """
+        Initializes an empty ring buffer.
+
+        Args:
+            model (LipReadModel): Model in eval mode.
+            window (int): Number of frames classified per prediction.
+        """
+        self.model = model
+        self.window = window
+        self._device = next(model.parameters()).device
+        self.frames_seen = 0
+        self._frames = collections.deque(maxlen=window)
+        self._features = collections.deque(maxlen=window)
+
+    @property
+    def ready(self):
+        """
+        True once the buffer holds a full window.
+        """
+        return len(self._frames) == self.window
+
+    def reset(self):
+        """
+        Empties the ring buffer.
+        """
+        self._frames.clear()
+        self._features.clear()
+        self.frames_seen = 0
+
+    def push(self, frame):
+        """
+        Appends a preprocessed frame, evicting the oldest one when the buffer is full.
+
+        Args:
+            frame (torch.Tensor): Normalized crop of shape (channels, height, width).
+        """
+        self._frames.append(frame.to(self._device))
+        self._features.append(None)
+        self.frames_seen += 1
+
+    def logits(self, timings=None):
+        """
+        Classifies the buffered window.
+
+        Args:
+            timings (dict): Optional dict receiving 'features_ms' and 'classify_ms'.
+
+        Returns:
+            torch.Tensor: Logits of shape (1, num_classes), or None if the buffer
+                does not hold a full window yet.
+        """
+        if not self.ready:
+            return None
+
+        start = _now_ms()
+        context = self.model.frame_context
+        # (1, channels, window, height, width)
+        frames = torch.stack(tuple(self._frames), dim=1).unsqueeze(0)
+        interior = range(context, self.window - context)
+        pending = [i for i in interior if self._features[i] is None]
+        if pending:
+            low, high = pending[0], pending[-1] + 1
+            computed = self.model.extract_frame_features(
+                frames[:, :, low - context:high + context], slice(context, -context or None))[0]
+            for i in range(low, high):
+                self._features[i] = computed[i - low]
+
+        features = torch.stack(tuple(self._features)[context:self.window - context])
+        if context:
+            left = self.model.extract_frame_features(
+                frames[:, :, :2 * context], slice(None, context))[0]
+            right = self.model.extract_frame_features(
+                frames[:, :, -2 * context:], slice(-context, None))[0]
+            features = torch.cat([left, features, right])
+        classify_start = _now_ms()
+        logits = self.model.classify_features(features.unsqueeze(0))
+
+        if timings is not None:
+            timings['features_ms'] = classify_start - start
+            timings['classify_ms'] = _now_ms() - classify_start
+        return logits
+
+
+def _now_ms():
+    return time.perf_counter() * 1000
@@ -81,15 +81,20 @@ class LipReadModel(nn.Module):
 
     Args:
         num_classes (int): Number of output classes.
+        pretrained_backbone (bool): Whether to initialize the ResNet with ImageNet
+            weights, which are downloaded if not cached. Pass False when a trained
+            checkpoint is loaded afterwards.
     """
 
-    def __init__(self, num_classes):
+    def __init__(self, num_classes, pretrained_backbone=True):
         super(LipReadModel, self).__init__()
         self.num_classes = num_classes
 
         self.conv3d = nn.Conv3d(
             1, 64, (5, 7, 7), stride=(1, 2, 2), padding=(2, 3, 3)
         )
+        # Number of neighbouring frames on each side a frame embedding depends on.
+        self.frame_context = self.conv3d.kernel_size[0] // 2
         self.bnorm3d = nn.BatchNorm3d(num_features=64)
         self.relu3d = nn.ReLU(inplace=True)
         self.mpool3d = nn.MaxPool3d(
@@ -97,7 +102,8 @@ class LipReadModel(nn.Module):
         )
         self.dropblock3d = DropBlock3D(block_size=5, drop_prob=0.1)
 
-        self.resnet = models.resnet18(pretrained=True)
+        self.resnet = models.resnet18(
+            weights=models.ResNet18_Weights.DEFAULT if pretrained_backbone else None)
         self.resnet.conv1 = nn.Conv2d(
             64, 64, kernel_size=(7, 7), stride=(2, 2), padding=(3, 3), bias=False
         )
@@ -135,17 +141,48 @@ class LipReadModel(nn.Module):
         Returns:
             torch.Tensor: Output tensor of shape (batch_size, num_classes).
         """
+        return self.classify_features(self.extract_frame_features(x))
+
+    def extract_frame_features(self, x, frame_slice=None):
+        """
+        Computes one embedding per frame with the 3D front end and the ResNet.
+
+        The temporal kernel of the 3D convolution spans `frame_context` frames
+        on each side, so a frame's embedding depends only on its neighbours
+        within that distance (zero-padded at the ends of the input).
+
+        Args:
+            x (torch.Tensor): Input tensor of shape (batch_size, channels, depth, height, width).
+            frame_slice (slice): Optional slice of the frames whose embeddings are
+                needed; the ResNet then only runs on those frames.
+
+        Returns:
+            torch.Tensor: Frame embeddings of shape (batch_size, depth, features).
+        """
         x = self.relu3d(self.bnorm3d(self.conv3d(x)))
         if self.training:
             x = self.dropblock3d(x)
         x = self.mpool3d(x)
+        if frame_slice is not None:
+            x = x[:, :, frame_slice]
 
         batch_size, channels, depth, height, width = x.size()
         x = x.permute(0, 2, 1, 3, 4).contiguous()
         x = x.view(batch_size * depth, channels, height, width)
         x = self.resnet(x)
 
-        x = x.view(batch_size, depth, -1)
+        return x.view(batch_size, depth, -1)
+
+    def classify_features(self, x):
+        """
+        Classifies a sequence of frame embeddings with the MS-TCN and the temporal head.
+
+        Args:
+            x (torch.Tensor): Frame embeddings of shape (batch_size, depth, features).
+
+        Returns:
+            torch.Tensor: Output tensor of shape (batch_size, num_classes).
+        """
         x = x.permute(0, 2, 1).contiguous()
         x = self.ms_tcn(x)
 
@@ -0,0 +1,81 @@
+import time
+import statistics
+
+import cv2
+
+from processing.motion_analysis import analyze_motion, select_top_frames
+
+
+def time_call(fn, repeats=5, warmup=1):
+    """
+    Times repeated calls of a function.
+
+    Args:
+        fn (callable): Zero-argument function to time.
+        repeats (int): Number of timed calls.
+        warmup (int): Number of untimed calls made first.
+
+    Returns:
+        dict: Mean, median, min and max latency in milliseconds, and the last return value.
+    """
+    for _ in range(warmup):
+        fn()
+
+    timings, result = [], None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return {
+        'mean_ms': statistics.mean(timings),
+        'median_ms': statistics.median(timings),
+        'min_ms': min(timings),
+        'max_ms': max(timings),
+        'result': result,
+    }
+
+
+def load_selected_frames(video_path, top_n=29):
+    """
+    Decodes a video and returns the frames the pipeline would select.
+
+    Args:
+        video_path (str): Path to the video file.
+        top_n (int): Number of frames to select.
+
+    Returns:
+        list: Selected video frames.
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise Exception(f"Error opening video file: {video_path}")
+    frames, motion_scores = analyze_motion(cap)
+    return select_top_frames(frames, motion_scores, top_n)
+
+
+def format_row(name, stats):
+    """
+    Formats a timing result as a single report line.
+
+    Args:
+        name (str): Label of the measured operation.
+        stats (dict): Output of `time_call`.
+
+    Returns:
+        str: Human-readable report line.
+    """
+    return (f"{name:<32} mean {stats['mean_ms']:9.2f} ms  "
+            f"median {stats['median_ms']:9.2f} ms  min {stats['min_ms']:9.2f} ms")
+
+
+def load_lip_reading_model():
+    """
+    Loads the lip-reading model from `Config.MODEL_PATH` with placeholder labels.
+
+    Returns:
+        LipReadingModel: The loaded model wrapper.
+    """
+    from backbone.model_loader import LipReadingModel
+
+    return LipReadingModel({index: f"class_{index}" for index in range(19)})
@@ -0,0 +1,75 @@
+"""
+Measures inference throughput under concurrent load with and without batching.
+
+Several client threads send single-clip requests at the same time, either
+serialized through one lock (one forward pass per request) or through the
+`DynamicBatcher`.
+
+Usage:
+    python -m benchmarks.dynamic_batching [--clients 8] [--requests 10] [--saliency]
+"""
+import argparse
+import threading
+import time
+
+import torch
+
+from backbone.inference_scheduler import DynamicBatcher
+from benchmarks.bench_utils import load_lip_reading_model
+
+
+def run_load(predict, clients, requests_per_client, return_grad):
+    """
+    Sends requests from several threads and measures the throughput.
+
+    Args:
+        predict (callable): Function called as predict(frames_tensor, return_grad=...).
+        clients (int): Number of concurrent client threads.
+        requests_per_client (int): Requests sent by each client.
+        return_grad (bool): Whether requests ask for input gradients.
+
+    Returns:
+        float: Requests per second.
+    """
+    def client():
+        for _ in range(requests_per_client):
+            predict(torch.randn(1, 29, 1, 64, 64), return_grad=return_grad)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return clients * requests_per_client / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=10)
+    parser.add_argument('--max-batch-size', type=int, default=8)
+    parser.add_argument('--window-ms', type=float, default=10)
+    parser.add_argument('--saliency', action='store_true',
+                        help='Request input gradients as the /demo route does.')
+    args = parser.parse_args()
+
+    lip_reading_model = load_lip_reading_model()
+    lock = threading.Lock()
+
+    def serialized_predict(frames_tensor, return_grad=False):
+        with lock:
+            return lip_reading_model.predict(frames_tensor, return_grad=return_grad)
+
+    sequential = run_load(serialized_predict, args.clients, args.requests, args.saliency)
+    batcher = DynamicBatcher(lip_reading_model, args.max_batch_size, args.window_ms)
+    batched = run_load(batcher.predict, args.clients, args.requests, args.saliency)
+    batcher.shutdown()
+
+    print(f"{args.clients} clients x {args.requests} requests")
+    print(f"one forward per request: {sequential:8.2f} req/s")
+    print(f"dynamic batching:        {batched:8.2f} req/s ({batched / sequential:.2f}x)")
+
+
+if __name__ == '__main__':
+    main()
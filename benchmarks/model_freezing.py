@@ -0,0 +1,96 @@
+"""
+Checks that the frozen model matches the original one and compares per-layer latency.
+
+Latency is measured with forward hooks on the top-level layers of the model;
+time spent between layers (reshapes, the final mean) is reported as 'other'.
+
+Usage:
+    python -m benchmarks.model_freezing [--batch-size 1] [--repeats 10] [--no-channels-last]
+"""
+import argparse
+import collections
+import time
+
+import torch
+
+from backbone.model_freezing import check_equivalence, freeze_model
+from backbone.onnx_export import load_torch_model
+from config import project_config
+
+
+def layer_latencies(model, inputs, repeats):
+    """
+    Measures the mean latency of each top-level layer of a model.
+
+    Args:
+        model (nn.Module): Model to profile.
+        inputs (torch.Tensor): Model input.
+        repeats (int): Number of timed forward passes, after one warm-up pass.
+
+    Returns:
+        collections.OrderedDict: Mean milliseconds per layer name, plus 'other'
+            and 'total'.
+    """
+    timings = collections.OrderedDict()
+    starts = {}
+
+    def pre_hook(name):
+        def hook(module, args):
+            starts[name] = time.perf_counter()
+        return hook
+
+    def post_hook(name):
+        def hook(module, args, output):
+            elapsed = (time.perf_counter() - starts[name]) * 1000
+            timings[name] = timings.get(name, 0.0) + elapsed
+        return hook
+
+    handles = []
+    for name, module in model.named_children():
+        handles.append(module.register_forward_pre_hook(pre_hook(name)))
+        handles.append(module.register_forward_hook(post_hook(name)))
+
+    with torch.inference_mode():
+        model(inputs)
+        timings.clear()
+        start = time.perf_counter()
+        for _ in range(repeats):
+            model(inputs)
+        total = (time.perf_counter() - start) * 1000
+    for handle in handles:
+        handle.remove()
+
+    latencies = collections.OrderedDict(
+        (name, elapsed / repeats) for name, elapsed in timings.items())
+    latencies['other'] = total / repeats - sum(latencies.values())
+    latencies['total'] = total / repeats
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model', default=project_config.Config.MODEL_PATH)
+    parser.add_argument('--batch-size', type=int, default=1)
+    parser.add_argument('--repeats', type=int, default=10)
+    parser.add_argument('--no-channels-last', dest='channels_last', action='store_false')
+    args = parser.parse_args()
+
+    model = load_torch_model(args.model)
+    frozen = freeze_model(model, channels_last=args.channels_last)
+
+    for batch_size, result in check_equivalence(model, frozen).items():
+        print(f"batch {batch_size}: max |diff| {result['max_abs_diff']:.2e}  "
+              f"top-1 agree {result['top1_agree']}")
+
+    inputs = torch.randn(args.batch_size, 1, 29, 64, 64)
+    before = layer_latencies(model, inputs, args.repeats)
+    after = layer_latencies(frozen, inputs, args.repeats)
+
+    print(f"\n{'layer':<20} {'before ms':>10} {'after ms':>10}")
+    for name in before:
+        print(f"{name:<20} {before[name]:>10.3f} {after.get(name, 0.0):>10.3f}")
+    print(f"\nspeedup: {before['total'] / after['total']:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
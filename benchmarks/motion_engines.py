@@ -0,0 +1,110 @@
+"""
+Compares motion-scoring engines on speed and frame selection agreement.
+
+Every engine scores the same decoded frames; its selection of the top frames
+is compared with the full-resolution Farneback baseline.
+
+Usage:
+    python -m benchmarks.motion_engines [videos...] [--engines dis frame_diff]
+"""
+import argparse
+import glob
+import time
+
+import cv2
+import numpy as np
+
+from processing.motion_engines import MOTION_ENGINES, create_motion_scorer
+
+
+def decode_frames(video_path):
+    """
+    Decodes all frames of a video into memory.
+
+    Args:
+        video_path (str): Path to the video file.
+
+    Returns:
+        list: Decoded BGR frames.
+    """
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    while cap.isOpened():
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def score_frames(scorer, frames):
+    """
+    Scores consecutive frame pairs with a motion scorer.
+
+    Args:
+        scorer (MotionScorer): The engine to use.
+        frames (list): Decoded BGR frames.
+
+    Returns:
+        list: Motion scores, one per frame pair.
+        float: Elapsed time in seconds.
+    """
+    start = time.perf_counter()
+    prepared = [scorer.prepare(frame) for frame in frames]
+    scores = [scorer.score(a, b) for a, b in zip(prepared, prepared[1:])]
+    return scores, time.perf_counter() - start
+
+
+def top_indices(scores, top_n):
+    """
+    Returns the indices `select_top_frames` would keep for the given scores.
+    """
+    return set(np.argsort(scores, kind='stable')[-top_n:].tolist())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('videos', nargs='*',
+                        help='Videos to benchmark; defaults to a sample of data/dataset/val_20.')
+    parser.add_argument('--engines', nargs='+', default=sorted(MOTION_ENGINES))
+    parser.add_argument('--baseline', default='farneback')
+    parser.add_argument('--top-n', type=int, default=29)
+    parser.add_argument('--limit', type=int, default=20,
+                        help='Number of sample videos used when none are given.')
+    args = parser.parse_args()
+
+    videos = args.videos or sorted(
+        glob.glob('data/dataset/val_20/*/*.mp4'))[:args.limit]
+    if not videos:
+        parser.error('no videos given and no sample videos found')
+
+    baseline_total = 0.0
+    timings = {name: 0.0 for name in args.engines}
+    overlaps = {name: [] for name in args.engines}
+    for video_path in videos:
+        frames = decode_frames(video_path)
+        baseline_scores, baseline_time = score_frames(
+            create_motion_scorer(args.baseline), frames)
+        baseline = top_indices(baseline_scores, args.top_n)
+        baseline_total += baseline_time
+
+        for name in args.engines:
+            if name == args.baseline:
+                scores, elapsed = baseline_scores, baseline_time
+            else:
+                scores, elapsed = score_frames(create_motion_scorer(name), frames)
+            timings[name] += elapsed
+            selected = top_indices(scores, args.top_n)
+            overlaps[name].append(len(selected & baseline) / max(len(baseline), 1))
+
+    print(f"{len(videos)} videos, baseline '{args.baseline}'")
+    print(f"{'engine':<20}{'total s':>10}{'speedup':>10}{'mean overlap':>15}{'identical':>12}")
+    for name in args.engines:
+        identical = sum(overlap == 1.0 for overlap in overlaps[name])
+        print(f"{name:<20}{timings[name]:>10.2f}{baseline_total / max(timings[name], 1e-9):>9.1f}x"
+              f"{np.mean(overlaps[name]):>15.3f}{identical:>8}/{len(videos)}")
+
+
+if __name__ == '__main__':
+    main()
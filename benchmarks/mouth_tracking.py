@@ -0,0 +1,151 @@
+"""
+Compares per-frame mouth detection with keyframe detection plus tracking.
+
+For each video, every frame (or, with --selected, the 29 frames chosen by
+motion analysis) is located both ways. The report gives the detector calls
+saved, the time per frame, the IoU of the tracked boxes with the per-frame
+boxes, the mean pixel difference of the 64x64 crops and the box jitter (mean
+change of the box centre's velocity between frames, in pixels).
+
+Without videos, a synthetic clip is generated and its ground-truth mouth
+boxes stand in for the detector, so tracking can be checked against known
+motion without a trained detector.
+
+Usage:
+    python -m benchmarks.mouth_tracking [VIDEO ...] [--interval 5] [--max-frames 150]
+        [--selected] [--smoothing 0.6]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks.bench_utils import load_selected_frames
+from benchmarks.synthetic_video import generate_video
+from processing.mouth_tracking import MouthTracker, box_iou
+
+
+def read_frames(video_path, max_frames):
+    """
+    Decodes up to `max_frames` consecutive frames of a video.
+    """
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    while len(frames) < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def jitter(bboxes):
+    """
+    Returns the mean absolute second difference of the box centres in pixels.
+    """
+    centers = np.array([[(box[0] + box[2]) / 2, (box[1] + box[3]) / 2]
+                        for box in bboxes if box is not None])
+    if len(centers) < 3:
+        return 0.0
+    return float(np.abs(np.diff(centers, n=2, axis=0)).mean())
+
+
+def crop_difference(frames, reference, bboxes, crop):
+    """
+    Returns the mean absolute pixel difference of the crops of two sets of boxes.
+    """
+    differences = [np.abs(crop(frame, a).astype(np.float32) - crop(frame, b)).mean()
+                   for frame, a, b in zip(frames, reference, bboxes) if a and b]
+    return float(np.mean(differences)) if differences else float('nan')
+
+
+def compare(frames, detect, crop, interval, smoothing):
+    """
+    Locates the mouth in `frames` per frame and with the tracker.
+
+    Returns:
+        dict: Timings, detector calls and agreement of the two methods.
+    """
+    start = time.perf_counter()
+    reference = detect(frames)
+    per_frame_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    bboxes, stats = MouthTracker(detect, interval, smoothing=smoothing).track(frames)
+    tracking_s = time.perf_counter() - start
+
+    ious = [box_iou(a, b) for a, b in zip(reference, bboxes)]
+    return {
+        'frames': len(frames),
+        'detector_calls': stats['detector_calls'],
+        'redetections': stats['redetections'],
+        'per_frame_ms': per_frame_s * 1000 / len(frames),
+        'tracking_ms': tracking_s * 1000 / len(frames),
+        'mean_iou': statistics.mean(ious),
+        'min_iou': min(ious),
+        'crop_diff': crop_difference(frames, reference, bboxes, crop),
+        'jitter_detected': jitter(reference),
+        'jitter_tracked': jitter(bboxes),
+    }
+
+
+def ground_truth_detector(frames, mouth_boxes):
+    """
+    Returns a detector that answers with the known boxes of the given frames.
+    """
+    boxes = {id(frame): box for frame, box in zip(frames, mouth_boxes)}
+    return lambda batch: [boxes[id(frame)] for frame in batch]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('videos', nargs='*')
+    parser.add_argument('--interval', type=int, default=5,
+                        help='Frames between scheduled detector calls')
+    parser.add_argument('--smoothing', type=float, default=0.6,
+                        help='Weight of the new box in the moving average')
+    parser.add_argument('--max-frames', type=int, default=150)
+    parser.add_argument('--selected', action='store_true',
+                        help='Use the frames selected by motion analysis instead of all frames')
+    args = parser.parse_args()
+
+    from processing.mouth_frame_extractor import VideoProcessor
+
+    crop = VideoProcessor.crop_mouth
+    cases = []
+    if args.videos:
+        video_processor = VideoProcessor()
+        for video_path in args.videos:
+            frames = (load_selected_frames(video_path) if args.selected
+                      else read_frames(video_path, args.max_frames))
+            cases.append((os.path.basename(video_path), frames,
+                          video_processor.extract_mouth_bboxes))
+    else:
+        with tempfile.TemporaryDirectory() as workdir:
+            video_path = os.path.join(workdir, 'synthetic.mp4')
+            mouth_boxes = generate_video(video_path, args.max_frames)
+            frames = read_frames(video_path, args.max_frames)
+        cases.append(('synthetic (ground truth)', frames,
+                      ground_truth_detector(frames, mouth_boxes)))
+
+    print(f"{'video':<26} {'frames':>6} {'detector':>9} {'saved':>6} {'frame ms':>9} "
+          f"{'track ms':>9} {'IoU':>6} {'min IoU':>8} {'crop diff':>10} {'jitter':>15}")
+    for name, frames, detect in cases:
+        if not frames:
+            print(f"{name:<26} no frames")
+            continue
+        result = compare(frames, detect, crop, args.interval, args.smoothing)
+        saved = 1 - result['detector_calls'] / result['frames']
+        print(f"{name:<26} {result['frames']:>6} {result['detector_calls']:>9} {saved:>6.0%} "
+              f"{result['per_frame_ms']:>9.2f} {result['tracking_ms']:>9.2f} "
+              f"{result['mean_iou']:>6.3f} {result['min_iou']:>8.3f} {result['crop_diff']:>10.2f} "
+              f"{result['jitter_detected']:>6.2f} -> {result['jitter_tracked']:<5.2f}")
+
+
+if __name__ == '__main__':
+    main()
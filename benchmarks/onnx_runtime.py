@@ -0,0 +1,60 @@
+"""
+Compares PyTorch and ONNX Runtime CPU inference latency and throughput.
+
+The model at `Config.MODEL_PATH` is exported to a temporary ONNX file (or
+`--onnx` is used), its outputs are checked against PyTorch, and both
+backends are timed for each batch size.
+
+Usage:
+    python -m benchmarks.onnx_runtime [--onnx path.onnx] [--batch-sizes 1 2 4 8 16] [--repeats 10]
+"""
+import argparse
+import os
+import tempfile
+
+import torch
+
+from backbone.onnx_backend import OnnxRuntimeBackend
+from backbone.onnx_export import check_parity, export_onnx, load_torch_model
+from benchmarks.bench_utils import time_call
+from config import project_config
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model', default=project_config.Config.MODEL_PATH)
+    parser.add_argument('--onnx', help='Existing export to use instead of exporting the model.')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--repeats', type=int, default=10)
+    parser.add_argument('--threads', type=int, default=0,
+                        help='Intra-op threads for both backends; 0 keeps the defaults.')
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    model = load_torch_model(args.model)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        onnx_path = args.onnx or export_onnx(model, os.path.join(tmp_dir, 'model.onnx'))
+        parity = check_parity(model, onnx_path, args.batch_sizes)
+        backend = OnnxRuntimeBackend(onnx_path, args.threads)
+
+        print(f"{'batch':>5} {'torch ms':>10} {'ort ms':>10} {'torch clip/s':>13} "
+              f"{'ort clip/s':>11} {'speedup':>8} {'max |diff|':>11}")
+        for batch_size in args.batch_sizes:
+            inputs = torch.randn(batch_size, 1, 29, 64, 64)
+
+            def run_torch():
+                with torch.inference_mode():
+                    return model(inputs)
+
+            torch_stats = time_call(run_torch, args.repeats)
+            ort_stats = time_call(lambda: backend(inputs), args.repeats)
+            print(f"{batch_size:>5} {torch_stats['median_ms']:>10.2f} {ort_stats['median_ms']:>10.2f} "
+                  f"{batch_size * 1000 / torch_stats['median_ms']:>13.1f} "
+                  f"{batch_size * 1000 / ort_stats['median_ms']:>11.1f} "
+                  f"{torch_stats['median_ms'] / ort_stats['median_ms']:>7.2f}x "
+                  f"{parity[batch_size]['max_abs_diff']:>11.2e}")
+
+
+if __name__ == '__main__':
+    main()
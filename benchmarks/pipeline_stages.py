@@ -0,0 +1,365 @@
+"""
+Times every stage of the video pipeline on a synthetic video and checks the
+results against a saved baseline.
+
+Stages, each measured on its own inputs so they can be compared one by one:
+    open_decode                cv2.VideoCapture and decoding every frame
+    analyze_motion             motion scoring of the decoded frames
+    select_top_frames          picking the 29 frames with the most motion
+    extract_mouth_bbox         YOLO on one frame (per call)
+    extract_mouth_bboxes       batched YOLO on the 29 selected frames
+    calculate_mouth_bbox       box from keypoints (per call)
+    load_and_transform_frames  reading 29 crops from disk into a model input
+    model_forward              LipReadModel forward pass
+    saliency_backward          backward pass for the input gradients
+    generate_saliency_outputs  overlays, GIF encoding and writing
+
+For each stage the latency over --repeats runs and the peak memory of one
+extra run are recorded: the growth of the resident set (sampled, includes
+native allocations) and the peak of Python and NumPy allocations traced by
+`tracemalloc`. --save-baseline writes them as JSON. --compare checks a run
+against a baseline and exits with status 1 if a stage got slower or
+larger than its threshold.
+
+Usage:
+    python -m benchmarks.pipeline_stages [--frames 75] [--size 640x480] [--repeats 5]
+        [--stages model_forward ...] [--save-baseline baseline.json]
+        [--compare baseline.json] [--latency-threshold 0.25] [--memory-threshold 0.25]
+        [--threshold STAGE=FRACTION ...]
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+import torch
+
+from benchmarks.synthetic_video import generate_video
+from processing.instrumentation import current_rss
+
+LATENCY_FLOOR_MS = 1.0
+"""Latency increases below this many milliseconds are never reported as regressions."""
+
+MEMORY_FLOOR_MB = 4.0
+"""Memory increases below this many megabytes are never reported as regressions."""
+
+
+class FrameListCapture:
+    """
+    Minimal stand-in for cv2.VideoCapture that replays decoded frames, so
+    motion analysis can be timed without decoding.
+    """
+
+    def __init__(self, frames):
+        self._frames = iter(frames)
+        self._open = True
+
+    def isOpened(self):
+        return self._open
+
+    def read(self):
+        frame = next(self._frames, None)
+        return frame is not None, frame
+
+    def release(self):
+        self._open = False
+
+
+class PeakMemory:
+    """
+    Context manager recording the peak memory growth of the enclosed code.
+
+    Attributes:
+        rss_mb (float): Peak growth of the resident set, sampled every
+            millisecond.
+        traced_mb (float): Peak of the allocations traced by `tracemalloc`.
+    """
+
+    def __enter__(self):
+        self._start = current_rss()
+        self._peak = self._start
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+        self._sampler.start()
+        tracemalloc.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        _, traced_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self._stop.set()
+        self._sampler.join()
+        self._peak = max(self._peak, current_rss())
+        self.rss_mb = (self._peak - self._start) / (1024 * 1024)
+        self.traced_mb = traced_peak / (1024 * 1024)
+
+    def _sample(self):
+        while not self._stop.wait(0.001):
+            self._peak = max(self._peak, current_rss())
+
+
+def measure(fn, setup=None, repeats=5, warmup=1, number=1):
+    """
+    Measures the latency and peak memory of a stage.
+
+    Args:
+        fn (callable): The stage; receives the values returned by `setup`.
+        setup (callable): Optional untimed function run before every call,
+            returning a tuple of arguments for `fn`.
+        repeats (int): Number of timed runs.
+        warmup (int): Number of untimed runs made first.
+        number (int): Calls per run, for stages too fast to time one by one.
+
+    Returns:
+        dict: Mean, median, min and max milliseconds per call, and the peak
+            memory in megabytes of one more run.
+    """
+    def run():
+        args = setup() if setup else ()
+        start = time.perf_counter()
+        for _ in range(number):
+            fn(*args)
+        return (time.perf_counter() - start) * 1000 / number
+
+    for _ in range(warmup):
+        run()
+    timings = [run() for _ in range(repeats)]
+
+    args = setup() if setup else ()
+    with PeakMemory() as memory:
+        fn(*args)
+
+    return {
+        'mean_ms': statistics.mean(timings),
+        'median_ms': statistics.median(timings),
+        'min_ms': min(timings),
+        'max_ms': max(timings),
+        'peak_rss_mb': memory.rss_mb,
+        'peak_traced_mb': memory.traced_mb,
+    }
+
+
+def build_stages(workdir, num_frames, width, height):
+    """
+    Generates the synthetic video, loads the models and prepares every stage's inputs.
+
+    Returns:
+        dict: (fn, setup, number) for each stage name, in pipeline order.
+    """
+    from backbone.model_loader import LipReadingModel
+    from processing.bbox_calculations import calculate_mouth_bbox
+    from processing.motion_analysis import analyze_motion, select_top_frames
+    from processing.mouth_frame_extractor import VideoProcessor
+    from processing.saliency_rendering import generate_saliency_outputs
+
+    video_path = os.path.join(workdir, 'synthetic.mp4')
+    mouth_boxes = generate_video(video_path, num_frames, width, height)
+    video_processor = VideoProcessor()
+    lip_reading_model = LipReadingModel()
+    model = lip_reading_model.model
+
+    def decode():
+        cap = cv2.VideoCapture(video_path)
+        frames = []
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+        cap.release()
+        return frames
+
+    frames = decode()
+    _, motion_scores = analyze_motion(FrameListCapture(frames))
+    selected_indices = sorted(np.argsort(motion_scores, kind='stable')[-29:])
+    selected = [frames[i] for i in selected_indices]
+
+    # Crops come from the detector where it finds the mouth, from the drawn
+    # mouth otherwise, so the later stages always get 29 frames.
+    bboxes = video_processor.extract_mouth_bboxes(selected)
+    crops = [video_processor.crop_mouth(frame, bbox or mouth_boxes[i])
+             for i, frame, bbox in zip(selected_indices, selected, bboxes)]
+    crops_folder = os.path.join(workdir, 'mouth_frames')
+    os.makedirs(crops_folder, exist_ok=True)
+    for i, crop in enumerate(crops):
+        cv2.imwrite(os.path.join(crops_folder, f"{i}.jpg"), crop)
+
+    x1, y1, x2, y2 = mouth_boxes[selected_indices[0]]
+    keypoints = np.array([[[x1, y1], [x2, y1], [x1, y2], [x2, y2], [(x1 + x2) / 2, y2]]],
+                         dtype=np.float32)
+    confidences = np.full(keypoints.shape[:2], 0.9, dtype=np.float32)
+
+    clip = video_processor.transform_frames(crops).permute(0, 2, 1, 3, 4)
+    clip = clip.to(next(model.parameters()).device)
+
+    def forward():
+        with torch.inference_mode():
+            model(clip)
+
+    def saliency_setup():
+        inputs = clip.clone().requires_grad_(True)
+        outputs = model(inputs)
+        return outputs, inputs
+
+    def saliency_backward(outputs, inputs):
+        outputs.gather(1, outputs.argmax(dim=1, keepdim=True)).sum().backward()
+
+    saliency_maps = np.abs(np.random.default_rng(0).standard_normal(
+        (len(crops), 64, 64))).astype(np.float32)
+
+    return {
+        'open_decode': (decode, None, 1),
+        'analyze_motion': (lambda capture: analyze_motion(capture),
+                           lambda: (FrameListCapture(frames),), 1),
+        'select_top_frames': (lambda: select_top_frames(frames, motion_scores), None, 100),
+        'extract_mouth_bbox': (lambda: video_processor.extract_mouth_bbox(selected[0]), None, 1),
+        'extract_mouth_bboxes': (lambda: video_processor.extract_mouth_bboxes(selected), None, 1),
+        'calculate_mouth_bbox': (lambda: calculate_mouth_bbox(width, keypoints, confidences),
+                                 None, 1000),
+        'load_and_transform_frames': (
+            lambda: video_processor.load_and_transform_frames(crops_folder), None, 1),
+        'model_forward': (forward, None, 1),
+        'saliency_backward': (saliency_backward, saliency_setup, 1),
+        'generate_saliency_outputs': (lambda: generate_saliency_outputs(
+            workdir, crops, saliency_maps), None, 1),
+    }
+
+
+def environment():
+    """
+    Describes the machine and library versions the results were measured with.
+    """
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'torch': torch.__version__,
+        'torch_threads': torch.get_num_threads(),
+        'opencv': cv2.__version__,
+        'numpy': np.__version__,
+        'cuda': torch.cuda.is_available(),
+    }
+
+
+def compare(results, baseline, latency_threshold, memory_threshold, stage_thresholds):
+    """
+    Checks results against a baseline.
+
+    A stage regresses when its median latency exceeds the baseline by more
+    than its threshold (a fraction, e.g. 0.25 for 25%) and by more than
+    `LATENCY_FLOOR_MS`, or when either peak memory figure grows by more than
+    `memory_threshold` and by more than `MEMORY_FLOOR_MB`.
+
+    Args:
+        results (dict): Measurements of this run, keyed by stage.
+        baseline (dict): Contents of a baseline file.
+        latency_threshold (float): Allowed relative latency increase.
+        memory_threshold (float): Allowed relative memory increase.
+        stage_thresholds (dict): Latency thresholds overriding the default per stage.
+
+    Returns:
+        list: Descriptions of the regressions; empty if there are none.
+    """
+    regressions = []
+    for stage, result in results.items():
+        reference = baseline['stages'].get(stage)
+        if reference is None:
+            continue
+        threshold = stage_thresholds.get(stage, latency_threshold)
+        limit = max(reference['median_ms'] * (1 + threshold),
+                    reference['median_ms'] + LATENCY_FLOOR_MS)
+        if result['median_ms'] > limit:
+            regressions.append(
+                f"{stage}: median {result['median_ms']:.2f} ms > {limit:.2f} ms "
+                f"(baseline {reference['median_ms']:.2f} ms + {threshold:.0%})")
+        for key in ('peak_rss_mb', 'peak_traced_mb'):
+            if result[key] is None or reference.get(key) is None:
+                continue
+            limit = max(reference[key] * (1 + memory_threshold), reference[key] + MEMORY_FLOOR_MB)
+            if result[key] > limit:
+                regressions.append(
+                    f"{stage}: {key} {result[key]:.1f} MB > {limit:.1f} MB "
+                    f"(baseline {reference[key]:.1f} MB + {memory_threshold:.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--frames', type=int, default=75)
+    parser.add_argument('--size', default='640x480', help='WIDTHxHEIGHT of the synthetic video')
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--stages', nargs='+', help='Only run these stages')
+    parser.add_argument('--save-baseline', help='Write the results to this JSON file')
+    parser.add_argument('--compare', help='Baseline JSON file to check the results against')
+    parser.add_argument('--latency-threshold', type=float, default=0.25)
+    parser.add_argument('--memory-threshold', type=float, default=0.25)
+    parser.add_argument('--threshold', action='append', default=[], metavar='STAGE=FRACTION',
+                        help='Latency threshold of one stage, e.g. extract_mouth_bbox=0.5')
+    args = parser.parse_args()
+
+    stage_thresholds = {}
+    for item in args.threshold:
+        stage, _, fraction = item.partition('=')
+        stage_thresholds[stage] = float(fraction)
+    width, height = (int(side) for side in args.size.lower().split('x'))
+
+    with tempfile.TemporaryDirectory() as workdir:
+        stages = build_stages(workdir, args.frames, width, height)
+        unknown = set(args.stages or ()) - set(stages)
+        if unknown:
+            parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+
+        results = {}
+        print(f"{'stage':<26} {'median ms':>10} {'min ms':>9} {'max ms':>9} "
+              f"{'rss MB':>8} {'traced MB':>10}")
+        for name, (fn, setup, number) in stages.items():
+            if args.stages and name not in args.stages:
+                continue
+            results[name] = result = measure(fn, setup, args.repeats, number=number)
+            rss = f"{result['peak_rss_mb']:.1f}" if result['peak_rss_mb'] is not None else '-'
+            print(f"{name:<26} {result['median_ms']:>10.3f} {result['min_ms']:>9.3f} "
+                  f"{result['max_ms']:>9.3f} {rss:>8} {result['peak_traced_mb']:>10.1f}")
+
+    run = {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'environment': environment(),
+        'settings': {'frames': args.frames, 'size': args.size, 'repeats': args.repeats},
+        'stages': results,
+    }
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(run, f, indent=2)
+        print(f"Baseline written to {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline['environment'] != run['environment']:
+            print("Warning: the baseline was recorded in a different environment:")
+            for key, value in baseline['environment'].items():
+                if run['environment'].get(key) != value:
+                    print(f"  {key}: {value} -> {run['environment'].get(key)}")
+        if baseline['settings'] != run['settings']:
+            print(f"Warning: baseline settings {baseline['settings']} differ from {run['settings']}")
+
+        regressions = compare(results, baseline, args.latency_threshold,
+                              args.memory_threshold, stage_thresholds)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.compare}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Compares the per-frame torchvision transform with batched preprocessing.
+
+Checks that `preprocess_frames` matches `LipReadingModel.transform()`
+numerically and reports the latency of both.
+
+Usage:
+    python -m benchmarks.preprocessing [--frames 29] [--size 64]
+"""
+import argparse
+
+import cv2
+import numpy as np
+import torch
+
+from backbone.model_loader import LipReadingModel
+from benchmarks.bench_utils import format_row, time_call
+from processing.frame_preprocessing import FramePreprocessor, preprocess_frames
+
+
+def reference_transform(frames):
+    """
+    Preprocesses frames one at a time with the torchvision/PIL pipeline.
+
+    Args:
+        frames (numpy.ndarray): uint8 array of shape (N, H, W).
+
+    Returns:
+        torch.Tensor: Tensor of shape (1, N, 1, 64, 64).
+    """
+    transform = LipReadingModel.transform()
+    return torch.stack([transform(cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR))
+                        for frame in frames]).unsqueeze(0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--frames', type=int, default=29)
+    parser.add_argument('--size', type=int, nargs='+', default=[64, 96],
+                        help='Input frame sizes to test.')
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--atol', type=float, default=0.05,
+                        help='Tolerance for inputs that need resizing.')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    preprocessor = FramePreprocessor()
+    for size in args.size:
+        frames = rng.integers(0, 256, (args.frames, size, size), dtype=np.uint8)
+        expected = reference_transform(frames)
+        actual = preprocess_frames(frames)
+        max_diff = float((expected - actual).abs().max())
+        atol = 1e-5 if size == 64 else args.atol
+        print(f"{size}x{size} input: max difference {max_diff:.2e} "
+              f"({'ok' if max_diff <= atol else 'MISMATCH'})")
+        print("  " + format_row('torchvision per-frame', time_call(
+            lambda: reference_transform(frames), args.repeats)))
+        print("  " + format_row('preprocess_frames', time_call(
+            lambda: preprocess_frames(frames), args.repeats)))
+        print("  " + format_row('FramePreprocessor (reused)', time_call(
+            lambda: preprocessor(frames), args.repeats)))
+
+
+if __name__ == '__main__':
+    main()
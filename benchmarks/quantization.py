@@ -0,0 +1,102 @@
+"""
+Reports agreement, latency and size of the quantized and bf16 model variants.
+
+Each variant is compared with the fp32 model on the evaluation clips:
+top-1 agreement is the fraction of clips with the same top prediction and
+top-5 agreement the mean overlap of the top-5 sets. Size is the serialized
+state dict. Without `--calibration-dir`, random clips are used for both
+calibration and evaluation, which only makes the latency and size numbers
+meaningful.
+
+Usage:
+    python -m benchmarks.quantization [--calibration-dir data/preprocessed]
+        [--eval-clips 100] [--batch-size 8] [--repeats 5]
+"""
+import argparse
+import io
+import itertools
+
+import torch
+
+from backbone.onnx_export import load_torch_model
+from backbone.quantization import (ReducedPrecisionModel, iter_calibration_clips,
+                                   quantize_dynamic, quantize_static)
+from benchmarks.bench_utils import time_call
+from config import project_config
+
+
+def state_dict_bytes(model):
+    """
+    Returns the serialized size of a model's state dict in bytes.
+    """
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell()
+
+
+def agreement(reference_logits, logits):
+    """
+    Computes top-1 and top-5 agreement of logits with the reference logits.
+
+    Returns:
+        float: Fraction of clips with the same top-1 class.
+        float: Mean fraction of shared classes in the top-5 sets.
+    """
+    top1 = (reference_logits.argmax(1) == logits.argmax(1)).float().mean().item()
+    reference_top5 = reference_logits.topk(5, dim=1).indices.tolist()
+    top5 = logits.topk(5, dim=1).indices.tolist()
+    overlap = [len(set(a) & set(b)) / 5 for a, b in zip(reference_top5, top5)]
+    return top1, sum(overlap) / len(overlap)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model', default=project_config.Config.MODEL_PATH)
+    parser.add_argument('--calibration-dir')
+    parser.add_argument('--calibration-clips', type=int, default=100)
+    parser.add_argument('--eval-clips', type=int, default=100)
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    model = load_torch_model(args.model)
+    if args.calibration_dir:
+        clips = list(iter_calibration_clips(
+            args.calibration_dir, args.calibration_clips + args.eval_clips))
+        calibration = clips[:args.calibration_clips]
+        evaluation = clips[args.calibration_clips:] or calibration
+    else:
+        print("No --calibration-dir given; using random clips, agreement is not meaningful.")
+        calibration = [torch.randn(1, 1, 29, 64, 64) for _ in range(args.calibration_clips)]
+        evaluation = [torch.randn(1, 1, 29, 64, 64) for _ in range(args.eval_clips)]
+
+    variants = {
+        'fp32': ReducedPrecisionModel(model),
+        'dynamic int8': ReducedPrecisionModel(quantize_dynamic(model), 'dynamic'),
+        'static int8': ReducedPrecisionModel(quantize_static(model, calibration), 'static'),
+        'bf16 autocast': ReducedPrecisionModel(model, precision='bf16'),
+    }
+
+    evaluation_batch = torch.cat(evaluation)
+    timing_batch = torch.cat(list(itertools.islice(
+        itertools.cycle(evaluation), args.batch_size)))
+    with torch.inference_mode():
+        reference = model(evaluation_batch)
+
+    baseline = {}
+    print(f"{'variant':<14} {'top-1':>6} {'top-5':>6} {'1 clip ms':>10} "
+          f"{f'{args.batch_size} clips ms':>12} {'speedup':>8} {'size MB':>8} {'saved':>6}")
+    for name, variant in variants.items():
+        with torch.inference_mode():
+            top1, top5 = agreement(reference, variant(evaluation_batch))
+            single = time_call(lambda: variant(evaluation[0]), args.repeats)['median_ms']
+            batched = time_call(lambda: variant(timing_batch), args.repeats)['median_ms']
+        size = state_dict_bytes(variant.model)
+        baseline = baseline or {'batched': batched, 'size': size}
+        print(f"{name:<14} {top1:>6.3f} {top5:>6.3f} {single:>10.2f} {batched:>12.2f} "
+              f"{baseline['batched'] / batched:>7.2f}x {size / 1e6:>8.2f} "
+              f"{1 - size / baseline['size']:>6.1%}")
+
+
+if __name__ == '__main__':
+    main()
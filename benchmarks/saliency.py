@@ -0,0 +1,112 @@
+"""
+Compares the latency and memory of the saliency methods.
+
+The methods measured are:
+    - backward: `backward()` on a model whose parameters require gradients,
+      as saliency was computed before; every parameter gradient is computed
+      and accumulated in `.grad`.
+    - input gradient: `torch.autograd.grad` for the input only.
+    - top-k shared / top-k loop: input gradients of the k best classes, with
+      one forward pass shared by their backward passes or with one forward
+      and backward pass per class.
+    - Grad-CAM on each of the given layers.
+
+Memory is the peak growth of the resident set during a call, so it includes
+the autograd graph and the gradients.
+
+Usage:
+    python -m benchmarks.saliency [--batch-size 1] [--top-k 3] [--repeats 5]
+        [--layers resnet.layer1 resnet.layer4 mpool3d]
+"""
+import argparse
+import copy
+import ctypes
+
+import torch
+
+from backbone.model_freezing import freeze_model
+from backbone.onnx_export import load_torch_model
+from backbone.saliency import grad_cam, input_gradients
+from benchmarks.bench_utils import time_call
+from benchmarks.pipeline_stages import PeakMemory
+from config import project_config
+
+
+def parameter_backward(model, inputs):
+    """
+    Computes input gradients with `backward()`, also filling every `.grad`.
+    """
+    inputs = inputs.detach().requires_grad_(True)
+    logits = model(inputs)
+    logits.gather(1, logits.argmax(dim=1, keepdim=True)).sum().backward()
+    gradients = inputs.grad
+    model.zero_grad(set_to_none=True)
+    return gradients
+
+
+def top_k_loop(model, inputs, top_k):
+    """
+    Computes input gradients of the `top_k` best classes one class at a time.
+    """
+    with torch.inference_mode():
+        targets = model(inputs).topk(top_k, dim=1).indices
+    return [input_gradients(model, inputs, targets[:, k])[2] for k in range(top_k)]
+
+
+def release_memory():
+    """
+    Returns freed heap memory to the system, so that the next call's peak
+    shows up in the resident set instead of reusing earlier allocations.
+    """
+    try:
+        ctypes.CDLL('libc.so.6').malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+def measure(fn, repeats):
+    """
+    Returns the timing of `fn` and the peak memory growth of one call.
+    """
+    stats = time_call(fn, repeats=repeats)
+    release_memory()
+    with PeakMemory() as memory:
+        fn()
+    stats['rss_mb'] = memory.rss_mb
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model', default=project_config.Config.MODEL_PATH)
+    parser.add_argument('--batch-size', type=int, default=1)
+    parser.add_argument('--top-k', type=int, default=3)
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--layers', nargs='+', default=['resnet.layer1', 'resnet.layer4', 'mpool3d'])
+    args = parser.parse_args()
+
+    model = freeze_model(load_torch_model(args.model)).requires_grad_(False)
+    trainable = copy.deepcopy(model).requires_grad_(True)
+    inputs = torch.randn(args.batch_size, 1, 29, 64, 64)
+
+    cases = [
+        ('backward', lambda: parameter_backward(trainable, inputs)),
+        ('input gradient', lambda: input_gradients(model, inputs)),
+        (f'top-{args.top_k} shared', lambda: input_gradients(model, inputs, top_k=args.top_k)),
+        (f'top-{args.top_k} loop', lambda: top_k_loop(model, inputs, args.top_k)),
+    ] + [(f'gradcam {layer}', lambda layer=layer: grad_cam(model, inputs, layer=layer))
+         for layer in args.layers]
+
+    reference = parameter_backward(trainable, inputs)
+    difference = (input_gradients(model, inputs)[2][:, 0] - reference).abs().max().item()
+    print(f"input gradient vs backward: max |diff| {difference:.2e}\n")
+
+    print(f"{'method':<26} {'mean ms':>9} {'median ms':>10} {'peak RSS MB':>12}")
+    for name, fn in cases:
+        stats = measure(fn, args.repeats)
+        print(f"{name:<26} {stats['mean_ms']:>9.1f} {stats['median_ms']:>10.1f} "
+              f"{stats['rss_mb']:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Compares the legacy matplotlib saliency rendering with the batched renderer.
+
+Checks that the batched overlays match the per-frame OpenCV processing and
+reports the latency of producing the GIF both ways.
+
+Usage:
+    python -m benchmarks.saliency_rendering [--repeats 3]
+"""
+import argparse
+import os
+import tempfile
+
+import cv2
+import imageio.v2 as imageio
+import numpy as np
+
+from benchmarks.bench_utils import format_row, time_call
+from processing.saliency_rendering import encode_gif, render_saliency_overlays
+
+
+def legacy_overlays(mouth_frames, saliency_maps):
+    """
+    Builds overlays one frame at a time as the original server code did.
+    """
+    overlays = []
+    for mouth_frame, saliency_map in zip(mouth_frames, saliency_maps):
+        thresh_value = np.percentile(saliency_map, 75)
+        _, saliency_map = cv2.threshold(
+            saliency_map, thresh_value, 255, cv2.THRESH_TOZERO)
+        saliency_map = cv2.normalize(
+            saliency_map, None, alpha=0, beta=255, norm_type=cv2.NORM_MINMAX, dtype=cv2.CV_8U)  # type: ignore
+        heatmap = cv2.applyColorMap(saliency_map, cv2.COLORMAP_HOT)
+        original_frame = cv2.cvtColor(mouth_frame, cv2.COLOR_GRAY2BGR)
+        overlays.append(cv2.addWeighted(original_frame, 0.8, heatmap, 0.3, 0))
+    return np.stack(overlays)
+
+
+def legacy_gif(mouth_frames, saliency_maps, output_folder):
+    """
+    Renders the GIF through matplotlib figures and temporary PNGs.
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    gif_images = []
+    for frame_index, overlay in enumerate(legacy_overlays(mouth_frames, saliency_maps)):
+        output_path = os.path.join(output_folder, f"saliency_map_{frame_index}.png")
+        plt.figure()
+        plt.imshow(cv2.cvtColor(overlay, cv2.COLOR_BGR2RGB))
+        plt.axis('off')
+        plt.savefig(output_path, bbox_inches='tight', pad_inches=0)
+        plt.close()
+        gif_images.append(imageio.imread(output_path))
+    imageio.mimsave(os.path.join(output_folder, "saliency_maps.gif"),
+                    gif_images, duration=100, loop=0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--frames', type=int, default=29)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    mouth_frames = list(rng.integers(0, 256, (args.frames, 64, 64), dtype=np.uint8))
+    saliency_maps = rng.normal(0, 1e-3, (args.frames, 64, 64)).astype(np.float32)
+
+    max_diff = np.abs(legacy_overlays(mouth_frames, saliency_maps).astype(int) -
+                      render_saliency_overlays(mouth_frames, saliency_maps).astype(int)).max()
+    print(f"max overlay difference: {max_diff} gray levels")
+
+    with tempfile.TemporaryDirectory() as output_folder:
+        print(format_row('matplotlib + PNG round-trip', time_call(
+            lambda: legacy_gif(mouth_frames, saliency_maps, output_folder), args.repeats)))
+    print(format_row('batched, in-memory GIF', time_call(
+        lambda: encode_gif(render_saliency_overlays(mouth_frames, saliency_maps), scale=4),
+        args.repeats)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Compares sliding-window recognition with shared frame embeddings against
+running the full model on every window.
+
+Usage:
+    python -m benchmarks.sliding_window [--frames 100 250] [--strides 1 5] [--repeats 3]
+"""
+import argparse
+
+import torch
+
+from backbone.model_freezing import freeze_model
+from backbone.onnx_export import load_torch_model
+from backbone.sliding_window import sliding_window_logits, window_starts
+from benchmarks.bench_utils import time_call
+from config import project_config
+
+
+def per_window_logits(model, frames, window, stride, batch_size):
+    """
+    Runs the whole model on every window separately, in batches of windows.
+    """
+    starts = window_starts(frames.size(2), window, stride)
+    logits = []
+    for batch_start in range(0, len(starts), batch_size):
+        windows = torch.cat([frames[:, :, start:start + window]
+                             for start in starts[batch_start:batch_start + batch_size]])
+        logits.append(model(windows))
+    return torch.cat(logits)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model', default=project_config.Config.MODEL_PATH)
+    parser.add_argument('--frames', type=int, nargs='+', default=[100, 250])
+    parser.add_argument('--strides', type=int, nargs='+', default=[1, 5])
+    parser.add_argument('--window', type=int, default=29)
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    model = freeze_model(load_torch_model(args.model))
+    print(f"{'frames':>6} {'stride':>6} {'windows':>7} {'per-window ms':>14} "
+          f"{'shared ms':>10} {'exact ms':>9} {'speedup':>8} {'max |diff|':>11}")
+    for num_frames in args.frames:
+        frames = torch.randn(1, 1, num_frames, 64, 64)
+        for stride in args.strides:
+            with torch.inference_mode():
+                baseline = time_call(lambda: per_window_logits(
+                    model, frames, args.window, stride, args.batch_size), args.repeats, 0)
+                shared = time_call(lambda: sliding_window_logits(
+                    model, frames, args.window, stride, args.batch_size,
+                    exact_boundaries=False), args.repeats, 0)
+                exact = time_call(lambda: sliding_window_logits(
+                    model, frames, args.window, stride, args.batch_size), args.repeats, 0)
+            difference = (exact['result'][1] - baseline['result']).abs().max().item()
+            print(f"{num_frames:>6} {stride:>6} {len(baseline['result']):>7} "
+                  f"{baseline['median_ms']:>14.1f} {shared['median_ms']:>10.1f} "
+                  f"{exact['median_ms']:>9.1f} "
+                  f"{baseline['median_ms'] / exact['median_ms']:>7.2f}x {difference:>11.2e}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Compares the throughput of sequential in-process prediction with the
+multi-process staged pipeline for several worker layouts.
+
+A layout is given as DECODE,DETECT,INFERENCE worker counts. Worker startup
+(interpreter, PyTorch and model loading) is reported separately and is not
+included in the throughput.
+
+Usage:
+    python -m benchmarks.staged_pipeline VIDEO [VIDEO ...] [--repeat 4]
+        [--layouts 1,1,1 2,1,1 4,2,1]
+"""
+import argparse
+import os
+import statistics
+import time
+
+from processing.staged_pipeline import StagedPipeline
+
+
+def sequential(video_paths):
+    """
+    Runs the single-process pipeline used by the API on every video.
+
+    Returns:
+        float: Seconds spent, excluding model loading.
+    """
+    from backbone.model_loader import LipReadingModel
+    from processing.mouth_frame_extractor import VideoProcessor
+
+    video_processor, lip_reading_model = VideoProcessor(), LipReadingModel()
+    start = time.perf_counter()
+    for video_path in video_paths:
+        frames_tensor, _ = video_processor.process_video_in_memory(video_path, save_artifacts=False)
+        if frames_tensor is not None:
+            lip_reading_model.predict(frames_tensor)
+    return time.perf_counter() - start
+
+
+def staged(video_paths, layout):
+    """
+    Runs the videos through a staged pipeline with the given worker counts.
+
+    Returns:
+        float: Seconds until every worker had loaded (the first result).
+        float: Seconds spent on the videos once the workers were ready.
+        list: The results.
+    """
+    decode, detect, inference = layout
+    start = time.perf_counter()
+    with StagedPipeline(decode, detect, inference) as pipeline:
+        pipeline.run(video_paths[:1])
+        ready = time.perf_counter()
+        results = pipeline.run(video_paths)
+        finished = time.perf_counter()
+    return ready - start, finished - ready, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('videos', nargs='+')
+    parser.add_argument('--repeat', type=int, default=4,
+                        help='Number of times the list of videos is processed')
+    parser.add_argument('--layouts', nargs='+', default=['1,1,1', '2,1,1'],
+                        help='DECODE,DETECT,INFERENCE worker counts')
+    args = parser.parse_args()
+
+    video_paths = args.videos * args.repeat
+    print(f"{len(video_paths)} videos, {os.cpu_count()} CPU cores")
+    baseline = sequential(video_paths)
+    print(f"{'layout':<10} {'startup s':>10} {'run s':>8} {'videos/s':>9} {'speedup':>8} "
+          f"{'decode ms':>10} {'detect ms':>10} {'infer ms':>9}")
+    print(f"{'sequential':<10} {'-':>10} {baseline:>8.2f} {len(video_paths) / baseline:>9.2f} "
+          f"{1:>7.2f}x")
+    for layout in args.layouts:
+        workers = tuple(int(count) for count in layout.split(','))
+        startup, elapsed, results = staged(video_paths, workers)
+        timings = [result['timings'] for result in results if result['error'] is None]
+        stage_ms = [statistics.median(t.get(stage, 0) for t in timings) if timings else 0
+                    for stage in ('decode_ms', 'detect_ms', 'inference_ms')]
+        print(f"{layout:<10} {startup:>10.2f} {elapsed:>8.2f} {len(video_paths) / elapsed:>9.2f} "
+              f"{baseline / elapsed:>7.2f}x {stage_ms[0]:>10.1f} {stage_ms[1]:>10.1f} "
+              f"{stage_ms[2]:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
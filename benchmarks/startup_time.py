@@ -0,0 +1,89 @@
+"""
+Measures the cold-start time of the API server in fresh processes.
+
+For each mode a new interpreter imports the server, waits until its models
+are ready and sends two predictions through the inference model:
+    lazy              models load on the first request, no warm-up
+    preload           models load in the background at import time
+    preload+warmup    background loading followed by a warm-up pass
+
+Usage:
+    python -m benchmarks.startup_time [--runs 3]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+MODES = {
+    'lazy': {'PRELOAD_MODELS': False, 'WARMUP_ON_LOAD': False},
+    'preload': {'PRELOAD_MODELS': True, 'WARMUP_ON_LOAD': False},
+    'preload+warmup': {'PRELOAD_MODELS': True, 'WARMUP_ON_LOAD': True},
+}
+
+CHILD_SCRIPT = '''
+import json, time
+start = time.perf_counter()
+from config.project_config import Config
+for name, value in json.loads({overrides!r}).items():
+    setattr(Config, name, value)
+from api import lipreading_api_server as server
+imported = time.perf_counter()
+if Config.PRELOAD_MODELS:
+    server.resources.wait_until_ready()
+ready = time.perf_counter()
+import torch
+latencies = []
+for _ in range(2):
+    request_start = time.perf_counter()
+    server.inference_model(server.model_registry.get()).predict(torch.randn(1, 29, 1, 64, 64))
+    latencies.append((time.perf_counter() - request_start) * 1000)
+print(json.dumps({{
+    'import_s': imported - start,
+    'ready_s': ready - start,
+    'first_request_ms': latencies[0],
+    'second_request_ms': latencies[1],
+}}))
+'''
+
+
+def measure(overrides):
+    """
+    Starts a fresh interpreter and measures its startup.
+
+    Args:
+        overrides (dict): `Config` attributes set before the server is imported.
+
+    Returns:
+        dict: Import and ready times in seconds from the first statement, first
+            and second request latencies in milliseconds, and the total process
+            time including interpreter startup.
+    """
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD_SCRIPT.format(overrides=json.dumps(overrides))],
+        check=True, capture_output=True, text=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result['process_s'] = time.perf_counter() - start
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'mode':<16} {'import s':>9} {'ready s':>8} {'1st req ms':>11} "
+          f"{'2nd req ms':>11} {'process s':>10}")
+    for mode, overrides in MODES.items():
+        runs = [measure(overrides) for _ in range(args.runs)]
+        median = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+        print(f"{mode:<16} {median['import_s']:>9.2f} {median['ready_s']:>8.2f} "
+              f"{median['first_request_ms']:>11.1f} {median['second_request_ms']:>11.1f} "
+              f"{median['process_s']:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
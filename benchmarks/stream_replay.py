@@ -0,0 +1,145 @@
+"""
+Replays a video file as a live webcam stream against the /stream WebSocket.
+
+Every frame is JPEG-encoded up front and sent as one binary message, paced at
+the video's frame rate (or as fast as possible with --no-realtime). The
+end-to-end latency of a prediction is the time from sending the frame that
+triggered it to receiving the message. Without --url the API server is
+started in this process on a free local port.
+
+Usage:
+    python -m benchmarks.stream_replay VIDEO [--url ws://localhost:5000/stream]
+        [--emit-every 5] [--max-frames 250] [--no-realtime]
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+
+import cv2
+
+
+def encode_video(video_path, max_frames, quality=80):
+    """
+    Decodes a video and JPEG-encodes its frames as a webcam client would.
+
+    Returns:
+        list: Encoded frames (bytes).
+        float: Frame rate of the video.
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise Exception(f"Error opening video file: {video_path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+    frames = []
+    while len(frames) < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes())
+    cap.release()
+    return frames, fps
+
+
+def start_local_server():
+    """
+    Serves the API app on a free local port in a daemon thread.
+
+    Returns:
+        str: URL of the /stream endpoint.
+    """
+    from werkzeug.serving import make_server
+
+    from api.lipreading_api_server import app, resources
+
+    resources.wait_until_ready()
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"ws://127.0.0.1:{server.server_port}/stream"
+
+
+def replay(url, frames, fps, realtime=True):
+    """
+    Streams the frames over one connection and collects the server messages.
+
+    Returns:
+        list: (receive time, message) pairs.
+        list: Send time of every frame.
+        float: Wall time of the replay in seconds.
+    """
+    import simple_websocket
+
+    ws = simple_websocket.Client.connect(url)
+    ready = json.loads(ws.receive(timeout=60))
+    if ready.get('type') != 'ready':
+        raise RuntimeError(f"Stream refused: {ready}")
+
+    sent_at, messages = [], []
+
+    def receive_messages():
+        try:
+            while True:
+                data = ws.receive()
+                messages.append((time.perf_counter(), json.loads(data)))
+        except simple_websocket.ConnectionClosed:
+            pass
+
+    receiver = threading.Thread(target=receive_messages, daemon=True)
+    receiver.start()
+    start = time.perf_counter()
+    for index, frame in enumerate(frames):
+        if realtime:
+            time.sleep(max(start + index / fps - time.perf_counter(), 0))
+        sent_at.append(time.perf_counter())
+        ws.send(frame)
+    ws.send(json.dumps({'type': 'end'}))
+    receiver.join(timeout=120)
+    elapsed = time.perf_counter() - start
+    if receiver.is_alive():
+        ws.close()
+    return messages, sent_at, elapsed
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(round(fraction * (len(values) - 1))), len(values) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('video')
+    parser.add_argument('--url', help='Stream endpoint; defaults to an in-process server')
+    parser.add_argument('--emit-every', type=int, default=5)
+    parser.add_argument('--max-frames', type=int, default=250)
+    parser.add_argument('--no-realtime', dest='realtime', action='store_false',
+                        help='Send frames as fast as possible instead of at the video frame rate')
+    args = parser.parse_args()
+
+    frames, fps = encode_video(args.video, args.max_frames)
+    url = args.url or start_local_server()
+    messages, sent_at, elapsed = replay(
+        f"{url}?emit_every={args.emit_every}", frames, fps, args.realtime)
+
+    predictions = [(received, message) for received, message in messages
+                   if message['type'] == 'prediction']
+    errors = [message for _, message in messages if message['type'] == 'error']
+    print(f"frames sent        {len(frames)} at {len(frames) / elapsed:.1f} fps "
+          f"(video {fps:.1f} fps, {'real time' if args.realtime else 'unpaced'})")
+    print(f"predictions        {len(predictions)}   errors {len(errors)}")
+    if not predictions:
+        return
+
+    end_to_end = [(received - sent_at[message['frame']]) * 1000
+                  for received, message in predictions]
+    print(f"end-to-end ms      median {statistics.median(end_to_end):8.1f}  "
+          f"p95 {percentile(end_to_end, 0.95):8.1f}  max {max(end_to_end):8.1f}")
+    for stage in predictions[0][1]['latency_ms']:
+        stage_ms = [message['latency_ms'][stage] for _, message in predictions]
+        print(f"  {stage:<16} median {statistics.median(stage_ms):8.1f}  "
+              f"p95 {percentile(stage_ms, 0.95):8.1f}")
+    print(f"last prediction    {predictions[-1][1]['predictions'][0]}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+"""
+Measures how much memory pre-forked API workers share with each other.
+
+The server is started under gunicorn with api/gunicorn_config.py. Once every
+worker is ready, prediction requests are sent to warm the workers up, and
+the memory of the master and each worker is read from /proc/<pid>/smaps_rollup:
+    RSS      resident memory, counting shared pages in full
+    PSS      resident memory with each shared page divided among its sharers
+    shared   pages also mapped by another process (e.g. the forked weights)
+    private  pages only this process maps
+
+With copy-on-write sharing, the PSS of a worker is well below its RSS and the
+total PSS grows by much less than one model per worker. --compare also runs
+the server without `preload_app`, where every worker loads its own models.
+
+Usage:
+    python -m benchmarks.worker_memory [--workers 4] [--requests 8] [--video VIDEO]
+        [--compare] [--port 5055]
+"""
+import argparse
+import concurrent.futures
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+from benchmarks.synthetic_video import generate_video
+
+CONFIG_TEMPLATE = '''
+from api.gunicorn_config import *
+
+workers = {workers}
+bind = '127.0.0.1:{port}'
+preload_app = {preload}
+'''
+
+FIELDS = ('Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty')
+
+
+def memory_usage(pid):
+    """
+    Reads the memory totals of a process from /proc/<pid>/smaps_rollup.
+
+    Returns:
+        dict: 'rss', 'pss', 'shared' and 'private' in megabytes.
+    """
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            name, _, rest = line.partition(':')
+            if name in FIELDS:
+                values[name] = int(rest.split()[0]) / 1024
+    return {
+        'rss': values['Rss'],
+        'pss': values['Pss'],
+        'shared': values['Shared_Clean'] + values['Shared_Dirty'],
+        'private': values['Private_Clean'] + values['Private_Dirty'],
+    }
+
+
+def child_pids(pid):
+    """
+    Returns the pids of the direct children of a process.
+    """
+    children = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # The command name may contain spaces; the parent pid follows it.
+                fields = f.read().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == pid:
+            children.append(int(entry))
+    return sorted(children)
+
+
+def get_json(url, timeout=10):
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            return json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return json.loads(e.read())
+
+
+def post_video(url, video_path):
+    """
+    Uploads a video as multipart form data and returns the decoded response.
+    """
+    boundary = uuid.uuid4().hex
+    with open(video_path, 'rb') as f:
+        video = f.read()
+    body = (f'--{boundary}\r\nContent-Disposition: form-data; name="file"; '
+            f'filename="{os.path.basename(video_path)}"\r\n'
+            'Content-Type: video/mp4\r\n\r\n').encode() + video + f'\r\n--{boundary}--\r\n'.encode()
+    request = urllib.request.Request(
+        url, body, {'Content-Type': f'multipart/form-data; boundary={boundary}'})
+    with urllib.request.urlopen(request, timeout=300) as response:
+        return json.loads(response.read())
+
+
+def wait_for_workers(master, base_url, workers, timeout):
+    """
+    Polls /ready until every worker of the master has answered that it is ready.
+
+    Returns:
+        list: The worker pids.
+    """
+    deadline = time.monotonic() + timeout
+    ready = set()
+    while time.monotonic() < deadline:
+        if master.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with status {master.returncode}")
+        pids = child_pids(master.pid)
+        if len(pids) == workers and ready >= set(pids):
+            return pids
+        try:
+            status = get_json(f'{base_url}/ready')
+            if status.get('ready'):
+                ready.add(status['pid'])
+        except (OSError, ValueError):
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"Workers not ready after {timeout} s")
+
+
+def measure(workers, preload, port, video_path, num_requests, timeout):
+    """
+    Starts the server, sends the prediction requests and reads the memory of its processes.
+
+    Returns:
+        list: (role, pid, memory usage) of the master and each worker.
+    """
+    base_url = f'http://127.0.0.1:{port}'
+    with tempfile.TemporaryDirectory() as workdir:
+        config_path = os.path.join(workdir, 'gunicorn_config.py')
+        with open(config_path, 'w') as f:
+            f.write(CONFIG_TEMPLATE.format(workers=workers, port=port, preload=preload))
+        master = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-c', config_path, 'api.lipreading_api_server:app'],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            pids = wait_for_workers(master, base_url, workers, timeout)
+            with concurrent.futures.ThreadPoolExecutor(workers) as pool:
+                list(pool.map(lambda _: post_video(f'{base_url}/predict', video_path),
+                              range(num_requests)))
+            return [('master', master.pid, memory_usage(master.pid))] + \
+                [('worker', pid, memory_usage(pid)) for pid in pids]
+        finally:
+            master.send_signal(signal.SIGTERM)
+            master.wait(60)
+
+
+def report(name, processes):
+    print(f"\n{name}")
+    print(f"{'process':<8} {'pid':>8} {'RSS MB':>9} {'PSS MB':>9} {'shared MB':>10} {'private MB':>11}")
+    for role, pid, usage in processes:
+        print(f"{role:<8} {pid:>8} {usage['rss']:>9.1f} {usage['pss']:>9.1f} "
+              f"{usage['shared']:>10.1f} {usage['private']:>11.1f}")
+    workers = [usage for role, _, usage in processes if role == 'worker']
+    total_rss = sum(usage['rss'] for _, _, usage in processes)
+    total_pss = sum(usage['pss'] for _, _, usage in processes)
+    print(f"total    {'':>8} {total_rss:>9.1f} {total_pss:>9.1f}   "
+          f"mean worker PSS {sum(w['pss'] for w in workers) / len(workers):.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=8,
+                        help='Prediction requests sent before measuring')
+    parser.add_argument('--video', help='Clip sent with each request; a synthetic one by default')
+    parser.add_argument('--compare', action='store_true',
+                        help='Also measure workers that load their own models')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--timeout', type=float, default=300,
+                        help='Seconds to wait for the workers to become ready')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        video_path = args.video
+        if video_path is None:
+            video_path = os.path.join(workdir, 'synthetic.mp4')
+            generate_video(video_path)
+
+        modes = [('preload (copy-on-write)', True)]
+        if args.compare:
+            modes.append(('no preload (models loaded per worker)', False))
+        for name, preload in modes:
+            report(name, measure(args.workers, preload, args.port, video_path,
+                                 args.requests, args.timeout))
+
+
+if __name__ == '__main__':
+    main()
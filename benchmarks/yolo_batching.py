@@ -0,0 +1,104 @@
+"""
+Compares per-frame and batched YOLO mouth detection.
+
+Checks that the batched path produces the same keypoints and bounding boxes
+as calling `VideoProcessor.extract_mouth_bbox` on every frame, and reports
+the latency of both paths.
+
+Usage:
+    python -m benchmarks.yolo_batching path/to/video.mp4 [more videos...]
+"""
+import argparse
+
+import numpy as np
+
+from benchmarks.bench_utils import format_row, load_selected_frames, time_call
+from config import project_config
+from processing.bbox_calculations import stack_keypoints
+from processing.mouth_frame_extractor import VideoProcessor
+
+
+def per_frame_keypoints(video_processor, frames):
+    """
+    Runs the detector on one frame at a time at the configured inference size.
+
+    Args:
+        video_processor (VideoProcessor): Processor holding the YOLO model.
+        frames (list): Video frames.
+
+    Returns:
+        numpy.ndarray: Keypoints of shape (N, K, 2).
+        numpy.ndarray: Confidences of shape (N, K).
+    """
+    keypoints_per_frame, confidences_per_frame = [], []
+    for frame in frames:
+        inputs, scales = video_processor._prepare_detection_batch([frame])
+        result = video_processor.model(
+            inputs[0], imgsz=project_config.Config.YOLO_INFERENCE_SIZE, verbose=False)[0]
+        keypoints, confidences = video_processor._result_keypoints(result)
+        keypoints_per_frame.append(keypoints * scales[0])
+        confidences_per_frame.append(confidences)
+    return stack_keypoints(keypoints_per_frame, confidences_per_frame)
+
+
+def batched_keypoints(video_processor, frames):
+    """
+    Runs the detector on the frames in configured batches.
+
+    Args:
+        video_processor (VideoProcessor): Processor holding the YOLO model.
+        frames (list): Video frames.
+
+    Returns:
+        numpy.ndarray: Keypoints of shape (N, K, 2).
+        numpy.ndarray: Confidences of shape (N, K).
+    """
+    batch_size = project_config.Config.YOLO_BATCH_SIZE
+    keypoints_per_frame, confidences_per_frame = [], []
+    for start in range(0, len(frames), batch_size):
+        inputs, scales = video_processor._prepare_detection_batch(
+            frames[start:start + batch_size])
+        results = video_processor.model(
+            inputs, imgsz=project_config.Config.YOLO_INFERENCE_SIZE, verbose=False)
+        for result, scale in zip(results, scales):
+            keypoints, confidences = video_processor._result_keypoints(result)
+            keypoints_per_frame.append(keypoints * scale)
+            confidences_per_frame.append(confidences)
+    return stack_keypoints(keypoints_per_frame, confidences_per_frame)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('videos', nargs='+', help='Videos to run the comparison on.')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--atol', type=float, default=1.0,
+                        help='Allowed keypoint difference in pixels.')
+    args = parser.parse_args()
+
+    video_processor = VideoProcessor()
+    for video_path in args.videos:
+        frames = load_selected_frames(video_path)
+        print(f"{video_path}: {len(frames)} selected frames")
+
+        reference = per_frame_keypoints(video_processor, frames)
+        batched = batched_keypoints(video_processor, frames)
+        if reference[0].shape != batched[0].shape:
+            print(f"  detection count mismatch: {reference[0].shape} vs {batched[0].shape}")
+        else:
+            max_diff = float(np.abs(reference[0] - batched[0]).max(initial=0.0))
+            print(f"  max keypoint difference: {max_diff:.3f} px "
+                  f"({'ok' if max_diff <= args.atol else 'MISMATCH'})")
+
+        legacy_boxes = [video_processor.extract_mouth_bbox(frame) for frame in frames]
+        batched_boxes = video_processor.extract_mouth_bboxes(frames)
+        matching = sum(a == b for a, b in zip(legacy_boxes, batched_boxes))
+        print(f"  boxes equal to full-resolution per-frame path: {matching}/{len(frames)}")
+
+        print("  " + format_row('per-frame extract_mouth_bbox', time_call(
+            lambda: [video_processor.extract_mouth_bbox(f) for f in frames], args.repeats)))
+        print("  " + format_row('batched extract_mouth_bboxes', time_call(
+            lambda: video_processor.extract_mouth_bboxes(frames), args.repeats)))
+
+
+if __name__ == '__main__':
+    main()
@@ -11,6 +11,73 @@ class Config:
         YOLO_MODEL_PATH (str): Path to the YOLO model for mouth detection.
         MOTION_THRESHOLD (int): Threshold for detecting motion in video frames.
         FULL_FRAMES_FOLDER (str): Directory for storing full processed frames.
+        YOLO_BATCH_SIZE (int): Number of frames sent to the YOLO model per batch.
+        YOLO_INFERENCE_SIZE (int): Longest image side used for YOLO inference.
+        MOTION_STREAMING (bool): Whether to select frames with the bounded-memory streaming analysis.
+        MOTION_ENGINE (str): Name of the motion-scoring engine used to rank frames.
+        MOTION_ENGINE_OPTIONS (dict): Options overriding the defaults of the selected motion engine.
+        INFERENCE_BATCHING (bool): Whether concurrent prediction requests are batched together.
+        INFERENCE_MAX_BATCH_SIZE (int): Maximum number of samples per batched forward pass.
+        INFERENCE_BATCH_WINDOW_MS (float): How long to wait for more requests before running a batch.
+        REQUEST_STORE_SIZE (int): Number of prediction requests whose inputs are kept for on-demand saliency.
+        REQUEST_STORE_TTL (int): Seconds a cached request input remains available for saliency.
+        REQUEST_STATE_FOLDER (str): Directory through which pre-fork workers share cached request inputs.
+        SALIENCY_GIF_SCALE (int): Upscaling factor applied to saliency overlays in the GIF.
+        JOB_WORKERS (int): Number of worker threads processing queued video jobs.
+        JOB_QUEUE_SIZE (int): Maximum number of jobs waiting for a worker.
+        JOB_RESULT_TTL (int): Seconds the result of a finished job remains retrievable.
+        JOB_STATE_FOLDER (str): Directory through which pre-fork workers share the state of jobs.
+        RESULT_CACHE_ENABLED (bool): Whether results are cached by upload content and model version.
+        RESULT_CACHE_FOLDER (str): Directory where cached results are persisted.
+        RESULT_CACHE_MEMORY_BYTES (int): Memory budget of the in-memory result cache.
+        RESULT_CACHE_DISK_BYTES (int): Disk budget of the persisted result cache.
+        ARTIFACT_POLICY (dict): Whether each debug artifact category is written 'off', 'sampled' or 'always'.
+        ARTIFACT_SAMPLE_RATE (float): Fraction of requests whose artifacts are written in 'sampled' mode.
+        RETENTION_POLICY (dict): Age and total-size limits enforced on each data directory.
+        RETENTION_INTERVAL (int): Seconds between retention sweeps.
+        INFERENCE_BACKEND (str): Backend running predictions without gradients, 'torch' or 'onnxruntime'.
+        ONNX_MODEL_PATH (str): Path to the exported ONNX graph of the LipReading model.
+        ONNX_INTRA_OP_THREADS (int): Threads ONNX Runtime uses within an operator.
+        FREEZE_MODEL (bool): Whether the PyTorch model is frozen for inference after loading.
+        LABELS_ROOT (str): Directory listed for class names when the model artifact has no label map.
+        PRELOAD_MODELS (bool): Whether the server loads its models in a background thread at startup.
+        WARMUP_ON_LOAD (bool): Whether a blank clip is run through the models after loading.
+        TIMELINE_WINDOW (int): Number of frames per window in long-video mode.
+        TIMELINE_STRIDE (int): Number of frames between consecutive windows in long-video mode.
+        TIMELINE_BATCH_SIZE (int): Number of windows classified per forward pass of the temporal head.
+        TIMELINE_EXACT_BOUNDARIES (bool): Whether window boundary frames are recomputed to match per-window inference.
+        TIMELINE_MAX_FRAMES (int): Maximum number of frames read from a video in long-video mode.
+        STREAM_WINDOW (int): Number of buffered frames classified per prediction on the WebSocket stream.
+        STREAM_EMIT_EVERY (int): Default number of frames between predictions on the stream.
+        STREAM_MAX_SESSIONS (int): Maximum number of concurrent streams.
+        STREAM_MAX_FRAME_BYTES (int): Maximum size of one encoded frame on the stream.
+        STREAM_IDLE_TIMEOUT (int): Seconds without a message after which a stream is closed.
+        STAGED_DECODE_WORKERS (int): Decode and frame-selection processes of the staged pipeline.
+        STAGED_DETECT_WORKERS (int): Mouth detection processes of the staged pipeline.
+        STAGED_INFERENCE_WORKERS (int): Lip-reading model processes of the staged pipeline.
+        STAGED_QUEUE_SIZE (int): Capacity of the queues between pipeline stages.
+        STAGED_FRAME_SLOTS (int): Shared-memory slots for selected frames.
+        STAGED_FRAME_SLOT_BYTES (int): Capacity of one frame slot.
+        STAGED_CROP_SLOTS (int): Shared-memory slots for mouth crops.
+        STAGED_INFERENCE_BATCH_SIZE (int): Maximum clips the inference stage classifies per forward pass.
+        STAGED_WORKER_THREADS (int): Intra-op threads per worker process, 0 to split the cores evenly.
+        LOG_SAMPLE_INTERVAL (float): Minimum seconds between two log lines of a frequent event, such as a batched inference.
+        MOUTH_DETECTION_MODE (str): 'per_frame' to run the detector on every frame, or 'tracking' to detect keyframes and track the mouth in between.
+        MOUTH_TRACKING_INTERVAL (int): Frames between two scheduled detector calls in tracking mode.
+        MOUTH_TRACKING_MIN_POINTS (int): Minimum number of reliably tracked points before the detector is run again.
+        MOUTH_TRACKING_SMOOTHING (float): Weight of the new box in the moving average of mouth boxes in tracking mode.
+        MODELS (dict): Lip-reading models the server can serve, by name, each with a 'path' and optionally a 'backend', 'onnx_path' and 'labels_root'.
+        DEFAULT_MODEL (str): Name of the model in MODELS used when a request names none.
+        MODEL_MEMORY_BUDGET (int): Bytes of model weights kept loaded before the least recently used models are unloaded; 0 for no limit.
+        MODEL_ADMIN_TOKEN (str): Bearer token required by the model reload and unload endpoints; None disables them.
+        SALIENCY_METHOD (str): Saliency maps served by the API, 'gradient' (input gradients) or 'gradcam'.
+        SALIENCY_GRADCAM_LAYER (str): Layer whose activations Grad-CAM explains.
+        SERVER_BIND (str): Address the pre-fork server (api/gunicorn_config.py) listens on.
+        SERVER_WORKERS (int): Worker processes forked by the pre-fork server, 0 for one per core.
+        SERVER_THREADS (int): Request-handling threads per pre-fork worker.
+        SERVER_INTRA_OP_THREADS (int): PyTorch and OpenCV threads per pre-fork worker, 0 to split the cores evenly.
+        SERVER_TIMEOUT (int): Seconds a pre-fork worker may stop responding to the master before it is restarted.
+        SERVER_GRACEFUL_TIMEOUT (int): Seconds workers get to finish their requests on a reload or shutdown.
     """
 
     UPLOAD_FOLDER = 'data/uploaded_videos'
@@ -28,8 +95,7 @@ class Config:
     MODEL_PATH = 'trained_models/lipreading_model_v1.pt'
     """Path to the primary trained LipReading model (version 1)."""
 
-    # Alternative model version
-    # MODEL_PATH = 'models/lipreading_model_v2.pt'
+    # Further model versions are listed in MODELS.
 
     YOLO_MODEL_PATH = 'trained_models/mouth_detection_yolo_v1.pt'
     """Path to the YOLO model for mouth detection."""
@@ -39,3 +105,217 @@ class Config:
 
     FULL_FRAMES_FOLDER = 'data/full_frames'
     """Directory where full frames are saved after processing."""
+
+    YOLO_BATCH_SIZE = 16
+    """Number of frames passed to the YOLO model in a single batched call."""
+
+    YOLO_INFERENCE_SIZE = 640
+    """Longest side (in pixels) frames are downscaled to before YOLO inference."""
+
+    MOTION_STREAMING = True
+    """Score frames while decoding and keep only the top candidates in memory."""
+
+    MOTION_ENGINE = 'farneback'
+    """Motion-scoring engine: 'farneback', 'farneback_lowres', 'farneback_roi', 'dis' or 'frame_diff'."""
+
+    MOTION_ENGINE_OPTIONS = {}
+    """Overrides for the selected engine's defaults, e.g. {'scale': 0.5}."""
+
+    INFERENCE_BATCHING = True
+    """Collect concurrent prediction requests into shared forward passes."""
+
+    INFERENCE_MAX_BATCH_SIZE = 8
+    """Maximum number of samples in one batched forward pass."""
+
+    INFERENCE_BATCH_WINDOW_MS = 10
+    """Time (in milliseconds) to wait for more requests after the first one arrives."""
+
+    REQUEST_STORE_SIZE = 64
+    """Maximum number of cached request inputs available to the saliency endpoint."""
+
+    REQUEST_STORE_TTL = 600
+    """Time (in seconds) after which a cached request input expires."""
+
+    REQUEST_STATE_FOLDER = 'data/request_state'
+    """Cached request inputs written by pre-fork workers, so any worker can serve /saliency."""
+
+    SALIENCY_GIF_SCALE = 4
+    """Integer factor the 64x64 saliency overlays are enlarged by in the GIF."""
+
+    JOB_WORKERS = 2
+    """Size of the worker pool that processes asynchronous video jobs."""
+
+    JOB_QUEUE_SIZE = 64
+    """Maximum number of queued jobs before new submissions are rejected."""
+
+    JOB_RESULT_TTL = 900
+    """Time (in seconds) finished jobs and their results are kept."""
+
+    JOB_STATE_FOLDER = 'data/job_state'
+    """JSON snapshots of jobs written by pre-fork workers, so any worker can report on a job."""
+
+    RESULT_CACHE_ENABLED = True
+    """Reuse predictions, tensors and saliency outputs for repeated uploads."""
+
+    RESULT_CACHE_FOLDER = 'data/result_cache'
+    """Directory where cached results are stored on disk."""
+
+    RESULT_CACHE_MEMORY_BYTES = 256 * 1024 * 1024
+    """Maximum size of the in-memory result cache in bytes (256 MB)."""
+
+    RESULT_CACHE_DISK_BYTES = 2 * 1024 * 1024 * 1024
+    """Maximum size of the on-disk result cache in bytes (2 GB)."""
+
+    ARTIFACT_POLICY = {
+        'full_frames': 'off',
+        'mouth_frames': 'off',
+        'saliency_frames': 'off',
+    }
+    """Annotated full frames, mouth crops and per-frame saliency PNGs; the saliency GIF is always written."""
+
+    ARTIFACT_SAMPLE_RATE = 0.05
+    """Probability that a request writes the artifacts of a 'sampled' category."""
+
+    RETENTION_POLICY = {
+        UPLOAD_FOLDER: {'max_age': 24 * 3600, 'max_bytes': 2 * 1024 * 1024 * 1024},
+        MOUTH_FRAMES_FOLDER: {'max_age': 24 * 3600, 'max_bytes': 512 * 1024 * 1024},
+        FULL_FRAMES_FOLDER: {'max_age': 24 * 3600, 'max_bytes': 1024 * 1024 * 1024},
+        REQUEST_STATE_FOLDER: {'max_age': REQUEST_STORE_TTL, 'max_bytes': 256 * 1024 * 1024},
+        JOB_STATE_FOLDER: {'max_age': JOB_RESULT_TTL},
+    }
+    """Per folder, the maximum age (in seconds) and total size (in bytes) of its entries."""
+
+    RETENTION_INTERVAL = 300
+    """Time (in seconds) between background sweeps of the data directories."""
+
+    INFERENCE_BACKEND = 'torch'
+    """Use 'onnxruntime' to serve the graph exported by backbone.onnx_export on the CPU."""
+
+    ONNX_MODEL_PATH = 'trained_models/lipreading_model_v1.onnx'
+    """Path to the ONNX export of MODEL_PATH."""
+
+    ONNX_INTRA_OP_THREADS = 0
+    """Number of intra-op threads for ONNX Runtime; 0 uses its default."""
+
+    FREEZE_MODEL = True
+    """Fold BatchNorm, precompute lateral inhibition and use channels-last layouts (see backbone.model_freezing)."""
+
+    LABELS_ROOT = 'data/dataset/val_20'
+    """Class folders used as the label map for plain state-dict checkpoints."""
+
+    PRELOAD_MODELS = True
+    """Load models in the background at startup instead of on the first request."""
+
+    WARMUP_ON_LOAD = True
+    """Run a warm-up pass after loading so the first request is not slower."""
+
+    TIMELINE_WINDOW = 29
+    """Window length of the sliding-window recognition, matching the training clips."""
+
+    TIMELINE_STRIDE = 5
+    """Distance in frames between the starts of consecutive windows."""
+
+    TIMELINE_BATCH_SIZE = 16
+    """Windows passed through the MS-TCN and temporal head together."""
+
+    TIMELINE_EXACT_BOUNDARIES = True
+    """Recompute each window's edge frames with zero padding; slightly slower but exact."""
+
+    TIMELINE_MAX_FRAMES = 3000
+    """Upper bound on the frames processed per long video (about 2 minutes at 25 fps)."""
+
+    STREAM_WINDOW = 29
+    """Ring buffer length of a live stream, matching the training clips."""
+
+    STREAM_EMIT_EVERY = 5
+    """Frames between predictions; clients may override it with ?emit_every=N."""
+
+    STREAM_MAX_SESSIONS = 4
+    """Concurrent WebSocket streams; further connections are refused until one ends."""
+
+    STREAM_MAX_FRAME_BYTES = 1024 * 1024
+    """Largest accepted WebSocket message (one encoded frame)."""
+
+    STREAM_IDLE_TIMEOUT = 30
+    """Close streams whose client stopped sending frames."""
+
+    STAGED_DECODE_WORKERS = 2
+    """Processes decoding videos and selecting frames by motion."""
+
+    STAGED_DETECT_WORKERS = 1
+    """Processes running the YOLO detector; each loads its own copy."""
+
+    STAGED_INFERENCE_WORKERS = 1
+    """Processes running the lip-reading model; each loads its own copy."""
+
+    STAGED_QUEUE_SIZE = 8
+    """Jobs waiting between two stages before the earlier stage blocks."""
+
+    STAGED_FRAME_SLOTS = 4
+    """Videos whose selected frames can be in flight between decode and detection."""
+
+    STAGED_FRAME_SLOT_BYTES = 29 * 720 * 1280 * 3
+    """29 BGR frames at 720p; larger frames are downscaled to fit."""
+
+    STAGED_CROP_SLOTS = 16
+    """Clips of 29 64x64 crops that can wait for the inference stage."""
+
+    STAGED_INFERENCE_BATCH_SIZE = 8
+    """Waiting clips are batched together, up to this many."""
+
+    STAGED_WORKER_THREADS = 0
+    """Threads per worker; 0 divides the CPU cores among all worker processes."""
+
+    LOG_SAMPLE_INTERVAL = 10.0
+    """Minimum seconds between two log lines of a frequent event; the lines in between are counted."""
+
+    MOUTH_DETECTION_MODE = 'per_frame'
+    """'per_frame' runs YOLO on every frame; 'tracking' runs it on keyframes and tracks the mouth box in between."""
+
+    MOUTH_TRACKING_INTERVAL = 5
+    """Frames between two scheduled detector calls in tracking mode."""
+
+    MOUTH_TRACKING_MIN_POINTS = 8
+    """Minimum number of reliably tracked points; below it the detector runs on the frame."""
+
+    MOUTH_TRACKING_SMOOTHING = 0.6
+    """Weight of the new box in the moving average of mouth boxes; 1 disables smoothing."""
+
+    MODELS = {
+        'v1': {'path': MODEL_PATH, 'onnx_path': ONNX_MODEL_PATH},
+        'v2': {'path': 'trained_models/lipreading_model_v2_128.pt'},
+    }
+    """Models are loaded on first use; requests choose one with the 'model' form or query value."""
+
+    DEFAULT_MODEL = 'v1'
+    """Name of the model in MODELS used when a request names none."""
+
+    MODEL_MEMORY_BUDGET = 512 * 1024 * 1024
+    """Bytes of model weights kept loaded (512 MB); least recently used models are unloaded beyond it."""
+
+    MODEL_ADMIN_TOKEN = None
+    """Sent as 'Authorization: Bearer <token>'; reloads only accept checkpoints in trained_models or MODELS."""
+
+    SALIENCY_METHOD = 'gradient'
+    """'gradient' for input-gradient saliency or 'gradcam' for the cheaper, coarser Grad-CAM maps."""
+
+    SALIENCY_GRADCAM_LAYER = 'resnet.layer1'
+    """Layer explained by Grad-CAM; resnet.layer1 is 4x4 for 64x64 frames (layer4 is 1x1)."""
+
+    SERVER_BIND = '0.0.0.0:5000'
+    """Host and port of the gunicorn server."""
+
+    SERVER_WORKERS = 0
+    """Worker processes of the gunicorn server; 0 forks one per CPU core."""
+
+    SERVER_THREADS = 4
+    """Threads per worker; streams and server-sent events hold one each while open."""
+
+    SERVER_INTRA_OP_THREADS = 0
+    """Intra-op threads per worker; 0 gives each worker an equal share of the cores."""
+
+    SERVER_TIMEOUT = 120
+    """Time (in seconds) after which a silent worker is killed and replaced."""
+
+    SERVER_GRACEFUL_TIMEOUT = 60
+    """Time (in seconds) old workers may keep serving after a reload or shutdown signal."""
@@ -0,0 +1,38 @@
+import random
+
+from config import project_config
+
+ARTIFACT_MODES = ('off', 'sampled', 'always')
+"""Supported artifact policy modes."""
+
+ARTIFACT_CATEGORIES = ('full_frames', 'mouth_frames', 'saliency_frames')
+"""Debug artifacts whose writing is controlled by `Config.ARTIFACT_POLICY`."""
+
+
+def should_save_artifact(category, policy=None, sample_rate=None):
+    """
+    Decides whether the artifacts of one category are written for the current request.
+
+    Args:
+        category (str): One of `ARTIFACT_CATEGORIES`.
+        policy (dict): Mapping of category to mode; defaults to `Config.ARTIFACT_POLICY`.
+        sample_rate (float): Fraction of requests written in 'sampled' mode;
+            defaults to `Config.ARTIFACT_SAMPLE_RATE`.
+
+    Returns:
+        bool: True if the artifacts should be written.
+    """
+    if category not in ARTIFACT_CATEGORIES:
+        raise ValueError(f"Unknown artifact category '{category}'")
+    if policy is None:
+        policy = project_config.Config.ARTIFACT_POLICY
+    if sample_rate is None:
+        sample_rate = project_config.Config.ARTIFACT_SAMPLE_RATE
+
+    mode = policy.get(category, 'off')
+    if mode not in ARTIFACT_MODES:
+        raise ValueError(
+            f"Invalid artifact mode '{mode}' for '{category}'; expected one of {ARTIFACT_MODES}")
+    if mode == 'sampled':
+        return random.random() < sample_rate
+    return mode == 'always'
@@ -0,0 +1,279 @@
+"""
+Runs the lip-reading model over a directory of videos and evaluates it.
+
+Videos are decoded, cropped and classified by the multi-process
+`StagedPipeline`, and each result is appended to the output as soon as it
+arrives. Rerunning the same command skips the videos already in the output,
+so an interrupted run resumes where it stopped. With a dataset laid out as
+`<root>/<word>/<clip>.mp4` the directory name is the label, and the run
+ends with the accuracy, the most frequent confusions and a confusion matrix
+written next to the output.
+
+Usage:
+    python -m processing.batch_predict data/dataset/val_20 --output results.csv
+        [--format csv|parquet] [--decode-workers 4] [--detect-workers 2]
+        [--inference-workers 1] [--no-labels] [--retry-errors] [--limit N]
+"""
+import argparse
+import collections
+import csv
+import glob
+import json
+import logging
+import os
+import statistics
+import time
+
+from config import project_config
+from processing.logging_config import configure_logging
+from processing.staged_pipeline import StagedPipeline
+
+COLUMNS = ('video', 'label', 'prediction', 'confidence', 'correct', 'top5', 'error',
+           'decode_ms', 'detect_ms', 'inference_ms')
+"""Columns of the output, one row per video."""
+
+STAGES = ('decode', 'detect', 'inference')
+"""Pipeline stages reported in the throughput summary."""
+
+
+def find_videos(root, labeled=True):
+    """
+    Lists the videos under a directory.
+
+    Args:
+        root (str): Directory to search recursively.
+        labeled (bool): Whether the first directory below `root` is the label.
+
+    Returns:
+        list: Sorted (relative path, label) pairs; the label is None when unlabeled.
+    """
+    videos = []
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.rsplit('.', 1)[-1].lower() not in project_config.Config.ALLOWED_EXTENSIONS:
+                continue
+            relative_path = os.path.relpath(os.path.join(directory, filename), root)
+            parts = relative_path.split(os.sep)
+            label = parts[0] if labeled and len(parts) > 1 else None
+            videos.append((relative_path, label))
+    return sorted(videos)
+
+
+class CsvResultWriter:
+    """
+    Appends result rows to a CSV file, flushing every row.
+    """
+
+    def __init__(self, path):
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, 'a', newline='')
+        self._writer = csv.DictWriter(self._file, COLUMNS)
+        if new_file:
+            self._writer.writeheader()
+
+    def write(self, row):
+        self._writer.writerow(row)
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetResultWriter:
+    """
+    Writes result rows as a directory of Parquet part files.
+
+    Rows are buffered and written as a new, complete part file every
+    `flush_rows` rows, so at most one buffer is lost if the process is
+    killed. `pyarrow` is imported only when Parquet output is used.
+    """
+
+    def __init__(self, path, flush_rows=100):
+        import pyarrow
+
+        self._pyarrow = pyarrow
+        self._path = path
+        self._flush_rows = flush_rows
+        self._rows = []
+        self._run = time.strftime('%Y%m%d-%H%M%S')
+        self._parts = 0
+        os.makedirs(path, exist_ok=True)
+
+    def write(self, row):
+        self._rows.append(row)
+        if len(self._rows) >= self._flush_rows:
+            self.flush()
+
+    def flush(self):
+        import pyarrow.parquet
+
+        if not self._rows:
+            return
+        table = self._pyarrow.Table.from_pylist(self._rows, schema=_parquet_schema(self._pyarrow))
+        part_path = os.path.join(self._path, f"part-{self._run}-{self._parts:05d}.parquet")
+        pyarrow.parquet.write_table(table, part_path)
+        self._parts += 1
+        self._rows = []
+
+    def close(self):
+        self.flush()
+
+
+def _parquet_schema(pyarrow):
+    return pyarrow.schema([
+        ('video', pyarrow.string()), ('label', pyarrow.string()),
+        ('prediction', pyarrow.string()), ('confidence', pyarrow.float64()),
+        ('correct', pyarrow.bool_()), ('top5', pyarrow.string()), ('error', pyarrow.string()),
+        ('decode_ms', pyarrow.float64()), ('detect_ms', pyarrow.float64()),
+        ('inference_ms', pyarrow.float64()),
+    ])
+
+
+def read_results(path, output_format):
+    """
+    Reads the rows written by earlier runs, keeping the last row of each video.
+
+    Args:
+        path (str): CSV file or Parquet directory.
+        output_format (str): 'csv' or 'parquet'.
+
+    Returns:
+        dict: Rows keyed by video path, with CSV values converted to the Parquet types.
+    """
+    rows = []
+    if output_format == 'csv' and os.path.exists(path):
+        with open(path, newline='') as f:
+            for row in csv.DictReader(f):
+                for column in ('label', 'prediction', 'top5', 'error'):
+                    row[column] = row[column] or None
+                for column in ('confidence', 'decode_ms', 'detect_ms', 'inference_ms'):
+                    row[column] = float(row[column]) if row[column] else None
+                row['correct'] = {'True': True, 'False': False}.get(row['correct'])
+                rows.append(row)
+    elif output_format == 'parquet' and os.path.isdir(path):
+        import pyarrow.parquet
+
+        for part_path in sorted(glob.glob(os.path.join(path, '*.parquet'))):
+            try:
+                rows.extend(pyarrow.parquet.read_table(part_path).to_pylist())
+            except Exception as e:
+                logging.warning("Skipping unreadable part %s: %s", part_path, e)
+    return {row['video']: row for row in rows}
+
+
+def result_row(video, label, result):
+    """
+    Converts a pipeline result into an output row.
+    """
+    timings = result['timings']
+    row = {column: None for column in COLUMNS}
+    row.update(video=video, label=label, error=result['error'],
+               **{f"{stage}_ms": timings.get(f"{stage}_ms") for stage in STAGES})
+    if result['predictions']:
+        word, confidence = result['predictions'][0]
+        row.update(prediction=word, confidence=confidence, top5=json.dumps(result['predictions']))
+        if label is not None:
+            row['correct'] = word == label
+    return row
+
+
+def report(rows, elapsed, processed, workers, confusion_path):
+    """
+    Prints the throughput of this run and the accuracy over all rows.
+
+    Args:
+        rows (list): Rows of this and earlier runs.
+        elapsed (float): Wall time of this run in seconds.
+        processed (list): Rows produced by this run.
+        workers (dict): Processes per stage.
+        confusion_path (str): CSV file the confusion matrix is written to.
+    """
+    print(f"Processed {len(processed)} videos in {elapsed:.1f} s "
+          f"({len(processed) / elapsed if elapsed else 0:.2f} clips/s end to end)")
+    for stage in STAGES:
+        stage_ms = [row[f"{stage}_ms"] for row in processed if row[f"{stage}_ms"] is not None]
+        if stage_ms:
+            # Capacity of the stage if its workers were never starved of input.
+            capacity = workers[stage] * 1000 / statistics.mean(stage_ms)
+            print(f"  {stage:<10} {workers[stage]} workers  median {statistics.median(stage_ms):8.1f} ms"
+                  f"/clip  capacity {capacity:8.2f} clips/s")
+
+    errors = collections.Counter(row['error'] for row in rows if row['error'])
+    for error, count in errors.most_common():
+        print(f"  {count} failed: {error}")
+
+    labeled = [row for row in rows if row['label'] is not None and row['prediction'] is not None]
+    if not labeled:
+        return
+    correct = sum(row['correct'] for row in labeled)
+    print(f"Accuracy {correct / len(labeled):.4f} ({correct}/{len(labeled)} labeled clips "
+          f"with a prediction)")
+
+    confusion = collections.Counter((row['label'], row['prediction']) for row in labeled)
+    mistakes = [(count, label, prediction) for (label, prediction), count in confusion.items()
+                if label != prediction]
+    for count, label, prediction in sorted(mistakes, reverse=True)[:10]:
+        print(f"  {label} -> {prediction}: {count}")
+
+    classes = sorted({row['label'] for row in labeled} | {row['prediction'] for row in labeled})
+    with open(confusion_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['label \\ prediction'] + classes)
+        for label in classes:
+            writer.writerow([label] + [confusion[(label, prediction)] for prediction in classes])
+    print(f"Confusion matrix written to {confusion_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('root', help='Directory of videos, e.g. data/dataset/val_20')
+    parser.add_argument('--output', required=True,
+                        help='CSV file, or directory of part files for Parquet')
+    parser.add_argument('--format', choices=('csv', 'parquet'), default='csv')
+    parser.add_argument('--no-labels', dest='labeled', action='store_false',
+                        help='Do not use the first directory level as the label')
+    parser.add_argument('--retry-errors', action='store_true',
+                        help='Reprocess videos whose earlier attempt failed')
+    parser.add_argument('--limit', type=int, help='Process at most this many new videos')
+    parser.add_argument('--decode-workers', type=int)
+    parser.add_argument('--detect-workers', type=int)
+    parser.add_argument('--inference-workers', type=int)
+    args = parser.parse_args()
+
+    configure_logging()
+    videos = find_videos(args.root, args.labeled)
+    previous = read_results(args.output, args.format)
+    done = {video for video, row in previous.items()
+            if not (args.retry_errors and row['error'])}
+    todo = [(video, label) for video, label in videos if video not in done]
+    print(f"{len(videos)} videos found, {len(videos) - len(todo)} already done, "
+          f"{len(todo)} to process")
+    todo = todo[:args.limit]
+
+    labels = dict(todo)
+    writer = (CsvResultWriter(args.output) if args.format == 'csv'
+              else ParquetResultWriter(args.output))
+    processed = []
+    start = time.perf_counter()
+    pipeline = StagedPipeline(args.decode_workers, args.detect_workers, args.inference_workers)
+    try:
+        with pipeline:
+            paths = [os.path.join(args.root, video) for video, _ in todo]
+            for result in pipeline.imap_unordered(paths):
+                video = os.path.relpath(result['video_path'], args.root)
+                row = result_row(video, labels[video], result)
+                writer.write(row)
+                processed.append(row)
+    except KeyboardInterrupt:
+        print("Interrupted; rerun the same command to resume.")
+    finally:
+        writer.close()
+
+    rows = {**previous, **{row['video']: row for row in processed}}
+    confusion_path = f"{args.output.rstrip(os.sep)}.confusion.csv"
+    report(list(rows.values()), time.perf_counter() - start, processed,
+           pipeline.workers, confusion_path)
+
+
+if __name__ == '__main__':
+    main()
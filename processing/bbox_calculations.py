@@ -1,3 +1,6 @@
+import numpy as np
+
+
 def calculate_mouth_bbox(frame_width, keypoints_list, confidences_list, conf_threshold=0.8, margin=30, top_margin_reduction=60):
     """
     Calculates the bounding box of the mouth region based on detected keypoints.
@@ -37,3 +40,85 @@ def calculate_mouth_bbox(frame_width, keypoints_list, confidences_list, conf_thr
         max_x += diff // 2
 
     return [min_x, min_y, max_x, max_y]
+
+
+def stack_keypoints(keypoints_per_frame, confidences_per_frame):
+    """
+    Stacks per-frame keypoint detections into padded batch arrays.
+
+    Each frame may contain a different number of detections, so the detections
+    of a frame are flattened and padded with zero-confidence keypoints up to the
+    largest count in the batch.
+
+    Args:
+        keypoints_per_frame (list): Per-frame keypoint arrays of shape (..., 2).
+        confidences_per_frame (list): Per-frame confidence arrays matching the keypoints.
+
+    Returns:
+        numpy.ndarray: Keypoints of shape (N, K, 2).
+        numpy.ndarray: Confidences of shape (N, K).
+    """
+    num_frames = len(keypoints_per_frame)
+    flat_keypoints = [np.asarray(kp, dtype=np.float32).reshape(-1, 2)
+                      for kp in keypoints_per_frame]
+    flat_confidences = [np.asarray(conf, dtype=np.float32).reshape(-1)
+                        for conf in confidences_per_frame]
+    max_keypoints = max((len(kp) for kp in flat_keypoints), default=0)
+
+    keypoints = np.zeros((num_frames, max_keypoints, 2), dtype=np.float32)
+    confidences = np.zeros((num_frames, max_keypoints), dtype=np.float32)
+    for i, (kp, conf) in enumerate(zip(flat_keypoints, flat_confidences)):
+        keypoints[i, :len(kp)] = kp
+        confidences[i, :len(conf)] = conf
+    return keypoints, confidences
+
+
+def calculate_mouth_bboxes(frame_width, keypoints, confidences, conf_threshold=0.8, margin=30, top_margin_reduction=60):
+    """
+    Vectorized version of `calculate_mouth_bbox` for a batch of frames.
+
+    Produces exactly the same boxes as calling `calculate_mouth_bbox` on each
+    frame, but computes them for the whole batch with array operations.
+
+    Args:
+        frame_width (int): Width of the video frames.
+        keypoints (numpy.ndarray): Keypoints of shape (N, K, 2).
+        confidences (numpy.ndarray): Confidence scores of shape (N, K).
+        conf_threshold (float): Minimum confidence threshold for keypoints.
+        margin (int): Margin to add around the bounding box.
+        top_margin_reduction (int): Reduction to apply to the top margin.
+
+    Returns:
+        list: For each frame, [min_x, min_y, max_x, max_y] or None if no valid keypoints are found.
+    """
+    keypoints = np.asarray(keypoints)
+    valid = np.asarray(confidences) > conf_threshold
+    if keypoints.shape[0] == 0:
+        return []
+    if keypoints.shape[1] == 0:
+        return [None] * keypoints.shape[0]
+
+    found = valid.any(axis=1)
+    xs, ys = keypoints[..., 0], keypoints[..., 1]
+
+    def _reduce(values, reducer, fill):
+        reduced = reducer(np.where(valid, values, fill), axis=1)
+        # int() in the per-frame path truncates towards zero.
+        return np.trunc(np.where(found, reduced, 0)).astype(np.int64)
+
+    min_x = np.maximum(_reduce(xs, np.min, np.inf) - margin, 0)
+    min_y = np.maximum(_reduce(ys, np.min, np.inf) -
+                       margin + top_margin_reduction, 0)
+    max_x = _reduce(xs, np.max, -np.inf) + margin
+    max_y = _reduce(ys, np.max, -np.inf) + margin
+
+    width, height = max_x - min_x, max_y - min_y
+    half_diff = np.abs(width - height) // 2
+    wider, taller = width > height, height > width
+    min_y = np.where(wider, np.maximum(min_y - half_diff, 0), min_y)
+    max_y = np.where(wider, max_y + half_diff, max_y)
+    min_x = np.where(taller, np.maximum(min_x - half_diff, 0), min_x)
+    max_x = np.where(taller, max_x + half_diff, max_x)
+
+    boxes = np.stack([min_x, min_y, max_x, max_y], axis=1).tolist()
+    return [box if has_box else None for box, has_box in zip(boxes, found)]
@@ -1,5 +1,6 @@
 import os
 import re
+import hashlib
 import cv2
 from config import project_config
 
@@ -46,3 +47,34 @@ def create_index_to_word_dict(root_dir):
         os_item for os_item in os.listdir(root_dir) if not os_item.startswith('.')
     )
     return {index: class_name for index, class_name in enumerate(classes)}
+
+
+def content_digest(data):
+    """
+    Compute the SHA-256 hex digest of in-memory content.
+
+    Args:
+        data (bytes): The content to hash.
+
+    Returns:
+        str: The hex digest.
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """
+    Compute the SHA-256 hex digest of a file without loading it fully into memory.
+
+    Args:
+        path (str): Path to the file.
+        chunk_size (int): Number of bytes read at a time.
+
+    Returns:
+        str: The hex digest.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
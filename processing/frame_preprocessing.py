@@ -0,0 +1,159 @@
+import argparse
+import logging
+import os
+import re
+
+import cv2
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+NORMALIZE_MEAN = 0.485
+"""Mean used to normalize grayscale frames (scaled to [0, 1])."""
+
+NORMALIZE_STD = 0.229
+"""Standard deviation used to normalize grayscale frames (scaled to [0, 1])."""
+
+
+def preprocess_frames(frames, out=None, size=64, mean=NORMALIZE_MEAN, std=NORMALIZE_STD):
+    """
+    Converts a stack of grayscale frames into a normalized model input tensor.
+
+    This is the vectorized equivalent of running every frame through
+    `LipReadingModel.transform()`: frames are resized to `size` x `size` if
+    needed, scaled to [0, 1] and normalized, all in a single batched operation.
+
+    Args:
+        frames (numpy.ndarray): uint8 array of shape (N, H, W), or a list of 2D frames.
+        out (torch.Tensor): Optional preallocated float32 tensor of shape
+            (1, N, 1, size, size) to write the result into.
+        size (int): Output height and width.
+        mean (float): Normalization mean.
+        std (float): Normalization standard deviation.
+
+    Returns:
+        torch.Tensor: Tensor of shape (1, N, 1, size, size).
+    """
+    if isinstance(frames, (list, tuple)):
+        frames = np.stack(frames)
+    frames = np.ascontiguousarray(frames, dtype=np.uint8)
+    num_frames = frames.shape[0]
+
+    if out is None:
+        out = torch.empty((1, num_frames, 1, size, size), dtype=torch.float32)
+    elif out.shape != (1, num_frames, 1, size, size):
+        raise ValueError(
+            f"Output tensor has shape {tuple(out.shape)}, expected {(1, num_frames, 1, size, size)}")
+
+    source = torch.from_numpy(frames)
+    if frames.shape[1:] == (size, size):
+        out[0, :, 0].copy_(source)
+    else:
+        resized = F.interpolate(source.unsqueeze(1).float(), size=(size, size),
+                                mode='bilinear', align_corners=False, antialias=True)
+        # PIL resizes in uint8, so round the same way.
+        out[0].copy_(resized.round_().clamp_(0, 255))
+
+    return out.sub_(255.0 * mean).div_(255.0 * std)
+
+
+class FramePreprocessor:
+    """
+    Batched frame preprocessing that reuses a single output buffer.
+
+    Useful for offline loops where clips are converted one after another.
+    The returned tensor is a view into the internal buffer and is overwritten
+    by the next call, so clone it if it must outlive the call. Instances are
+    not thread-safe.
+
+    Attributes:
+        size (int): Output height and width.
+    """
+
+    def __init__(self, size=64):
+        """
+        Initializes the preprocessor.
+
+        Args:
+            size (int): Output height and width.
+        """
+        self.size = size
+        self._buffer = None
+
+    def __call__(self, frames):
+        """
+        Preprocesses a stack of grayscale frames into the reusable buffer.
+
+        Args:
+            frames (numpy.ndarray): uint8 array of shape (N, H, W), or a list of 2D frames.
+
+        Returns:
+            torch.Tensor: View of shape (1, N, 1, size, size) into the buffer.
+        """
+        num_frames = len(frames)
+        if self._buffer is None or self._buffer.shape[1] < num_frames:
+            self._buffer = torch.empty(
+                (1, num_frames, 1, self.size, self.size), dtype=torch.float32)
+        return preprocess_frames(frames, out=self._buffer[:, :num_frames], size=self.size)
+
+
+def load_frames_folder(frames_folder):
+    """
+    Loads numbered grayscale mouth frames (0.jpg, 1.jpg, ...) from a folder.
+
+    Args:
+        frames_folder (str): Folder containing the frames.
+
+    Returns:
+        numpy.ndarray: uint8 array of shape (N, H, W) in frame order; shape
+            (0, 64, 64) if the folder holds no frames.
+    """
+    frame_paths = sorted(
+        [os.path.join(frames_folder, f) for f in os.listdir(
+            frames_folder) if f.endswith('.jpg')],
+        key=lambda x: int(re.search(r'\d+', os.path.basename(x)).group())
+    )
+    if not frame_paths:
+        return np.empty((0, 64, 64), dtype=np.uint8)
+    return np.stack([cv2.imread(path, cv2.IMREAD_GRAYSCALE) for path in frame_paths])
+
+
+def preprocess_directory(frames_root, output_dir):
+    """
+    Converts every folder of mouth frames under a root into a saved tensor.
+
+    Each `<frames_root>/<clip>/` folder becomes `<output_dir>/<clip>.pt`
+    holding a tensor of shape (1, N, 1, 64, 64).
+
+    Args:
+        frames_root (str): Directory containing one folder of frames per clip.
+        output_dir (str): Directory where the tensors are written.
+
+    Returns:
+        int: Number of clips converted.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    preprocessor = FramePreprocessor()
+    converted = 0
+    for clip_name in sorted(os.listdir(frames_root)):
+        clip_folder = os.path.join(frames_root, clip_name)
+        if not os.path.isdir(clip_folder):
+            continue
+        frames = load_frames_folder(clip_folder)
+        if len(frames) == 0:
+            continue
+        torch.save(preprocessor(frames).clone(),
+                   os.path.join(output_dir, f"{clip_name}.pt"))
+        converted += 1
+    logging.info("Preprocessed %d clips from %s into %s",
+                 converted, frames_root, output_dir)
+    return converted
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Convert folders of mouth frames into preprocessed tensors.')
+    parser.add_argument('frames_root', help='Directory with one folder of frames per clip.')
+    parser.add_argument('output_dir', help='Directory to write <clip>.pt tensors to.')
+    args = parser.parse_args()
+    preprocess_directory(args.frames_root, args.output_dir)
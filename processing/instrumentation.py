@@ -0,0 +1,357 @@
+import abc
+import bisect
+import contextlib
+import contextvars
+import logging
+import os
+import threading
+import time
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+"""Histogram buckets in seconds, from a single detector call to a full video."""
+
+MEMORY_BUCKETS = tuple(2 ** power * 1024 * 1024 for power in range(6, 14))
+"""Histogram buckets in bytes, from 64 MB to 8 GB."""
+
+
+class MetricsRegistry:
+    """
+    Collection of metrics rendered together in the Prometheus text format.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+
+    def render(self):
+        """
+        Returns every metric in the Prometheus text exposition format (version 0.0.4).
+        """
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+"""Registry of the metrics exposed by the API server on `/metrics`."""
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+               for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+class _Metric(abc.ABC):
+    """
+    Base of the metric types: a family of children, one per combination of label values.
+    """
+
+    type = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            # Metrics without labels are exported from the start.
+            self.labels()
+        registry.register(self)
+
+    def labels(self, *values):
+        """
+        Returns the child for the given label values, creating it on first use.
+        """
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def samples(self):
+        with self._lock:
+            children = list(self._children.items())
+        for values, child in children:
+            for suffix, extra, value in child.samples():
+                yield (f"{self.name}{suffix}{_format_labels(self.labelnames, values, extra)} "
+                       f"{_format_value(value)}")
+
+    @abc.abstractmethod
+    def _new_child(self):
+        """
+        Creates the value holder of one combination of label values.
+        """
+
+
+class _CounterChild:
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    def samples(self):
+        return [('', (), self._value)]
+
+
+class Counter(_Metric):
+    """
+    Monotonically increasing count. The exposed name gets a `_total` suffix.
+    """
+
+    type = 'counter'
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY):
+        super(Counter, self).__init__(f"{name}_total", documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+
+class _GaugeChild:
+    def __init__(self):
+        self._value = 0.0
+        self._function = None
+        self._lock = threading.Lock()
+
+    def set(self, value):
+        self._value = value
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def set_function(self, function):
+        """
+        Reads the value from `function` whenever the metrics are rendered.
+        """
+        self._function = function
+
+    def samples(self):
+        return [('', (), self._function() if self._function else self._value)]
+
+
+class Gauge(_Metric):
+    """
+    Value that can go up and down, or be read from a function at render time.
+    """
+
+    type = 'gauge'
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def dec(self, amount=1):
+        self.labels().dec(amount)
+
+    def set_function(self, function):
+        self.labels().set_function(function)
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self._buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self._buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def samples(self):
+        with self._lock:
+            counts, total = list(self._counts), self._sum
+        samples, cumulative = [], 0
+        for bound, count in zip(self._buckets + (float('inf'),), counts):
+            cumulative += count
+            samples.append(('_bucket', (('le', _format_value(bound)),), cumulative))
+        samples.append(('_sum', (), total))
+        samples.append(('_count', (), cumulative))
+        return samples
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values over fixed buckets.
+    """
+
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS,
+                 registry=REGISTRY):
+        self.buckets = tuple(sorted(buckets))
+        super(Histogram, self).__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+
+STAGE_SECONDS = Histogram(
+    'lipreading_stage_seconds',
+    'Time spent in a pipeline stage per call (decode and motion: per video).', ['stage'])
+FRAMES_PROCESSED = Counter(
+    'lipreading_frames_processed', 'Frames processed by each pipeline stage.', ['stage'])
+MOUTH_NOT_FOUND = Counter(
+    'lipreading_mouth_not_found', 'Frames in which the detector found no mouth.')
+MOUTH_TRACKED = Counter(
+    'lipreading_mouth_tracked_frames',
+    'Frames whose mouth box was tracked instead of detected (detector calls saved).')
+REQUEST_SECONDS = Histogram(
+    'lipreading_request_seconds', 'End-to-end processing time of requests.', ['endpoint'])
+REQUESTS_IN_FLIGHT = Gauge(
+    'lipreading_requests_in_flight', 'Requests (or open streams) being processed.', ['endpoint'])
+REQUEST_PEAK_RSS = Histogram(
+    'lipreading_request_peak_rss_bytes',
+    'Largest resident set size of the process seen at the stage boundaries of a request.',
+    ['endpoint'], buckets=MEMORY_BUCKETS)
+QUEUE_DEPTH = Gauge(
+    'lipreading_queue_depth', 'Items waiting in an internal queue.', ['queue'])
+RESIDENT_MEMORY = Gauge(
+    'lipreading_process_resident_memory_bytes', 'Resident set size of the server process.')
+
+_request_peak = contextvars.ContextVar('lipreading_request_peak', default=None)
+
+
+def current_rss():
+    """
+    Returns the resident set size of the process in bytes.
+
+    Reads /proc/self/statm where available (a few microseconds) and falls back
+    to the peak reported by `resource.getrusage`.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+RESIDENT_MEMORY.set_function(current_rss)
+
+
+def observe_stage(stage, seconds, frames=None):
+    """
+    Records one call of a pipeline stage.
+
+    Args:
+        stage (str): Stage name, e.g. 'detection'.
+        seconds (float): Duration of the call.
+        frames (int): Number of frames the call processed, if meaningful.
+    """
+    STAGE_SECONDS.labels(stage).observe(seconds)
+    if frames:
+        FRAMES_PROCESSED.labels(stage).inc(frames)
+    peak = _request_peak.get()
+    if peak is not None:
+        peak[0] = max(peak[0], current_rss())
+
+
+@contextlib.contextmanager
+def stage_timer(stage, frames=None):
+    """
+    Times the enclosed block as one call of a pipeline stage (see `observe_stage`).
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start, frames)
+
+
+@contextlib.contextmanager
+def track_request(endpoint):
+    """
+    Counts the enclosed block as an in-flight request and records its latency
+    and the peak resident memory seen at its stage boundaries.
+
+    Args:
+        endpoint (str): Label of the request type, e.g. 'pipeline'.
+    """
+    in_flight = REQUESTS_IN_FLIGHT.labels(endpoint)
+    in_flight.inc()
+    peak = [current_rss()]
+    token = _request_peak.set(peak)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _request_peak.reset(token)
+        in_flight.dec()
+        REQUEST_SECONDS.labels(endpoint).observe(time.perf_counter() - start)
+        REQUEST_PEAK_RSS.labels(endpoint).observe(max(peak[0], current_rss()))
+
+
+_sampled_logs = {}
+_sampled_logs_lock = threading.Lock()
+
+
+def log_sampled(key, interval, level, message, *args):
+    """
+    Logs a message at most once per `interval` seconds for a given key.
+
+    Messages dropped in between are counted and the count is appended to the
+    next message that is logged, so frequent events stay visible without
+    flooding the log.
+
+    Args:
+        key (str): Identifies the kind of message.
+        interval (float): Minimum seconds between two logged messages.
+        level (int): Logging level.
+        message (str): Format string, as for `logging.log`.
+        *args: Format arguments.
+    """
+    now = time.monotonic()
+    with _sampled_logs_lock:
+        last, suppressed = _sampled_logs.get(key, (None, 0))
+        if last is not None and now - last < interval:
+            _sampled_logs[key] = (last, suppressed + 1)
+            return
+        _sampled_logs[key] = (now, 0)
+    if suppressed:
+        message += f" ({suppressed} similar messages suppressed)"
+    logging.log(level, message, *args, stacklevel=2)
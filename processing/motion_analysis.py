@@ -1,46 +1,129 @@
-import cv2
+import heapq
+import logging
+import time
+
 import numpy as np
 
+from processing.instrumentation import observe_stage
+from processing.motion_engines import create_motion_scorer
+
 
-def analyze_motion(cap):
+def analyze_motion(cap, scorer=None):
     """
     Analyzes motion in the video frames.
 
     Args:
         cap (cv2.VideoCapture): Video capture object.
+        scorer (MotionScorer): Motion-scoring engine; defaults to the one selected in Config.
 
     Returns:
         list: List of frames from the video.
         list: Corresponding motion scores for the frames.
     """
+    scorer = scorer or create_motion_scorer()
     motion_scores = []
     frames = []
-    prev_gray = None
+    prev_prepared = None
+    decode_seconds = motion_seconds = 0.0
 
     while cap.isOpened():
+        start = time.perf_counter()
         ret, frame = cap.read()
+        decoded = time.perf_counter()
+        decode_seconds += decoded - start
         if not ret:
             break
 
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        if prev_gray is not None:
-            flow = cv2.calcOpticalFlowFarneback(
-                prev_gray, gray, None, 0.5, 3, 15, 3, 5, 1.2, 0 # type: ignore
-            )
-            magnitude, _ = cv2.cartToPolar(flow[..., 0], flow[..., 1])
-            motion_scores.append(np.sum(magnitude))
+        prepared = scorer.prepare(frame)
+        if prev_prepared is not None:
+            motion_scores.append(scorer.score(prev_prepared, prepared))
+        motion_seconds += time.perf_counter() - decoded
 
         frames.append(frame)
-        prev_gray = gray
+        prev_prepared = prepared
 
     cap.release()
+    observe_stage('decode', decode_seconds, len(frames))
+    observe_stage('motion', motion_seconds, len(frames))
     return frames, motion_scores
 
 
+def analyze_motion_streaming(cap, top_n=29, scorer=None):
+    """
+    Analyzes motion while decoding and keeps only the top-scoring frames.
+
+    Frames are scored as soon as the next frame is decoded and pushed into a
+    bounded min-heap of `top_n` candidates; frames that fall out of the heap
+    are released immediately, so memory stays proportional to `top_n` rather
+    than to the video length. The result is identical to running
+    `analyze_motion` followed by `select_top_frames`.
+
+    Args:
+        cap (cv2.VideoCapture): Video capture object.
+        top_n (int): Number of top frames to keep.
+        scorer (MotionScorer): Motion-scoring engine; defaults to the one selected in Config.
+
+    Returns:
+        list: Top frames in their original temporal order.
+        dict: Statistics with the number of decoded frames and the peak number
+            of bytes held in frame buffers.
+    """
+    scorer = scorer or create_motion_scorer()
+    heap = []
+    prev_frame, prev_prepared = None, None
+    frame_index = 0
+    buffered_bytes = peak_bytes = 0
+    decode_seconds = motion_seconds = 0.0
+
+    while cap.isOpened():
+        start = time.perf_counter()
+        ret, frame = cap.read()
+        decoded = time.perf_counter()
+        decode_seconds += decoded - start
+        if not ret:
+            break
+
+        prepared = scorer.prepare(frame)
+        buffered_bytes += frame.nbytes
+        peak_bytes = max(peak_bytes, buffered_bytes)
+
+        if prev_prepared is not None:
+            # The score of a frame pair belongs to the earlier frame, as in analyze_motion.
+            candidate = (scorer.score(prev_prepared, prepared),
+                         frame_index - 1, prev_frame)
+            if len(heap) < top_n:
+                heapq.heappush(heap, candidate)
+            else:
+                dropped = heapq.heappushpop(heap, candidate)
+                buffered_bytes -= dropped[2].nbytes
+                del dropped
+        motion_seconds += time.perf_counter() - decoded
+
+        prev_frame, prev_prepared = frame, prepared
+        frame_index += 1
+
+    cap.release()
+    observe_stage('decode', decode_seconds, frame_index)
+    observe_stage('motion', motion_seconds, frame_index)
+    if prev_frame is not None:
+        # The last frame never receives a motion score.
+        buffered_bytes -= prev_frame.nbytes
+        prev_frame = None
+
+    selected = [frame for _, _, frame in sorted(heap, key=lambda item: item[1])]
+    stats = {'frames_decoded': frame_index, 'peak_frame_bytes': peak_bytes}
+    logging.info("Motion analysis kept %d of %d frames, peak frame buffer %.1f MB",
+                 len(selected), frame_index, peak_bytes / (1024 * 1024))
+    return selected, stats
+
+
 def select_top_frames(frames, motion_scores, top_n=29):
     """
     Selects the top frames based on motion scores.
 
+    Ties are broken by frame index (later frames win), matching the order used
+    by `analyze_motion_streaming`.
+
     Args:
         frames (list): List of video frames.
         motion_scores (list): List of motion scores corresponding to the frames.
@@ -49,5 +132,6 @@ def select_top_frames(frames, motion_scores, top_n=29):
     Returns:
         list: Top frames sorted by motion scores.
     """
-    top_indices = np.argsort(motion_scores)[-top_n:]
+    top_indices = np.argsort(motion_scores, kind='stable')[-top_n:]
     return [frames[i] for i in sorted(top_indices)]
+
@@ -1,15 +1,18 @@
 import os
-import re
 import cv2
-import torch
 import logging
-from ultralytics import YOLO
+import threading
+import time
+import numpy as np
 from config import project_config
-from processing.motion_analysis import analyze_motion, select_top_frames
-from processing.bbox_calculations import calculate_mouth_bbox
+from processing.motion_analysis import analyze_motion, analyze_motion_streaming, select_top_frames
+from processing.bbox_calculations import calculate_mouth_bbox, calculate_mouth_bboxes, stack_keypoints
 from processing.logging_config import configure_logging
 from processing.data_processing_utils import enhance_mouth_region
-from backbone.model_loader import LipReadingModel
+from processing.artifact_policy import should_save_artifact
+from processing.frame_preprocessing import load_frames_folder, preprocess_frames
+from processing.instrumentation import MOUTH_NOT_FOUND, MOUTH_TRACKED, observe_stage, stage_timer
+from processing.mouth_tracking import MouthTracker
 configure_logging()
 
 
@@ -23,11 +26,24 @@ class VideoProcessor:
         """
         Initializes the VideoProcessor with the YOLO model for detecting mouth regions.
         """
+        # Imported here because ultralytics is slow to import.
+        from ultralytics import YOLO
+
         self.model = YOLO(project_config.Config.YOLO_MODEL_PATH)
+        # Ultralytics predictors are not thread-safe, so detector calls are serialized.
+        self._detector_lock = threading.Lock()
         logging.info(
             "Initialized VideoProcessor with YOLO model loaded from %s", project_config.Config.YOLO_MODEL_PATH
         )
 
+    def warm_up(self):
+        """
+        Runs the detector once on a blank frame so that the first real request
+        does not pay for its lazy initialization.
+        """
+        size = project_config.Config.YOLO_INFERENCE_SIZE
+        self.extract_mouth_bboxes([np.zeros((size, size, 3), dtype=np.uint8)])
+
     def process_video(self, video_path):
         """
         Processes a video to extract mouth frames.
@@ -35,25 +51,106 @@ class VideoProcessor:
         Args:
             video_path (str): Path to the input video file.
 
+        Which frames are written is decided by `Config.ARTIFACT_POLICY`.
+
         Returns:
-            str: Path to the directory containing extracted mouth frames.
+            str: Path to the directory containing extracted mouth frames, or
+                None if the policy does not save them.
         """
         cap = self._open_video(video_path)
-        frames, motion_scores = analyze_motion(cap)
-        selected_frames = select_top_frames(frames, motion_scores)
-
-        video_name = os.path.splitext(os.path.basename(video_path))[0]
-        mouth_extract_folder = os.path.join(
-            project_config.Config.MOUTH_FRAMES_FOLDER, video_name)
-        full_frames_folder = os.path.join(
-            project_config.Config.FULL_FRAMES_FOLDER, video_name)
-        os.makedirs(mouth_extract_folder, exist_ok=True)
-        os.makedirs(full_frames_folder, exist_ok=True)
+        selected_frames = self.select_frames(cap)
 
+        mouth_extract_folder, full_frames_folder = self._artifact_folders(
+            video_path, should_save_artifact('mouth_frames'), should_save_artifact('full_frames'))
         self._extract_mouth_frames(
             selected_frames, full_frames_folder, mouth_extract_folder)
         return mouth_extract_folder if len(selected_frames) == 29 else None
 
+    def process_video_in_memory(self, video_path, save_artifacts=None, progress=None):
+        """
+        Processes a video into a model-ready tensor without a disk round-trip.
+
+        Args:
+            video_path (str): Path to the input video file.
+            save_artifacts (bool): Whether to also write the full frames and mouth
+                crops to disk; by default each is decided by `Config.ARTIFACT_POLICY`.
+            progress (callable): Optional callback receiving the names of completed
+                stages ('decoded', 'detected').
+
+        Returns:
+            torch.Tensor: Tensor of shape (1, num_frames, 1, 64, 64), or None if
+                the video does not yield 29 frames.
+            list: The 64x64 grayscale mouth crops the tensor was built from.
+        """
+        if save_artifacts is None:
+            save_mouth_frames = should_save_artifact('mouth_frames')
+            save_full_frames = should_save_artifact('full_frames')
+        else:
+            save_mouth_frames = save_full_frames = save_artifacts
+
+        cap = self._open_video(video_path)
+        selected_frames = self.select_frames(cap)
+        if progress:
+            progress('decoded')
+        if len(selected_frames) != 29:
+            return None, []
+
+        mouth_extract_folder, full_frames_folder = self._artifact_folders(
+            video_path, save_mouth_frames, save_full_frames)
+        mouth_frames = self._extract_mouth_frames(
+            selected_frames, full_frames_folder, mouth_extract_folder)
+        if progress:
+            progress('detected')
+        if not mouth_frames:
+            return None, []
+        return self.transform_frames(mouth_frames), mouth_frames
+
+    def _artifact_folders(self, video_path, mouth_frames=True, full_frames=True):
+        """
+        Creates the folders where mouth crops and full frames of a video are saved.
+
+        Args:
+            video_path (str): Path to the input video file.
+            mouth_frames (bool): Whether the mouth crops are saved.
+            full_frames (bool): Whether the annotated full frames are saved.
+
+        Returns:
+            str: Directory for the mouth crops, or None if they are not saved.
+            str: Directory for the annotated full frames, or None if they are not saved.
+        """
+        video_name = os.path.splitext(os.path.basename(video_path))[0]
+        mouth_extract_folder = full_frames_folder = None
+        if mouth_frames:
+            mouth_extract_folder = os.path.join(
+                project_config.Config.MOUTH_FRAMES_FOLDER, video_name)
+            os.makedirs(mouth_extract_folder, exist_ok=True)
+        if full_frames:
+            full_frames_folder = os.path.join(
+                project_config.Config.FULL_FRAMES_FOLDER, video_name)
+            os.makedirs(full_frames_folder, exist_ok=True)
+        return mouth_extract_folder, full_frames_folder
+
+    @staticmethod
+    def select_frames(cap):
+        """
+        Selects the frames with the most motion from an opened video.
+
+        This needs no detector, so it can run in a process without one (see
+        `processing.staged_pipeline`).
+
+        Args:
+            cap (cv2.VideoCapture): Video capture object.
+
+        Returns:
+            list: Selected frames in temporal order.
+        """
+        if project_config.Config.MOTION_STREAMING:
+            selected_frames, _ = analyze_motion_streaming(cap)
+            return selected_frames
+
+        frames, motion_scores = analyze_motion(cap)
+        return select_top_frames(frames, motion_scores)
+
     def _open_video(self, video_path):
         """
         Opens a video file for processing.
@@ -71,31 +168,184 @@ class VideoProcessor:
         logging.info("Processing video: %s", video_path)
         return cap
 
-    def _extract_mouth_frames(self, frames, full_frames_folder, mouth_extract_folder):
+    def _extract_mouth_frames(self, frames, full_frames_folder=None, mouth_extract_folder=None):
         """
-        Extracts mouth regions from selected frames and saves them.
+        Extracts mouth regions from selected frames and optionally saves them.
 
         Args:
             frames (list): List of selected video frames.
-            full_frames_folder (str): Directory to save full frames.
-            mouth_extract_folder (str): Directory to save mouth regions.
+            full_frames_folder (str): Directory to save full frames, or None to skip saving.
+            mouth_extract_folder (str): Directory to save mouth regions, or None to skip saving.
+
+        Returns:
+            list: 64x64 grayscale mouth regions of the frames where a mouth was found.
         """
-        for i, frame in enumerate(frames):
-            bbox = self.extract_mouth_bbox(frame)
+        mouth_frames = []
+        bboxes = self.locate_mouths(frames)
+        start = time.perf_counter()
+        for i, (frame, bbox) in enumerate(zip(frames, bboxes)):
             if bbox:
                 x1, y1, x2, y2 = bbox
-                mouth_region = frame[y1:y2, x1:x2]
-                mouth_region_resized = cv2.resize(
-                    mouth_region, (64, 64), interpolation=cv2.INTER_CUBIC)
-                mouth_region_resized = enhance_mouth_region(
-                    mouth_region_resized)
-                cv2.imwrite(os.path.join(mouth_extract_folder,
-                            f"{i}.jpg"), mouth_region_resized)
-                logging.info("Mouth detected and extracted in frame %d", i)
-                cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+                mouth_region_resized = self.crop_mouth(frame, bbox)
+                mouth_frames.append(mouth_region_resized)
+                if mouth_extract_folder:
+                    cv2.imwrite(os.path.join(mouth_extract_folder,
+                                f"{i}.jpg"), mouth_region_resized)
+                if full_frames_folder:
+                    cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+            if full_frames_folder:
+                cv2.imwrite(os.path.join(full_frames_folder, f"{i}.jpg"), frame)
+        observe_stage('crop', time.perf_counter() - start, len(mouth_frames))
+        missing = [i for i, bbox in enumerate(bboxes) if not bbox]
+        logging.info("Mouth extracted in %d of %d frames%s", len(mouth_frames), len(frames),
+                     f" (missing in frames {missing})" if missing else "")
+        return mouth_frames
+
+    @staticmethod
+    def crop_mouth(frame, bbox):
+        """
+        Crops a mouth region and turns it into an enhanced 64x64 grayscale image.
+
+        Args:
+            frame (numpy.ndarray): A video frame.
+            bbox (list): Coordinates [x1, y1, x2, y2] of the mouth.
+
+        Returns:
+            numpy.ndarray: The enhanced mouth region.
+        """
+        x1, y1, x2, y2 = bbox
+        mouth_region = cv2.resize(
+            frame[y1:y2, x1:x2], (64, 64), interpolation=cv2.INTER_CUBIC)
+        return enhance_mouth_region(mouth_region)
+
+    def extract_mouth_crop(self, frame):
+        """
+        Detects the mouth in a single frame and crops it, for streamed frames.
+
+        Args:
+            frame (numpy.ndarray): A video frame.
+
+        Returns:
+            numpy.ndarray: The enhanced 64x64 grayscale mouth region, or None if
+                no mouth was detected.
+        """
+        return self.extract_mouth_crops([frame])[0]
+
+    def extract_mouth_crops(self, frames, tracker=None):
+        """
+        Detects the mouth in a batch of frames and crops it.
+
+        Args:
+            frames (list): Video frames of the same size.
+            tracker (MouthTracker): Tracker of the video the frames belong to,
+                see `locate_mouths`.
+
+        Returns:
+            list: For each frame, the enhanced 64x64 grayscale mouth region, or
+                None if no mouth was detected.
+        """
+        bboxes = self.locate_mouths(frames, tracker)
+        with stage_timer('crop', frames=sum(1 for bbox in bboxes if bbox)):
+            return [self.crop_mouth(frame, bbox) if bbox else None
+                    for frame, bbox in zip(frames, bboxes)]
+
+    def process_video_sequence(self, video_path, max_frames=None, progress=None):
+        """
+        Extracts a mouth crop for every frame of a video, for sliding-window recognition.
+
+        Frames are decoded and sent to the detector in batches of
+        `Config.YOLO_BATCH_SIZE` and dropped once cropped, so memory does not
+        grow with the resolution times the length of the video. In 'tracking'
+        mode one tracker follows the mouth across the batches. Frames without
+        a detected mouth repeat the nearest earlier crop (the first crop at
+        the start of the video), keeping the sequence aligned with the video.
+
+        Args:
+            video_path (str): Path to the input video file.
+            max_frames (int): Maximum number of frames to read; defaults to
+                `Config.TIMELINE_MAX_FRAMES`.
+            progress (callable): Optional callback receiving the names of completed
+                stages ('decoded', 'detected').
+
+        Returns:
+            torch.Tensor: Tensor of shape (1, num_frames, 1, 64, 64), or None if
+                no mouth was detected.
+            list: The 64x64 grayscale mouth crops.
+            float: Frame rate of the video.
+            int: Number of frames in which no mouth was detected.
+        """
+        if max_frames is None:
+            max_frames = project_config.Config.TIMELINE_MAX_FRAMES
+
+        cap = self._open_video(video_path)
+        fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        batch_size = project_config.Config.YOLO_BATCH_SIZE
+        tracker = MouthTracker(self.extract_mouth_bboxes) \
+            if project_config.Config.MOUTH_DETECTION_MODE == 'tracking' else None
+        crops, batch = [], []
+        frames_read = 0
+        decode_seconds = 0.0
+        while frames_read < max_frames:
+            start = time.perf_counter()
+            ret, frame = cap.read()
+            decode_seconds += time.perf_counter() - start
+            if ret:
+                batch.append(frame)
+                frames_read += 1
+            if batch and (not ret or len(batch) == batch_size or frames_read == max_frames):
+                crops.extend(self.extract_mouth_crops(batch, tracker))
+                batch = []
+            if not ret:
+                break
+        cap.release()
+        observe_stage('decode', decode_seconds, frames_read)
+        if progress:
+            progress('decoded')
+            progress('detected')
+
+        missing = sum(crop is None for crop in crops)
+        logging.info("Extracted %d mouth crops from %d frames of %s",
+                     len(crops) - missing, len(crops), video_path)
+        detected = [crop for crop in crops if crop is not None]
+        if not detected:
+            return None, [], fps, missing
+
+        previous = detected[0]
+        for i, crop in enumerate(crops):
+            if crop is None:
+                crops[i] = previous
             else:
-                logging.info("No mouth detected in frame %d", i)
-            cv2.imwrite(os.path.join(full_frames_folder, f"{i}.jpg"), frame)
+                previous = crop
+        return self.transform_frames(crops), crops, fps, missing
+
+    def locate_mouths(self, frames, tracker=None):
+        """
+        Finds the mouth box of every frame with the configured detection mode.
+
+        In 'tracking' mode (see `Config.MOUTH_DETECTION_MODE`) the detector
+        only runs on keyframes and the boxes are tracked in between (see
+        `processing.mouth_tracking.MouthTracker`).
+
+        Args:
+            frames (list): Video frames of the same size, in temporal order.
+            tracker (MouthTracker): Tracker that continues from the previous
+                frames of the same video; by default the frames are tracked
+                on their own (in 'tracking' mode).
+
+        Returns:
+            list: For each frame, coordinates [x1, y1, x2, y2] or None if no mouth was found.
+        """
+        if tracker is None:
+            if project_config.Config.MOUTH_DETECTION_MODE != 'tracking' or len(frames) < 2:
+                return self.extract_mouth_bboxes(frames)
+            tracker = MouthTracker(self.extract_mouth_bboxes)
+
+        bboxes, stats = tracker.track(frames)
+        observe_stage('tracking', stats['tracking_seconds'], stats['tracked'])
+        MOUTH_TRACKED.inc(stats['tracked'])
+        logging.info("Tracked the mouth in %d of %d frames (%d detector calls, %d re-detections)",
+                     stats['tracked'], stats['frames'], stats['detector_calls'], stats['redetections'])
+        return bboxes
 
     def extract_mouth_bbox(self, frame):
         """
@@ -107,15 +357,104 @@ class VideoProcessor:
         Returns:
             list: Coordinates [x1, y1, x2, y2].
         """
-        results = self.model(frame)
-        if not results or not results[0].keypoints or not results[0].keypoints.conf:
+        with self._detector_lock:
+            results = self.model(frame)
+        if not results:
             return None
 
-        keypoints_list = results[0].keypoints.xy.cpu().numpy()
-        confidences_list = results[0].keypoints.conf.cpu().numpy()
+        keypoints_list, confidences_list = self._result_keypoints(results[0])
+        if confidences_list.size == 0:
+            return None
 
         return calculate_mouth_bbox(frame.shape[1], keypoints_list, confidences_list)
 
+    def extract_mouth_bboxes(self, frames):
+        """
+        Extracts mouth bounding boxes for a list of frames using batched YOLO inference.
+
+        Frames are sent through the model in batches of `Config.YOLO_BATCH_SIZE`,
+        optionally downscaled to `Config.YOLO_INFERENCE_SIZE`, and the keypoints
+        are rescaled back to frame coordinates before the boxes are computed
+        for the whole batch at once.
+
+        Args:
+            frames (list): List of video frames (numpy.ndarray) of the same size.
+
+        Returns:
+            list: For each frame, coordinates [x1, y1, x2, y2] or None if no mouth was found.
+        """
+        if not frames:
+            return []
+
+        with stage_timer('detection', frames=len(frames)):
+            bboxes = self._detect_mouth_bboxes(frames)
+        MOUTH_NOT_FOUND.inc(sum(1 for bbox in bboxes if not bbox))
+        return bboxes
+
+    def _detect_mouth_bboxes(self, frames):
+        batch_size = project_config.Config.YOLO_BATCH_SIZE
+        keypoints_per_frame, confidences_per_frame = [], []
+        for start in range(0, len(frames), batch_size):
+            batch = frames[start:start + batch_size]
+            inputs, scales = self._prepare_detection_batch(batch)
+            with self._detector_lock:
+                results = self.model(
+                    inputs, imgsz=project_config.Config.YOLO_INFERENCE_SIZE, verbose=False)
+            for result, scale in zip(results, scales):
+                keypoints, confidences = self._result_keypoints(result)
+                keypoints_per_frame.append(keypoints * scale)
+                confidences_per_frame.append(confidences)
+
+        keypoints, confidences = stack_keypoints(
+            keypoints_per_frame, confidences_per_frame)
+        return calculate_mouth_bboxes(frames[0].shape[1], keypoints, confidences)
+
+    def _prepare_detection_batch(self, frames):
+        """
+        Downscales frames to the configured YOLO inference resolution.
+
+        Args:
+            frames (list): List of video frames.
+
+        Returns:
+            list: Frames to feed to the detector.
+            list: Per-frame (x, y) scale factors mapping detector coordinates back to the frame.
+        """
+        inference_size = project_config.Config.YOLO_INFERENCE_SIZE
+        inputs, scales = [], []
+        for frame in frames:
+            height, width = frame.shape[:2]
+            ratio = inference_size / max(height, width)
+            if ratio >= 1:
+                inputs.append(frame)
+                scales.append(np.ones(2, dtype=np.float32))
+                continue
+
+            resized_width = max(int(round(width * ratio)), 1)
+            resized_height = max(int(round(height * ratio)), 1)
+            inputs.append(cv2.resize(frame, (resized_width, resized_height),
+                                     interpolation=cv2.INTER_AREA))
+            scales.append(np.array([width / resized_width, height / resized_height],
+                                   dtype=np.float32))
+        return inputs, scales
+
+    @staticmethod
+    def _result_keypoints(result):
+        """
+        Extracts keypoints and their confidences from a single YOLO result.
+
+        Args:
+            result (ultralytics.engine.results.Results): Detection result for one frame.
+
+        Returns:
+            numpy.ndarray: Keypoints of shape (P, K, 2).
+            numpy.ndarray: Confidences of shape (P, K), empty when the model gave none.
+        """
+        keypoints = result.keypoints
+        if keypoints is None or keypoints.conf is None:
+            return np.zeros((0, 2), dtype=np.float32), np.zeros(0, dtype=np.float32)
+        return keypoints.xy.cpu().numpy(), keypoints.conf.cpu().numpy()
+
     def load_and_transform_frames(self, frames_folder):
         """
         Load and apply transformations to extracted mouth frames.
@@ -126,21 +465,20 @@ class VideoProcessor:
         Returns:
             torch.Tensor: A tensor of transformed frames ready for prediction.
         """
-        transform = LipReadingModel.transform()
-        frame_paths = sorted(
-            [os.path.join(frames_folder, f) for f in os.listdir(
-                frames_folder) if f.endswith('.jpg')],
-            key=lambda x: int(re.search(r'\d+', x).group())
-        )
+        return self.transform_frames(load_frames_folder(frames_folder))
 
-        transformed_frames = []
-        for frame_path in frame_paths:
-            image = cv2.imread(frame_path, cv2.IMREAD_GRAYSCALE)
-            image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
-            image_tensor = transform(image)
-            transformed_frames.append(image_tensor.unsqueeze(0))
+    def transform_frames(self, mouth_frames):
+        """
+        Apply the model transformations to in-memory mouth frames.
 
-        return torch.cat(transformed_frames, dim=0).unsqueeze(0)
+        Args:
+            mouth_frames (list): Grayscale mouth regions (numpy.ndarray).
+
+        Returns:
+            torch.Tensor: A tensor of shape (1, num_frames, 1, 64, 64) ready for prediction.
+        """
+        with stage_timer('preprocess', frames=len(mouth_frames)):
+            return preprocess_frames(mouth_frames)
 
     def get_saliency_maps(self, frames_tensor, lip_reading_model):
         """
@@ -148,7 +486,8 @@ class VideoProcessor:
 
         Args:
             frames_tensor (torch.Tensor): Tensor of transformed frames.
-            lip_reading_model (LipReadingModel): The lip-reading model.
+            lip_reading_model (LipReadingModel): The lip-reading model, or a
+                `DynamicBatcher` wrapping it.
 
         Returns:
             tuple: Predictions and saliency maps.
@@ -0,0 +1,188 @@
+import time
+
+import cv2
+import numpy as np
+
+from config import project_config
+
+
+def box_iou(box_a, box_b):
+    """
+    Computes the intersection over union of two boxes.
+
+    Args:
+        box_a (list): Coordinates [x1, y1, x2, y2], or None.
+        box_b (list): Coordinates [x1, y1, x2, y2], or None.
+
+    Returns:
+        float: IoU in [0, 1]; 1 if both boxes are None and 0 if only one is.
+    """
+    if box_a is None or box_b is None:
+        return float(box_a is None and box_b is None)
+    width = min(box_a[2], box_b[2]) - max(box_a[0], box_b[0])
+    height = min(box_a[3], box_b[3]) - max(box_a[1], box_b[1])
+    intersection = max(width, 0) * max(height, 0)
+    area_a = (box_a[2] - box_a[0]) * (box_a[3] - box_a[1])
+    area_b = (box_b[2] - box_b[0]) * (box_b[3] - box_b[1])
+    union = area_a + area_b - intersection
+    return intersection / union if union > 0 else 0.0
+
+
+class MouthTracker:
+    """
+    Locates the mouth in a sequence of frames with sparse detector keyframes.
+
+    The detector runs on every `keyframe_interval`-th frame; in between, the
+    box of the previous frame is moved by the median displacement of corner
+    points tracked inside it with pyramidal Lucas-Kanade optical flow. Points
+    are tracked forwards and backwards and only those that return to where
+    they started are kept; when fewer than `min_points` survive, the tracker
+    has lost the mouth and the detector runs on that frame instead. When the
+    detector finds no mouth, the frames up to the next keyframe have no box
+    either. Boxes are smoothed with an exponential moving average to reduce
+    crop jitter.
+
+    A tracker follows one video: successive calls to `track` continue where
+    the previous one stopped, so a video can be tracked in batches.
+
+    Attributes:
+        detect (callable): Maps a list of frames to their mouth boxes (or None).
+        keyframe_interval (int): Frames between two scheduled detector calls.
+        min_points (int): Minimum number of reliably tracked points.
+        smoothing (float): Weight of the new box in the moving average; 1 disables smoothing.
+        max_error (float): Largest forward-backward distance in pixels of a reliable point.
+    """
+
+    def __init__(self, detect, keyframe_interval=None, min_points=None, smoothing=None,
+                 max_error=1.0):
+        """
+        Initializes the tracker.
+
+        Args:
+            detect (callable): Maps a list of frames to their mouth boxes, e.g.
+                `VideoProcessor.extract_mouth_bboxes`.
+            keyframe_interval (int): Frames between two scheduled detector calls;
+                defaults to `Config.MOUTH_TRACKING_INTERVAL`.
+            min_points (int): Minimum number of reliably tracked points; defaults
+                to `Config.MOUTH_TRACKING_MIN_POINTS`.
+            smoothing (float): Weight of the new box in the moving average;
+                defaults to `Config.MOUTH_TRACKING_SMOOTHING`.
+            max_error (float): Largest forward-backward distance in pixels of a reliable point.
+        """
+        config = project_config.Config
+        self.detect = detect
+        self.keyframe_interval = keyframe_interval or config.MOUTH_TRACKING_INTERVAL
+        self.min_points = min_points or config.MOUTH_TRACKING_MIN_POINTS
+        self.smoothing = config.MOUTH_TRACKING_SMOOTHING if smoothing is None else smoothing
+        self.max_error = max_error
+        self._frame_index = 0
+        self._previous = None
+        self._box = None
+        self._smoothed = None
+
+    def track(self, frames):
+        """
+        Locates the mouth in every frame, continuing the frames of the previous call.
+
+        Scheduled keyframes are sent to the detector in one batch; frames on
+        which tracking fails are detected one at a time.
+
+        Args:
+            frames (list): Consecutive (or closely spaced) video frames of the same size.
+
+        Returns:
+            list: For each frame, coordinates [x1, y1, x2, y2] or None if no mouth was found.
+            dict: Number of frames, detector calls (frames sent to the detector),
+                tracked frames, re-detections after tracking failed and seconds
+                spent tracking (excluding the detector).
+        """
+        stats = {'frames': len(frames), 'detector_calls': 0, 'tracked': 0, 'redetections': 0,
+                 'tracking_seconds': 0.0}
+        if not frames:
+            return [], stats
+
+        first = -self._frame_index % self.keyframe_interval
+        keyframes = list(range(first, len(frames), self.keyframe_interval))
+        detections = dict(zip(keyframes, self.detect([frames[i] for i in keyframes]))) \
+            if keyframes else {}
+        stats['detector_calls'] = len(keyframes)
+
+        # The raw box is what gets tracked; only the returned boxes are smoothed,
+        # so the average does not slow down the tracked motion.
+        bboxes, box, smoothed, previous = [], self._box, self._smoothed, self._previous
+        for i, frame in enumerate(frames):
+            if i in detections:
+                box = detections[i]
+            elif box is not None:
+                start = time.perf_counter()
+                tracked = self._propagate(previous, frame, box)
+                stats['tracking_seconds'] += time.perf_counter() - start
+                if tracked is None:
+                    stats['redetections'] += 1
+                    box = self.detect([frame])[0]
+                    stats['detector_calls'] += 1
+                else:
+                    box = tracked
+                    stats['tracked'] += 1
+
+            if box is None:
+                smoothed = None
+            elif smoothed is None:
+                smoothed = np.asarray(box, dtype=np.float64)
+            else:
+                smoothed = self.smoothing * np.asarray(box) + (1 - self.smoothing) * smoothed
+            bboxes.append(self._to_bbox(smoothed, frame.shape) if smoothed is not None else None)
+            previous = frame
+
+        self._frame_index += len(frames)
+        self._box, self._smoothed, self._previous = box, smoothed, previous
+        return bboxes, stats
+
+    def _propagate(self, prev_frame, frame, box):
+        """
+        Moves a box from the previous frame to the current one.
+
+        Returns:
+            numpy.ndarray: The moved box, or None if too few points could be tracked.
+        """
+        height, width = frame.shape[:2]
+        x1, y1, x2, y2 = box
+        # Only a window around the box is converted and searched.
+        pad_x, pad_y = (x2 - x1) / 2, (y2 - y1) / 2
+        wx1, wy1 = int(max(x1 - pad_x, 0)), int(max(y1 - pad_y, 0))
+        wx2, wy2 = int(min(x2 + pad_x, width)), int(min(y2 + pad_y, height))
+        if wx2 - wx1 < 8 or wy2 - wy1 < 8:
+            return None
+        prev_gray = cv2.cvtColor(prev_frame[wy1:wy2, wx1:wx2], cv2.COLOR_BGR2GRAY)
+        gray = cv2.cvtColor(frame[wy1:wy2, wx1:wx2], cv2.COLOR_BGR2GRAY)
+
+        mask = np.zeros_like(prev_gray)
+        mask[int(max(y1 - wy1, 0)):int(y2 - wy1), int(max(x1 - wx1, 0)):int(x2 - wx1)] = 255
+        points = cv2.goodFeaturesToTrack(
+            prev_gray, maxCorners=4 * self.min_points, qualityLevel=0.01, minDistance=3, mask=mask)
+        if points is None or len(points) < self.min_points:
+            return None
+
+        lk_params = {'winSize': (15, 15), 'maxLevel': 2}
+        moved, status, _ = cv2.calcOpticalFlowPyrLK(prev_gray, gray, points, None, **lk_params)
+        returned, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, prev_gray, moved, None, **lk_params)
+        error = np.linalg.norm((points - returned).reshape(-1, 2), axis=1)
+        reliable = (status.ravel() == 1) & (back_status.ravel() == 1) & (error < self.max_error)
+        if reliable.sum() < self.min_points:
+            return None
+
+        dx, dy = np.median((moved - points).reshape(-1, 2)[reliable], axis=0)
+        return np.asarray(box) + np.array([dx, dy, dx, dy])
+
+    @staticmethod
+    def _to_bbox(box, frame_shape):
+        """
+        Rounds a box to integer coordinates inside the frame, keeping its size where possible.
+        """
+        height, width = frame_shape[:2]
+        x1, y1, x2, y2 = (int(round(value)) for value in box)
+        shift_x, shift_y = max(-x1, 0), max(-y1, 0)
+        x1, x2, y1, y2 = x1 + shift_x, x2 + shift_x, y1 + shift_y, y2 + shift_y
+        if x2 <= x1 or y2 <= y1 or x1 >= width or y1 >= height:
+            return None
+        return [x1, y1, x2, y2]
@@ -0,0 +1,119 @@
+import io
+import logging
+import os
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from config import project_config
+from processing.instrumentation import stage_timer
+
+
+def normalize_saliency_maps(saliency_maps, percentile=75):
+    """
+    Thresholds and normalizes a stack of saliency maps in one vectorized pass.
+
+    Each map keeps only values above its own `percentile` (as with
+    `cv2.THRESH_TOZERO`) and is then min-max scaled to [0, 255].
+
+    Args:
+        saliency_maps (numpy.ndarray): Raw saliency maps of shape (N, H, W).
+        percentile (float): Per-map percentile below which values are zeroed.
+
+    Returns:
+        numpy.ndarray: uint8 maps of shape (N, H, W).
+    """
+    maps = np.asarray(saliency_maps, dtype=np.float32)
+    thresholds = np.percentile(maps, percentile, axis=(1, 2), keepdims=True)
+    maps = np.where(maps > thresholds, maps, np.float32(0))
+
+    minimums = maps.min(axis=(1, 2), keepdims=True)
+    ranges = maps.max(axis=(1, 2), keepdims=True) - minimums
+    scales = np.divide(255.0, ranges, out=np.zeros_like(ranges), where=ranges > 0)
+    return np.clip(np.rint((maps - minimums) * scales), 0, 255).astype(np.uint8)
+
+
+def render_saliency_overlays(mouth_frames, saliency_maps, colormap=cv2.COLORMAP_HOT,
+                             frame_weight=0.8, heatmap_weight=0.3):
+    """
+    Colormaps saliency maps and blends them onto their mouth frames as one batch.
+
+    Args:
+        mouth_frames (list): Grayscale mouth frames of shape (H, W).
+        saliency_maps (numpy.ndarray): Raw saliency maps of shape (N, H, W).
+        colormap (int): OpenCV colormap applied to the normalized maps.
+        frame_weight (float): Blending weight of the mouth frames.
+        heatmap_weight (float): Blending weight of the heatmaps.
+
+    Returns:
+        numpy.ndarray: BGR overlays of shape (N, H, W, 3).
+    """
+    maps = normalize_saliency_maps(saliency_maps)
+    num_frames, height, width = maps.shape
+    frames = np.stack(mouth_frames[:num_frames]).reshape(num_frames * height, width)
+
+    # Colormaps and blending are per-pixel, so the batch is processed as one tall image.
+    heatmaps = cv2.applyColorMap(maps.reshape(num_frames * height, width), colormap)
+    originals = cv2.cvtColor(frames, cv2.COLOR_GRAY2BGR)
+    overlays = cv2.addWeighted(originals, frame_weight, heatmaps, heatmap_weight, 0)
+    return overlays.reshape(num_frames, height, width, 3)
+
+
+def encode_gif(overlays, scale=1, duration_ms=100):
+    """
+    Encodes BGR overlays into an animated GIF entirely in memory.
+
+    Frames are palette-quantized at their native size and only then enlarged,
+    which keeps the encoding cost independent of `scale` for quantization.
+
+    Args:
+        overlays (numpy.ndarray): BGR frames of shape (N, H, W, 3).
+        scale (int): Integer upscaling factor applied with nearest-neighbour resizing.
+        duration_ms (int): Display time of each frame in milliseconds.
+
+    Returns:
+        bytes: The encoded GIF.
+    """
+    images = []
+    for overlay in overlays:
+        image = Image.fromarray(np.ascontiguousarray(overlay[..., ::-1]))
+        image = image.quantize(256, method=Image.Quantize.FASTOCTREE)
+        if scale > 1:
+            image = image.resize((image.width * scale, image.height * scale),
+                                 Image.Resampling.NEAREST)
+        images.append(image)
+
+    buffer = io.BytesIO()
+    images[0].save(buffer, format='GIF', save_all=True, append_images=images[1:],
+                   duration=duration_ms, loop=0)
+    return buffer.getvalue()
+
+
+def generate_saliency_outputs(saliency_folder, mouth_frames, saliency_maps, write_frames=False):
+    """
+    Renders saliency overlays and saves them as a GIF and, optionally, images.
+
+    Args:
+        saliency_folder (str): Existing directory the outputs are written to.
+        mouth_frames (list): Grayscale mouth frames the saliency maps belong to.
+        saliency_maps (numpy.ndarray): Saliency maps of shape (N, H, W).
+        write_frames (bool): Whether to also write one PNG per frame.
+
+    Returns:
+        str: Path to the generated GIF file.
+        bytes: The GIF bytes.
+    """
+    with stage_timer('render', frames=len(mouth_frames)):
+        overlays = render_saliency_overlays(mouth_frames, saliency_maps)
+        if write_frames:
+            for frame_index, overlay in enumerate(overlays):
+                cv2.imwrite(os.path.join(
+                    saliency_folder, f"saliency_map_{frame_index}.png"), overlay)
+
+        gif_bytes = encode_gif(overlays, scale=project_config.Config.SALIENCY_GIF_SCALE)
+    gif_output_path = os.path.join(saliency_folder, "saliency_maps.gif")
+    with open(gif_output_path, 'wb') as gif_file:
+        gif_file.write(gif_bytes)
+    logging.info(f"Generated GIF: {gif_output_path}")
+    return gif_output_path, gif_bytes
@@ -0,0 +1,486 @@
+import collections
+import logging
+import multiprocessing
+import os
+import queue
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from config import project_config
+from processing.logging_config import configure_logging
+
+CLIP_LENGTH = 29
+"""Number of frames selected from each video."""
+
+CROP_SIZE = 64
+"""Height and width of the mouth crops."""
+
+
+class SharedFrameRing:
+    """
+    Fixed-size slots in one shared memory block, handed out through a queue of free slots.
+
+    The ring is created in the parent process and passed to the workers when
+    they are started; they attach to the same memory, so frames are written
+    once and only slot indices and shapes cross process boundaries. `acquire`
+    blocks while every slot is in use, which throttles the producing stage.
+
+    Attributes:
+        num_slots (int): Number of slots.
+        slot_bytes (int): Capacity of each slot in bytes.
+    """
+
+    def __init__(self, context, num_slots, slot_bytes):
+        """
+        Allocates the shared memory block.
+
+        Args:
+            context (multiprocessing.context.BaseContext): Context the workers are started from.
+            num_slots (int): Number of slots.
+            slot_bytes (int): Capacity of each slot in bytes.
+        """
+        self.num_slots = num_slots
+        self.slot_bytes = slot_bytes
+        self._shm = shared_memory.SharedMemory(create=True, size=num_slots * slot_bytes)
+        self._owner = True
+        self._free = context.Queue()
+        for slot in range(num_slots):
+            self._free.put(slot)
+
+    def __getstate__(self):
+        return {'name': self._shm.name, 'num_slots': self.num_slots,
+                'slot_bytes': self.slot_bytes, 'free': self._free}
+
+    def __setstate__(self, state):
+        self.num_slots = state['num_slots']
+        self.slot_bytes = state['slot_bytes']
+        self._shm = shared_memory.SharedMemory(name=state['name'])
+        self._owner = False
+        self._free = state['free']
+
+    def acquire(self):
+        """
+        Takes a free slot, waiting until one is released.
+
+        Returns:
+            int: Index of the slot.
+        """
+        return self._free.get()
+
+    def release(self, slot):
+        """
+        Returns a slot to the ring once its content has been consumed.
+        """
+        self._free.put(slot)
+
+    def view(self, slot, shape, dtype=np.uint8):
+        """
+        Returns an array over the start of a slot.
+
+        Args:
+            slot (int): Index of the slot.
+            shape (tuple): Shape of the array.
+            dtype (numpy.dtype): Element type of the array.
+
+        Returns:
+            numpy.ndarray: Array backed by the shared memory.
+        """
+        return np.ndarray(shape, dtype=dtype, buffer=self._shm.buf, offset=slot * self.slot_bytes)
+
+    def close(self):
+        """
+        Detaches from the shared memory and, in the creating process, frees it.
+        """
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+
+class StagedPipeline:
+    """
+    Runs video prediction as a pipeline of worker processes.
+
+    Three stages run in separate processes so they overlap across videos and
+    are not serialized by the GIL:
+        decode     decoding and motion-based frame selection (`VideoProcessor.select_frames`)
+        detect     YOLO mouth detection and cropping
+        inference  the lip-reading model, with input gradients when saliency is requested
+
+    Stages are connected by bounded queues that carry only job metadata. The
+    selected frames and the mouth crops travel through `SharedFrameRing`s, so
+    they are never pickled; a stage waits for a free slot when the next stage
+    falls behind. Results are returned in completion order.
+
+    Usage:
+        with StagedPipeline() as pipeline:
+            results = pipeline.run(video_paths)
+
+    Attributes:
+        workers (dict): Number of processes per stage.
+    """
+
+    def __init__(self, decode_workers=None, detect_workers=None, inference_workers=None):
+        """
+        Configures the pipeline; processes are started by `start`.
+
+        Args:
+            decode_workers (int): Decode processes; defaults to `Config.STAGED_DECODE_WORKERS`.
+            detect_workers (int): Detection processes; defaults to `Config.STAGED_DETECT_WORKERS`.
+            inference_workers (int): Inference processes; defaults to `Config.STAGED_INFERENCE_WORKERS`.
+        """
+        config = project_config.Config
+        self.workers = {
+            'decode': decode_workers or config.STAGED_DECODE_WORKERS,
+            'detect': detect_workers or config.STAGED_DETECT_WORKERS,
+            'inference': inference_workers or config.STAGED_INFERENCE_WORKERS,
+        }
+        self._processes = {}
+        self._next_job_id = 0
+        self._submitted = {}
+        self._backlog = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.terminate()
+
+    def start(self):
+        """
+        Allocates the shared memory rings and starts the worker processes.
+        """
+        config = project_config.Config
+        # Workers load PyTorch and the detector, which are not fork-safe once threads exist.
+        context = multiprocessing.get_context('spawn')
+        self._frame_ring = SharedFrameRing(
+            context, config.STAGED_FRAME_SLOTS, config.STAGED_FRAME_SLOT_BYTES)
+        self._crop_ring = SharedFrameRing(
+            context, config.STAGED_CROP_SLOTS, CLIP_LENGTH * CROP_SIZE * CROP_SIZE)
+        self._video_queue = context.Queue(config.STAGED_QUEUE_SIZE)
+        self._detect_queue = context.Queue(config.STAGED_QUEUE_SIZE)
+        self._inference_queue = context.Queue(config.STAGED_QUEUE_SIZE)
+        self._results = context.Queue()
+
+        threads = config.STAGED_WORKER_THREADS or max(
+            1, (os.cpu_count() or 1) // sum(self.workers.values()))
+        stages = {
+            'decode': (_decode_worker, (self._video_queue, self._frame_ring,
+                                        self._detect_queue, self._results)),
+            'detect': (_detect_worker, (self._detect_queue, self._frame_ring, self._crop_ring,
+                                        self._inference_queue, self._results)),
+            'inference': (_inference_worker, (self._inference_queue, self._crop_ring,
+                                              self._results)),
+        }
+        for stage, (target, args) in stages.items():
+            self._processes[stage] = [
+                context.Process(target=target, args=args + (threads,),
+                                name=f"{stage}-{index}", daemon=True)
+                for index in range(self.workers[stage])]
+            for process in self._processes[stage]:
+                process.start()
+        logging.info("Started staged pipeline with %s workers, %d threads each",
+                     self.workers, threads)
+
+    def submit(self, video_path, saliency=False):
+        """
+        Queues a video, waiting while the decode queue is full.
+
+        Args:
+            video_path (str): Path to the video file.
+            saliency (bool): Whether to also return saliency maps.
+
+        Returns:
+            int: ID of the job, repeated in its result.
+        """
+        job_id = self._next_job_id
+        self._next_job_id += 1
+        self._submitted[job_id] = time.monotonic()
+        self._video_queue.put((job_id, video_path, saliency, {}))
+        return job_id
+
+    def get_result(self, timeout=None):
+        """
+        Returns the next finished job.
+
+        Args:
+            timeout (float): Maximum seconds to wait, or None to wait indefinitely.
+
+        Returns:
+            dict: The 'job_id', 'video_path', 'predictions' (None on failure),
+                'saliency_maps' when requested, 'error' (None on success) and
+                the 'timings': milliseconds spent in each stage ('decode_ms',
+                'detect_ms', and the clip's share of its batch as 'inference_ms'),
+                'inference_batch_size' and the end-to-end 'total_ms'.
+
+        Raises:
+            queue.Empty: If no result arrived within the timeout.
+            RuntimeError: If a worker process died.
+        """
+        if self._backlog:
+            return self._backlog.pop(0)
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = 1.0 if deadline is None else min(1.0, deadline - time.monotonic())
+            try:
+                return self._finish(self._results.get(timeout=max(wait, 0)))
+            except queue.Empty:
+                self._check_workers()
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise
+
+    def imap_unordered(self, video_paths, saliency=False):
+        """
+        Processes videos and yields their results as they finish.
+
+        Videos are submitted while results are collected, so any number of
+        videos can be streamed through without holding their results.
+
+        Args:
+            video_paths (iterable): Paths to the video files.
+            saliency (bool): Whether to also return saliency maps.
+
+        Yields:
+            dict: One result per video (see `get_result`), in completion order.
+        """
+        pending = collections.deque(video_paths)
+        outstanding = 0
+        while pending or outstanding:
+            # Keep the decode queue fed without blocking on it.
+            while pending and not self._video_queue.full():
+                self.submit(pending.popleft(), saliency)
+                outstanding += 1
+            try:
+                result = self.get_result(timeout=0.05 if pending else None)
+            except queue.Empty:
+                continue
+            outstanding -= 1
+            yield result
+
+    def run(self, video_paths, saliency=False):
+        """
+        Processes a list of videos and returns their results in input order.
+
+        Args:
+            video_paths (list): Paths to the video files.
+            saliency (bool): Whether to also return saliency maps.
+
+        Returns:
+            list: One result dict per video (see `get_result`).
+        """
+        return sorted(self.imap_unordered(video_paths, saliency),
+                      key=lambda result: result['job_id'])
+
+    def close(self):
+        """
+        Stops the workers once the submitted jobs are finished and frees the shared memory.
+
+        Results that were not collected yet remain available from `get_result`.
+        """
+        if not self._processes:
+            return
+        stage_queues = [('decode', self._video_queue), ('detect', self._detect_queue),
+                        ('inference', self._inference_queue)]
+        for stage, stage_queue in stage_queues:
+            for _ in self._processes[stage]:
+                stage_queue.put(None)
+            for process in self._processes[stage]:
+                # Results must be drained while waiting: a process does not exit
+                # before the items it queued have been read.
+                while process.is_alive():
+                    self._drain_results()
+                    process.join(timeout=0.1)
+        self._drain_results()
+        self._processes = {}
+        self._frame_ring.close()
+        self._crop_ring.close()
+
+    def terminate(self):
+        """
+        Stops the workers immediately, abandoning unfinished jobs, and frees the shared memory.
+        """
+        if not self._processes:
+            return
+        for processes in self._processes.values():
+            for process in processes:
+                process.terminate()
+        for processes in self._processes.values():
+            for process in processes:
+                process.join()
+        self._processes = {}
+        self._frame_ring.close()
+        self._crop_ring.close()
+
+    def _drain_results(self):
+        while True:
+            try:
+                self._backlog.append(self._finish(self._results.get_nowait()))
+            except queue.Empty:
+                return
+
+    def _finish(self, result):
+        submitted = self._submitted.pop(result['job_id'], None)
+        if submitted is not None:
+            result['timings']['total_ms'] = (time.monotonic() - submitted) * 1000
+        return result
+
+    def _check_workers(self):
+        for stage, processes in self._processes.items():
+            for process in processes:
+                if process.exitcode not in (None, 0):
+                    raise RuntimeError(
+                        f"{stage} worker {process.name} exited with code {process.exitcode}")
+
+
+def _configure_worker(threads):
+    """
+    Limits the threads of a worker process so the stages share the cores.
+    """
+    import torch
+
+    configure_logging()
+    torch.set_num_threads(threads)
+    cv2.setNumThreads(threads)
+
+
+def _failed(job_id, video_path, timings, error):
+    logging.warning("Job %d (%s) failed: %s", job_id, video_path, error)
+    return {'job_id': job_id, 'video_path': video_path, 'predictions': None,
+            'error': error, 'timings': timings}
+
+
+def _fit_frames(frames, capacity):
+    """
+    Downscales a stack of frames until it fits in a ring slot.
+    """
+    if frames.nbytes <= capacity:
+        return frames
+    scale = (capacity / frames.nbytes) ** 0.5
+    height, width = (max(int(side * scale), 1) for side in frames.shape[1:3])
+    logging.warning("Downscaling %dx%d frames to %dx%d to fit the frame ring",
+                    frames.shape[2], frames.shape[1], width, height)
+    return np.stack([cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+                     for frame in frames])
+
+
+def _decode_worker(jobs, frame_ring, detect_queue, results, threads):
+    from processing.mouth_frame_extractor import VideoProcessor
+
+    _configure_worker(threads)
+    while (job := jobs.get()) is not None:
+        job_id, video_path, saliency, timings = job
+        start = time.perf_counter()
+        try:
+            cap = cv2.VideoCapture(video_path)
+            if not cap.isOpened():
+                raise Exception("Error opening video file")
+            frames = VideoProcessor.select_frames(cap)
+            if len(frames) != CLIP_LENGTH:
+                raise ValueError(f"Video does not yield {CLIP_LENGTH} frames")
+            frames = _fit_frames(np.stack(frames), frame_ring.slot_bytes)
+        except Exception as e:
+            results.put(_failed(job_id, video_path, timings, str(e)))
+            continue
+
+        slot = frame_ring.acquire()
+        frame_ring.view(slot, frames.shape)[:] = frames
+        timings['decode_ms'] = (time.perf_counter() - start) * 1000
+        detect_queue.put((job_id, video_path, saliency, timings, slot, frames.shape))
+
+
+def _detect_worker(jobs, frame_ring, crop_ring, inference_queue, results, threads):
+    from processing.mouth_frame_extractor import VideoProcessor
+
+    _configure_worker(threads)
+    video_processor = VideoProcessor()
+    while (job := jobs.get()) is not None:
+        job_id, video_path, saliency, timings, slot, shape = job
+        start = time.perf_counter()
+        try:
+            crops = video_processor.extract_mouth_crops(list(frame_ring.view(slot, shape)))
+        except Exception as e:
+            results.put(_failed(job_id, video_path, timings, str(e)))
+            continue
+        finally:
+            frame_ring.release(slot)
+
+        crops = [crop for crop in crops if crop is not None]
+        if not crops:
+            results.put(_failed(job_id, video_path, timings, 'No mouth detected in video'))
+            continue
+        crop_slot = crop_ring.acquire()
+        crop_ring.view(crop_slot, (len(crops), CROP_SIZE, CROP_SIZE))[:] = np.stack(crops)
+        timings['detect_ms'] = (time.perf_counter() - start) * 1000
+        inference_queue.put((job_id, video_path, saliency, timings, crop_slot, len(crops)))
+
+
+def _inference_worker(jobs, crop_ring, results, threads):
+    import torch
+
+    from backbone.model_loader import LipReadingModel
+    from processing.frame_preprocessing import preprocess_frames
+
+    _configure_worker(threads)
+    lip_reading_model = LipReadingModel()
+    batch_size = project_config.Config.STAGED_INFERENCE_BATCH_SIZE
+    stopping = False
+    while not stopping:
+        job = jobs.get()
+        if job is None:
+            break
+        # Clips that are already waiting are classified in one forward pass.
+        batch = [job]
+        while len(batch) < batch_size:
+            try:
+                job = jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:
+                stopping = True
+                break
+            batch.append(job)
+
+        start = time.perf_counter()
+        inputs = []
+        for job_id, video_path, saliency, timings, crop_slot, num_crops in batch:
+            inputs.append(preprocess_frames(
+                crop_ring.view(crop_slot, (num_crops, CROP_SIZE, CROP_SIZE))))
+            crop_ring.release(crop_slot)
+
+        # Clips are batched by length and by whether they need saliency maps.
+        groups = {}
+        for i, job in enumerate(batch):
+            groups.setdefault((inputs[i].size(1), bool(job[2])), []).append(i)
+        outputs = {}
+        try:
+            for (_, saliency), indices in groups.items():
+                frames_tensor = torch.cat([inputs[i] for i in indices])
+                if not saliency:
+                    predictions = lip_reading_model.predict_batch(frames_tensor)
+                    outputs.update({i: {'predictions': prediction}
+                                    for i, prediction in zip(indices, predictions)})
+                    continue
+                predictions, saliency_maps = lip_reading_model.predict_batch(
+                    frames_tensor, return_grad=True)
+                outputs.update({i: {'predictions': prediction,
+                                    'saliency_maps': maps.squeeze().cpu().numpy()}
+                                for i, prediction, maps in zip(indices, predictions, saliency_maps)})
+        except Exception as e:
+            for job_id, video_path, _, timings, _, _ in batch:
+                results.put(_failed(job_id, video_path, timings, str(e)))
+            continue
+
+        # Each clip is charged its share of the batch.
+        elapsed = (time.perf_counter() - start) * 1000 / len(batch)
+        for i, (job_id, video_path, _, timings, _, _) in enumerate(batch):
+            timings['inference_ms'] = elapsed
+            timings['inference_batch_size'] = len(batch)
+            results.put(dict(outputs[i], job_id=job_id, video_path=video_path,
+                             error=None, timings=timings))
@@ -8,6 +8,18 @@ import ScrollToExplore from "../../common/ScrollToExplore/ScrollToExplore";
 import ScrollToPredictions from "../../common/ScrollToPredictions/ScrollToPredictions";
 import VideoCapture from "../VideoCapture/VideoCapture";
 
+const API_URL = "http://127.0.0.1:5000";
+const JOB_POLL_INTERVAL_MS = 500;
+
+const STAGE_LABELS = {
+  queued: "Waiting in line",
+  started: "Decoding your video",
+  decoded: "Finding the mouth",
+  detected: "Reading your lips",
+  predicted: "Rendering saliency maps",
+  rendered: "Almost done",
+};
+
 function VideoUpload() {
   const [videoFile, setVideoFile] = useState(null);
   const [stream, setStream] = useState(null);
@@ -19,6 +31,7 @@ function VideoUpload() {
     probabilities: [],
   });
   const [gifUrl, setGifUrl] = useState("");
+  const [processingStage, setProcessingStage] = useState(null);
   const videoRef = useRef();
   const mediaRecorderRef = useRef();
   const predictionsRef = useRef(null);
@@ -84,6 +97,42 @@ function VideoUpload() {
     }
   }, []);
 
+  const showResult = useCallback((result) => {
+    const gifPath = result.saliency_maps_gif;
+    if (gifPath) {
+      const url = `${API_URL}/images/${gifPath.replace(
+        /^.*\/uploaded_videos\//,
+        ""
+      )}`;
+      setGifUrl(url);
+      console.log("GIF URL Set to:", url);
+    }
+
+    if (result.predictions) {
+      const words = result.predictions.map((prediction) => prediction[0]);
+      const probabilities = result.predictions.map(
+        (prediction) => prediction[1]
+      );
+      setPredictionResults({ words, probabilities });
+    } else {
+      setPredictionResults({ words: [], probabilities: [] });
+    }
+  }, []);
+
+  const pollJob = useCallback(async (jobId) => {
+    for (;;) {
+      const { data } = await axios.get(`${API_URL}/jobs/${jobId}`);
+      setProcessingStage(data.stage);
+      if (data.status === "succeeded") {
+        return data.result;
+      }
+      if (data.status === "failed") {
+        throw new Error(data.error);
+      }
+      await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+    }
+  }, []);
+
   const uploadVideo = useCallback(() => {
     if (!videoFile) {
       console.log("No video file selected.");
@@ -91,6 +140,7 @@ function VideoUpload() {
     }
 
     setIsUploading(true);
+    setProcessingStage(null);
     const formData = new FormData();
     formData.append("file", videoFile);
 
@@ -101,37 +151,20 @@ function VideoUpload() {
     };
 
     axios
-      .post("http://127.0.0.1:5000/demo", formData, config)
-      .then((response) => {
+      .post(`${API_URL}/jobs`, formData, config)
+      .then((response) => pollJob(response.data.job_id))
+      .then((result) => {
         alert("Video uploaded successfully!");
-
-        const gifPath = response.data.saliency_maps_gif;
-        const url = `http://127.0.0.1:5000/images/${gifPath.replace(
-          /^.*\/uploaded_videos\//,
-          ""
-        )}`;
-        setGifUrl(url);
-        console.log("GIF URL Set to:", url);
-
-        if (response.data.predictions) {
-          const words = response.data.predictions.map(
-            (prediction) => prediction[0]
-          );
-          const probabilities = response.data.predictions.map(
-            (prediction) => prediction[1]
-          );
-          setPredictionResults({ words, probabilities });
-        } else {
-          setPredictionResults({ words: [], probabilities: [] });
-        }
+        showResult(result);
       })
       .catch((error) => {
         alert(`Failed to upload video: ${error.message}`);
       })
       .finally(() => {
         setIsUploading(false);
+        setProcessingStage(null);
       });
-  }, [videoFile]);
+  }, [videoFile, pollJob, showResult]);
 
   const clearVideo = useCallback(() => {
     setVideoFile(null);
@@ -223,7 +256,9 @@ function VideoUpload() {
             <div className={styles.spinnerWrapper}>
               <div className={styles.uploadStatus}>
                 <div className={styles.spinner}></div>
-                <p className={styles.loadingText}>Uploading your video</p>
+                <p className={styles.loadingText}>
+                  {STAGE_LABELS[processingStage] || "Uploading your video"}
+                </p>
               </div>
             </div>
           )}
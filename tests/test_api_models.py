@@ -0,0 +1,85 @@
+import importlib
+import io
+import os
+
+import numpy as np
+import pytest
+import torch
+
+from backbone.model_artifacts import save_model_artifact
+from backbone.temporal_multiscale_model import LipReadModel
+from config.project_config import Config
+from processing.mouth_frame_extractor import VideoProcessor
+
+LABELS = [f"word{i}" for i in range(5)]
+
+
+class FakeVideoProcessor:
+    """
+    Returns fixed mouth crops instead of running the YOLO detector on the upload.
+    """
+
+    get_saliency_maps = VideoProcessor.get_saliency_maps
+
+    def process_video_in_memory(self, file_path, progress=None):
+        rng = np.random.default_rng(0)
+        mouth_frames = list(rng.integers(0, 255, (29, 64, 64), dtype=np.uint8))
+        frames_tensor = torch.from_numpy(np.stack(mouth_frames)).float().div(255) \
+            .view(1, 29, 1, 64, 64)
+        return frames_tensor, mouth_frames
+
+
+@pytest.fixture(scope='module')
+def server(tmp_path_factory):
+    workdir = tmp_path_factory.mktemp('server')
+    models = {}
+    for seed, name in enumerate(('v1', 'v2')):
+        torch.manual_seed(seed)
+        path = str(workdir / f"{name}.pt")
+        save_model_artifact(LipReadModel(len(LABELS), pretrained_backbone=False).state_dict(),
+                            path, LABELS, {'num_classes': len(LABELS)})
+        models[name] = {'path': path}
+
+    cwd = os.getcwd()
+    patched = {'MODELS': models, 'DEFAULT_MODEL': 'v1', 'PRELOAD_MODELS': False,
+               'WARMUP_ON_LOAD': False, 'RESULT_CACHE_ENABLED': True}
+    saved = {name: getattr(Config, name) for name in patched}
+    for name, value in patched.items():
+        setattr(Config, name, value)
+    os.chdir(workdir)
+    os.makedirs(Config.UPLOAD_FOLDER, exist_ok=True)
+    try:
+        from api import lipreading_api_server
+
+        srv = importlib.reload(lipreading_api_server)
+        srv.resources.register('video_processor', FakeVideoProcessor)
+        yield srv
+        srv.retention_manager.stop()
+        srv.shutdown_batchers()
+    finally:
+        os.chdir(cwd)
+        for name, value in saved.items():
+            setattr(Config, name, value)
+
+
+def demo(client, model):
+    response = client.post('/demo', data={'file': (io.BytesIO(b'same upload'), 'clip.mp4'),
+                                          'model': model},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200, response.json
+    with open(response.json['saliency_maps_gif'], 'rb') as f:
+        return response.json, f.read()
+
+
+def test_models_keep_separate_saliency_gifs_for_one_upload(server):
+    client = server.app.test_client()
+
+    first_v1, gif_v1 = demo(client, 'v1')
+    first_v2, gif_v2 = demo(client, 'v2')
+    cached_v1, cached_gif_v1 = demo(client, 'v1')
+
+    assert first_v1['saliency_maps_gif'] != first_v2['saliency_maps_gif']
+    assert gif_v1 != gif_v2
+    assert cached_v1['cached']
+    assert cached_v1['saliency_maps_gif'] == first_v1['saliency_maps_gif']
+    assert cached_gif_v1 == gif_v1
@@ -0,0 +1,33 @@
+import os
+
+import cv2
+import numpy as np
+import torch
+
+from processing.frame_preprocessing import load_frames_folder, preprocess_directory
+
+
+def write_clip(folder, num_frames):
+    os.makedirs(folder)
+    for i in range(num_frames):
+        cv2.imwrite(os.path.join(folder, f"{i}.jpg"), np.full((64, 64), i * 10, dtype=np.uint8))
+
+
+def test_load_frames_folder_without_frames_is_empty(tmp_path):
+    frames = load_frames_folder(str(tmp_path))
+
+    assert frames.shape == (0, 64, 64)
+    assert frames.dtype == np.uint8
+
+
+def test_preprocess_directory_skips_empty_clip_folders(tmp_path):
+    frames_root, output_dir = tmp_path / 'frames', tmp_path / 'tensors'
+    write_clip(str(frames_root / 'clip_a'), 3)
+    os.makedirs(frames_root / 'clip_empty')
+    write_clip(str(frames_root / 'clip_b'), 2)
+
+    converted = preprocess_directory(str(frames_root), str(output_dir))
+
+    assert converted == 2
+    assert sorted(os.listdir(output_dir)) == ['clip_a.pt', 'clip_b.pt']
+    assert torch.load(output_dir / 'clip_a.pt').shape == (1, 3, 1, 64, 64)
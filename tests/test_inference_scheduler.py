@@ -0,0 +1,63 @@
+import threading
+
+import pytest
+import torch
+
+from backbone.inference_scheduler import DynamicBatcher
+
+
+class RecordingModel:
+    """
+    Stands in for `LipReadingModel`: records its inputs and predicts one entry per sample.
+    """
+
+    def __init__(self, release=None):
+        self.inputs = []
+        self.release = release
+        self.started = threading.Event()
+
+    def predict_batch(self, frames_tensor, return_grad=False):
+        self.started.set()
+        if self.release is not None:
+            self.release.wait(5)
+        self.inputs.append(frames_tensor)
+        return [[('word', float(i))] for i in range(len(frames_tensor))]
+
+
+def test_4d_input_uses_the_predict_batch_layout():
+    model = RecordingModel()
+    batcher = DynamicBatcher(model, max_batch_size=4, max_wait_ms=0)
+    sample = torch.arange(1 * 29 * 8 * 8, dtype=torch.float32).view(1, 29, 8, 8)
+
+    batcher.predict(sample)
+    batcher.shutdown()
+
+    # predict_batch turns 5D (batch, depth, channels, h, w) input into the model layout.
+    assert torch.equal(model.inputs[0].permute(0, 2, 1, 3, 4)[0], sample)
+
+
+def test_submit_after_shutdown_is_rejected():
+    batcher = DynamicBatcher(RecordingModel(), max_wait_ms=0)
+    batcher.shutdown()
+
+    with pytest.raises(RuntimeError):
+        batcher.submit(torch.zeros(1, 29, 1, 8, 8))
+
+
+def test_queued_requests_resolve_when_the_batcher_stops():
+    release = threading.Event()
+    model = RecordingModel(release)
+    batcher = DynamicBatcher(model, max_batch_size=1, max_wait_ms=0)
+    futures = [batcher.submit(torch.zeros(1, 29, 1, 8, 8))]
+    model.started.wait(5)
+    futures += [batcher.submit(torch.zeros(1, 29, 1, 8, 8)) for _ in range(2)]
+
+    # The worker is stuck in the first batch while the others queue up behind it.
+    batcher._fail_remaining()
+    release.set()
+    batcher.shutdown()
+
+    assert len(futures[0].result(5)) == 1
+    for future in futures[1:]:
+        with pytest.raises(RuntimeError):
+            future.result(5)
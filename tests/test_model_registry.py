@@ -0,0 +1,28 @@
+import pytest
+
+from backbone.model_artifacts import save_model_artifact
+from backbone.model_registry import ModelRegistry
+from backbone.temporal_multiscale_model import LipReadModel
+
+LABELS = ['yes', 'no']
+
+
+def save_model(path, **architecture):
+    save_model_artifact(LipReadModel(len(LABELS), pretrained_backbone=False).state_dict(),
+                        str(path), LABELS, {'num_classes': len(LABELS), **architecture})
+    return {'path': str(path)}
+
+
+def test_models_for_other_crop_sizes_are_rejected(tmp_path):
+    registry = ModelRegistry(
+        {'v1': save_model(tmp_path / 'v1.pt'),
+         'v2': save_model(tmp_path / 'v2.pt', input_size=128, frames=40)},
+        default='v1', memory_budget=0)
+
+    with pytest.raises(ValueError, match='input_size 128'):
+        registry.get('v2')
+
+    status = {model['name']: model for model in registry.status()}
+    assert 'error' not in status['v1']
+    assert 'frames 40' in status['v2']['error']
+    assert registry.loaded() == []
@@ -0,0 +1,51 @@
+import os
+
+import numpy as np
+import torch
+
+from api.result_cache import ResultCache
+
+
+def make_entry(seed):
+    return {
+        'predictions': [['word', seed]],
+        'frames_tensor': torch.full((1, 29, 1, 64, 64), float(seed)),
+        'mouth_frames': [np.full((64, 64), seed, dtype=np.uint8)] * 29,
+        'saliency_gif': bytes([seed]) * 1000,
+    }
+
+
+def test_entries_written_by_one_process_are_read_by_another(tmp_path):
+    writer = ResultCache(str(tmp_path), 0, 10 ** 9)
+    reader = ResultCache(str(tmp_path), 0, 10 ** 9)
+
+    writer.put('a', make_entry(1))
+    entry = reader.get('a')
+
+    assert entry['predictions'] == [['word', 1]]
+    assert torch.equal(entry['frames_tensor'], make_entry(1)['frames_tensor'])
+    assert entry['saliency_gif'] == make_entry(1)['saliency_gif']
+    assert not [name for name in os.listdir(tmp_path / 'a') if name.endswith('.tmp')]
+
+
+def test_incomplete_entries_are_misses(tmp_path):
+    cache = ResultCache(str(tmp_path), 0, 10 ** 9)
+    os.makedirs(tmp_path / 'partial')
+    (tmp_path / 'partial' / 'saliency_maps.gif').write_bytes(b'gif')
+
+    assert cache.get('partial') is None
+    assert cache.stats()['disk_entries'] == 0
+
+
+def test_disk_budget_holds_across_processes(tmp_path):
+    first = ResultCache(str(tmp_path), 0, 10 ** 9)
+    first.put('a', make_entry(1))
+    entry_size = first.stats()['disk_bytes']
+    second = ResultCache(str(tmp_path), 0, int(2.5 * entry_size))
+
+    second.put('b', make_entry(2))
+    first.put('c', make_entry(3))
+    second.put('d', make_entry(4))
+
+    assert sorted(os.listdir(tmp_path)) == ['c', 'd']
+    assert second.stats()['disk_bytes'] <= 2.5 * entry_size